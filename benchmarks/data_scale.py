@@ -0,0 +1,105 @@
+"""
+Measure validation, preview and full-result streaming as the data grows.
+
+Generates synthetic university databases with src.db.seed at each
+--attendance-rows size (or reuses them when present in --dir), then times, for
+a few representative queries: EXPLAIN-based validation, fetching the preview
+rows, streaming the full result in batches, and reading the result back from
+the result cache (results over its row limit are not cached, shown as "-").
+
+Run from the repository root:
+
+    python -m benchmarks.data_scale --attendance-rows 1e4 1e5 1e6
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict
+
+from src.cache.result_cache import ResultCache
+from src.config import ResultCacheConfig
+from src.db.engine import SQLiteDatabase
+from src.db.executor import iter_batches, preview
+from src.db.seed import generate_university_data
+from src.db.validator import SQLValidator
+
+QUERIES: Dict[str, str] = {
+    "filter": "SELECT * FROM attendance WHERE present = 0",
+    "join": (
+        "SELECT s.name, c.title, a.date, a.present FROM attendance a "
+        "JOIN enrollments e ON e.id = a.enrollment_id "
+        "JOIN students s ON s.id = e.student_id "
+        "JOIN courses c ON c.id = e.course_id"
+    ),
+    "aggregate": (
+        "SELECT c.title, AVG(a.present) AS attendance_rate FROM courses c "
+        "JOIN enrollments e ON e.course_id = c.id "
+        "JOIN attendance a ON a.enrollment_id = e.id GROUP BY c.id"
+    ),
+}
+
+
+def timed(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--attendance-rows", type=float, nargs="+", default=[1e4, 1e5, 1e6]
+    )
+    parser.add_argument("--dir", type=str, default=".scale_data")
+    args = parser.parse_args()
+    os.makedirs(args.dir, exist_ok=True)
+    cache_dir = tempfile.mkdtemp()
+
+    print(
+        f"{'rows':>12} {'query':<10}{'validate ms':>12}{'preview ms':>12}"
+        f"{'stream ms':>12}{'cached ms':>11}{'result rows':>13}  warnings"
+    )
+    for rows in map(int, args.attendance_rows):
+        path = os.path.join(args.dir, f"university_{rows}.db")
+        if not os.path.exists(path):
+            print(f"Generating {path}")
+            generate_university_data(path, rows)
+        database = SQLiteDatabase(path)
+        validator = SQLValidator(database, large_table_rows=100_000)
+        cache = ResultCache(
+            ResultCacheConfig(path=cache_dir, max_rows=100_000),
+            database,
+            set(database.load_schema()),
+        )
+        for name, sql in QUERIES.items():
+            check = validator.validate(sql)
+            validate_ms = timed(lambda: validator.validate(sql))
+            preview_ms = timed(lambda: preview(database, sql))
+            streamed = 0
+
+            def stream() -> None:
+                nonlocal streamed
+                streamed = sum(b.height for b in iter_batches(database, sql))
+
+            stream_ms = timed(stream)
+            versions = cache.versions(sql)
+            if versions is not None:
+                result = preview(database, sql, cache.config.max_rows + 1)
+                cache.put(sql, result, versions)
+            hit = cache.get(sql) is not None
+            cached = f"{timed(lambda: cache.get(sql)):>11.2f}" if hit else f"{'-':>11}"
+            print(
+                f"{rows:>12,} {name:<10}{validate_ms:>12.2f}{preview_ms:>12.2f}"
+                f"{stream_ms:>12.1f}{cached}{streamed:>13,}  "
+                f"{'; '.join(check.warnings)}"
+            )
+        cache.close()
+        database.close()
+    shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Measure server throughput and tail latency under concurrent load, offline.
+
+Starts the HTTP server in-process around a QueryGPT pipeline whose agents are
+stubs answering after --llm-latency-ms, with a hashed bag-of-words embedding
+and a local vector store, so no API or database service is needed. Each client
+keeps one connection open and sends POST /query requests back to back. Questions
+are drawn from a pool of --distinct questions, so repeated ones overlap in time
+and exercise request coalescing.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.stubs import HashEmbedding, stub_model
+from src.config import LlamaIndexConfig, ServerConfig, VectorStoreConfig
+from src.querygpt import QueryGPT
+from src.server import QueryServer
+
+SUBJECTS = ["students", "courses", "professors", "departments", "grades"]
+FILTERS = ["per department", "in 2023", "with more than 3 credits", "this semester"]
+
+
+async def post(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    path: str,
+    payload: Dict[str, Any],
+) -> Tuple[int, Dict[str, Any]]:
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode(
+            "latin-1"
+        )
+        + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(
+    port: int, questions: List[str], latencies: List[float], statuses: List[int]
+) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for question in questions:
+            start = time.perf_counter()
+            status, _ = await post(reader, writer, "/query", {"question": question})
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses.append(status)
+    finally:
+        writer.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    calls: List[int] = []
+    pipeline = QueryGPT(
+        llama_config=LlamaIndexConfig(embed_model=HashEmbedding()),
+        vector_store_config=VectorStoreConfig(
+            backend="local", local_path=tempfile.mkdtemp()
+        ),
+        agent_model=stub_model(
+            latency=args.llm_latency_ms / 1000,
+            on_request=lambda _text, _info: calls.append(1),
+        ),
+    )
+    pipeline.warm_up()
+    server = QueryServer(
+        pipeline,
+        ServerConfig(
+            port=0, max_in_flight=args.max_in_flight, max_queue=args.max_queue
+        ),
+    )
+    listener = await server.start()
+    port = listener.sockets[0].getsockname()[1]
+
+    rng = random.Random(0)
+    pool = [
+        f"How many {rng.choice(SUBJECTS)} {rng.choice(FILTERS)}, case {i}?"
+        for i in range(args.distinct)
+    ]
+    per_client = args.requests // args.clients
+    latencies: List[float] = []
+    statuses: List[int] = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(
+                port,
+                [rng.choice(pool) for _ in range(per_client)],
+                latencies,
+                statuses,
+            )
+            for _ in range(args.clients)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    listener.close()
+    await listener.wait_closed()
+
+    ok = sorted(ms for ms, s in zip(latencies, statuses) if s == 200)
+    print(f"requests      {len(statuses)} in {elapsed:.2f}s")
+    print(f"throughput    {len(statuses) / elapsed:.1f} req/s")
+    print(f"ok / 429      {len(ok)} / {statuses.count(429)}")
+    print(f"other errors  {len(statuses) - len(ok) - statuses.count(429)}")
+    print(f"coalesced     {server.coalesced}")
+    print(f"llm calls     {len(calls)}")
+    if ok:
+        for label, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            value = ok[min(len(ok) - 1, int(len(ok) * q))]
+            print(f"{label} ms        {value:.1f}")
+        print(f"mean ms       {statistics.mean(ok):.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=200)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--max-queue", type=int, default=256)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
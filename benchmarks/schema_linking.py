@@ -0,0 +1,150 @@
+"""
+Measure table-selection prompt size and latency as the schema grows.
+
+Builds synthetic schemas of 10 to 2,000 tables with foreign keys between them
+and asks the table agent about a known target table: with the full schema in
+the prompt, with the slice returned by SchemaIndex.link, and with the full
+schema trimmed to the default table_selection token budget by PromptBudget.
+Recall is the share of questions whose target table made it into the prompt.
+The LLM is a stub, so latency covers prompt construction, linking and agent
+overhead only.
+
+Run from the repository root:
+
+    python -m benchmarks.schema_linking
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from llama_index.core.utils import get_tokenizer
+from pydantic_ai.models.function import AgentInfo
+from typing import Any, Dict, List
+
+from benchmarks.stubs import HashEmbedding, stub_model
+from src.agents.table_agent import TableAgent
+from src.config import SchemaIndexConfig
+from src.prompt_budget import PromptBudget
+from src.schema_index import SchemaIndex
+
+NOUNS = [
+    "customer", "order", "invoice", "product", "supplier", "warehouse", "shipment",
+    "payment", "refund", "campaign", "employee", "contract", "ticket", "region",
+    "store", "device", "account", "session", "review", "coupon", "vendor", "budget",
+]  # fmt: skip
+ATTRIBUTES = [
+    "status", "amount", "created_at", "updated_at", "currency", "priority",
+    "country", "category", "score", "quantity", "discount", "channel", "notes",
+]  # fmt: skip
+
+
+def synthetic_schema(n_tables: int, seed: int = 0) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    schema: Dict[str, Any] = {}
+    names: List[str] = []
+    for i in range(n_tables):
+        noun = NOUNS[i % len(NOUNS)]
+        name = f"{noun}_{i // len(NOUNS)}" if i >= len(NOUNS) else noun
+        columns = [{"name": "id", "type": "INTEGER", "primary_key": True}]
+        columns.append({"name": f"{noun}_name", "type": "TEXT", "primary_key": False})
+        for attribute in rng.sample(ATTRIBUTES, 5):
+            columns.append(
+                {"name": f"{noun}_{attribute}", "type": "TEXT", "primary_key": False}
+            )
+        foreign_keys = []
+        for partner in rng.sample(names, min(2, len(names))):
+            column = f"{partner}_id"
+            columns.append({"name": column, "type": "INTEGER", "primary_key": False})
+            foreign_keys.append(
+                {
+                    "column": column,
+                    "references_table": partner,
+                    "references_column": "id",
+                }
+            )
+        schema[name] = {"columns": columns, "foreign_keys": foreign_keys}
+        names.append(name)
+    return schema
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 50, 200, 1000, 2000]
+    )
+    parser.add_argument("--questions", type=int, default=20)
+    args = parser.parse_args()
+
+    tokenizer = get_tokenizer()
+    embed_model = HashEmbedding()
+    cache_dir = tempfile.mkdtemp()
+
+    print(
+        f"{'tables':>7}{'full tok':>10}{'linked tok':>12}"
+        f"{'full ms':>10}{'linked ms':>11}{'index s':>9}{'recall':>8}"
+        f"{'budget tok':>12}{'budget ms':>11}{'recall':>8}"
+    )
+    budget = PromptBudget()
+    for size in args.sizes:
+        schema = synthetic_schema(size)
+        rng = random.Random(size)
+        targets = rng.sample(list(schema), min(args.questions, size))
+        questions = [f"What is the total amount per status in {t}?" for t in targets]
+
+        prompts: List[str] = []
+
+        def capture(text: str, _info: AgentInfo) -> None:
+            prompts.append(text)
+
+        full_agent = TableAgent(schema, model=stub_model(on_request=capture))
+        linked_agent = TableAgent(
+            schema, model=stub_model(on_request=capture), linked_schema=True
+        )
+        budget_agent = TableAgent(
+            schema, model=stub_model(on_request=capture), budget=budget
+        )
+        index = SchemaIndex(schema, embed_model, SchemaIndexConfig(cache_dir=cache_dir))
+        start = time.perf_counter()
+        index.link("warm up")
+        build_seconds = time.perf_counter() - start
+
+        full_ms: List[float] = []
+        linked_ms: List[float] = []
+        full_tokens: List[int] = []
+        linked_tokens: List[int] = []
+        budget_ms: List[float] = []
+        budget_tokens: List[int] = []
+        hits = budget_hits = 0
+        for target, question in zip(targets, questions):
+            start = time.perf_counter()
+            full_agent.determine_tables(question, [])
+            full_ms.append((time.perf_counter() - start) * 1000)
+            full_tokens.append(len(tokenizer(prompts[-1])))
+
+            start = time.perf_counter()
+            linked = index.link(question)
+            linked_agent.determine_tables(question, [], linked.columns)
+            linked_ms.append((time.perf_counter() - start) * 1000)
+            linked_tokens.append(len(tokenizer(prompts[-1])))
+            hits += target in linked.columns
+
+            start = time.perf_counter()
+            budget_agent.determine_tables(question, [])
+            budget_ms.append((time.perf_counter() - start) * 1000)
+            budget_tokens.append(len(tokenizer(prompts[-1])))
+            budget_hits += f"Table '{target}'" in prompts[-1]
+
+        print(
+            f"{size:>7}{statistics.mean(full_tokens):>10.0f}"
+            f"{statistics.mean(linked_tokens):>12.0f}"
+            f"{statistics.median(full_ms):>10.2f}{statistics.median(linked_ms):>11.2f}"
+            f"{build_seconds:>9.2f}{hits / len(targets):>8.0%}"
+            f"{statistics.mean(budget_tokens):>12.0f}"
+            f"{statistics.median(budget_ms):>11.2f}{budget_hits / len(targets):>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
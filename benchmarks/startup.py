@@ -0,0 +1,159 @@
+"""
+Measure cold start of the querygpt entry point and what it imports.
+
+Each stage runs in a fresh interpreter, so the time includes Python startup and
+every import, as a user running the CLI sees it:
+
+    help     `python -m src.main --help`
+    ready    importing the pipeline and constructing QueryGPT, i.e. everything
+             before the first embedding or LLM call
+    cached   answering a question from a warm response cache, end to end
+
+The median over --repeat runs is compared against --target-ms. Every stage is
+then run once more under `-X importtime` to list the imports that cost the most
+and which heavy dependencies (LlamaIndex, OpenAI, pydantic-ai, ...) it loaded;
+none of them should be needed until a question misses the caches.
+
+Run from the repository root:
+
+    python -m benchmarks.startup --repeat 5 --target-ms 300
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from src.agents.sql_generator import SQLGeneration
+from src.cache.response_cache import ResponseCache
+from src.config import DatabaseConfig, ResponseCacheConfig
+from src.db.engine import create_database
+from src.db.schema import schema_fingerprint
+from src.db.seed import create_sample_university_data
+from src.querygpt import DB_PATH
+
+from .stubs import HashEmbedding
+
+HEAVY = ("llama_index", "openai", "pydantic_ai", "neo4j", "psycopg")
+
+# Run in the child interpreter
+CHILD = """
+from src.querygpt import QueryGPT
+from src.config import ResponseCacheConfig
+pipeline = QueryGPT(response_cache_config=ResponseCacheConfig(path={cache!r}))
+if {question!r}:
+    result = pipeline.generate_query({question!r})
+    assert result.get("cache") == "exact", result
+"""
+
+_IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| +(\S+)")
+
+
+def stage_commands(cache: str, question: str) -> Dict[str, List[str]]:
+    return {
+        "help": ["-m", "src.main", "--help"],
+        "ready": ["-c", CHILD.format(cache=cache, question="")],
+        "cached": ["-c", CHILD.format(cache=cache, question=question)],
+    }
+
+
+def run(args: List[str], importtime: bool = False) -> Tuple[float, str]:
+    flags = ["-X", "importtime"] if importtime else []
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(
+            [sys.executable, *flags, *args],
+            capture_output=True,
+            text=True,
+            check=True,
+            # Stages must not need credentials before their first LLM call
+            env={**os.environ, "OPENAI_API_KEY": ""},
+        )
+    except subprocess.CalledProcessError as e:
+        lines = e.stderr.strip().splitlines()
+        reason = lines[-1] if lines else f"exit status {e.returncode}"
+        raise RuntimeError(reason) from e
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, proc.stderr
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Cumulative import ms of every package imported, from -X importtime."""
+    return {
+        match.group(2): int(match.group(1)) / 1000
+        for match in _IMPORT_LINE.finditer(stderr)
+        if "." not in match.group(2)
+    }
+
+
+def prepare_cache(path: str) -> str:
+    """Store the first sample question in a response cache; returns it."""
+    with open("examples/sample_queries.json", "r", encoding="utf-8") as f:
+        sample = json.load(f)[0]
+    database_config = DatabaseConfig.from_env()
+    if database_config.sqlite_path == DB_PATH:
+        create_sample_university_data(DB_PATH)
+    database = create_database(database_config)
+    cache = ResponseCache(
+        ResponseCacheConfig(path=path),
+        schema_fingerprint(database.load_schema()),
+        HashEmbedding,
+    )
+    cache.put(
+        sample["natural_language"],
+        SQLGeneration(sql=sample["sql"], explanation=sample["description"]),
+    )
+    cache.close()
+    database.close()
+    return sample["natural_language"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=300.0)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    # Packages every interpreter imports on start are not the CLI's doing
+    baseline = set(parse_importtime(run(["-c", "pass"], importtime=True)[1]))
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "responses.sqlite")
+        commands = stage_commands(cache, prepare_cache(cache))
+        print(f"{'stage':<8} {'p50 ms':>8} {'target':>8}  heavy imports")
+        failed = False
+        reports = {}
+        for stage, command in commands.items():
+            run(command)  # warm the OS file cache, as a second CLI run would
+            times = [run(command)[0] for _ in range(args.repeat)]
+            imports = parse_importtime(run(command, importtime=True)[1])
+            heavy = [name for name in HEAVY if name in imports]
+            median = statistics.median(times)
+            failed |= median > args.target_ms
+            print(
+                f"{stage:<8} {median:>8.0f} "
+                f"{'ok' if median <= args.target_ms else 'over':>8}  "
+                f"{', '.join(heavy) or '-'}"
+            )
+            reports[stage] = sorted(
+                (item for item in imports.items() if item[0] not in baseline),
+                key=lambda item: -item[1],
+            )
+
+    # Nested packages are counted within their importers too
+    for stage, imports in reports.items():
+        print(f"\nSlowest packages, {stage}:")
+        for name, ms in imports[: args.top]:
+            print(f"  {ms:>7.1f} ms  {name}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
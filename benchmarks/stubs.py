@@ -0,0 +1,113 @@
+"""
+Deterministic stand-ins for the LLM so benchmarks can run without network access.
+"""
+
+import asyncio
+import hashlib
+import re
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from typing import Any, Callable, Dict, List, Optional
+
+
+def render_request(messages: List[ModelMessage]) -> str:
+    """Flatten the system and user parts of a request into the text a provider sees."""
+    chunks: List[str] = []
+    for message in messages:
+        if not isinstance(message, ModelRequest):
+            continue
+        for part in message.parts:
+            if isinstance(part, (SystemPromptPart, UserPromptPart)) and isinstance(
+                part.content, str
+            ):
+                chunks.append(part.content)
+    return "\n".join(chunks)
+
+
+def canned_output(info: AgentInfo) -> Dict[str, Any]:
+    """Return a fixed, schema-valid answer for whichever agent is calling."""
+    properties = info.output_tools[0].parameters_json_schema.get("properties", {})
+    if "workspaces" in properties:
+        return {"workspaces": ["student_management"], "explanation": "stub"}
+    if "tables" in properties:
+        return {"tables": ["departments", "students"], "explanation": "stub"}
+    if "pruned_schema" in properties:
+        return {
+            "pruned_schema": {
+                "departments": ["id", "name"],
+                "students": ["id", "department_id"],
+            },
+            "explanation": "stub",
+        }
+    return {
+        "sql": (
+            "SELECT d.name, COUNT(s.id) AS student_count FROM departments d "
+            "LEFT JOIN students s ON d.id = s.department_id GROUP BY d.name"
+        ),
+        "explanation": "stub",
+    }
+
+
+def stub_model(
+    latency: float = 0.0,
+    on_request: Optional[Callable[[str, AgentInfo], None]] = None,
+) -> FunctionModel:
+    """
+    Build a FunctionModel that answers every agent with `canned_output`.
+
+    Args:
+        latency: Seconds to sleep per request to emulate a provider round-trip.
+        on_request: Optional callback receiving the rendered request text.
+    """
+
+    async def respond(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        if on_request is not None:
+            on_request(render_request(messages), info)
+        if latency:
+            await asyncio.sleep(latency)
+        return ModelResponse(
+            parts=[
+                ToolCallPart(
+                    tool_name=info.output_tools[0].name, args=canned_output(info)
+                )
+            ]
+        )
+
+    return FunctionModel(respond)
+
+
+class HashEmbedding(BaseEmbedding):
+    """
+    Bag-of-words embedding built by hashing tokens into a fixed number of buckets.
+
+    Texts sharing words get similar vectors, which is enough to exercise
+    similarity search deterministically and without an embedding API.
+    """
+
+    embed_dim: int = 256
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.embed_dim, dtype=np.float32)
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest, "little") % self.embed_dim] += 1.0
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._vector(text)
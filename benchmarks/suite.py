@@ -0,0 +1,506 @@
+"""
+Offline latency and execution-accuracy benchmark of the full pipeline.
+
+Runs every question of examples/sample_queries.json through QueryGPT with a
+hashed bag-of-words embedding and an empty local vector store, so no embedding
+API or Neo4j is needed, and reports per-stage latency percentiles, throughput,
+prompt tokens and execution accuracy: the share of questions whose generated
+SQL returns the same rows as the gold SQL. The LLM is one of:
+
+    oracle  answers each agent from the gold SQL (default). Accuracy is 100%
+            unless the pipeline itself breaks a correct answer, so this mode
+            tracks pipeline overhead and catches validation/execution
+            regressions.
+    replay  answers from a cassette recorded with `record`, offline and
+            deterministically, so accuracy reflects the recorded model.
+    record  calls --model and writes its answers to the cassette; needs
+            OPENAI_API_KEY.
+
+Token counts of the oracle and replay modes are pydantic-ai's estimates for the
+real prompts. --routing picks the pipeline's routing mode; the report counts
+how many questions each path answered, so the fast path's latency can be
+weighed against its accuracy (measured with replay or record, as the oracle
+always answers correctly). --speculative drafts SQL while columns are pruned
+and reports how often the draft was kept and the latency it saved per question.
+--candidates N votes among N concurrently generated SQL candidates; with
+--sql-error-rate the oracle answers that share of SQL requests with a wrong but
+valid query, which validation cannot catch but voting can. Save a run with
+--output and compare two runs with --compare to flag accuracy, latency,
+throughput and token regressions.
+
+Run from the repository root:
+
+    python -m benchmarks.suite --output base.json
+    python -m benchmarks.suite --output new.json
+    python -m benchmarks.suite --compare base.json new.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pydantic_ai.messages import ModelMessage, ModelResponse, ToolCallPart
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.stubs import HashEmbedding, canned_output
+from src.config import (
+    LlamaIndexConfig,
+    SpeculationConfig,
+    VectorStoreConfig,
+    VotingConfig,
+)
+from src.db.engine import Database
+from src.db.schema import load_database_schema
+from src.db.seed import create_sample_university_data
+from src.querygpt import QueryGPT
+from src.router import ROUTING_MODES
+from src.telemetry import METRICS
+
+# The question the current task is answering, so models know what to answer
+CURRENT_QUESTION: ContextVar[str] = ContextVar("benchmark_question")
+
+DEFAULT_CASSETTE = "benchmarks/cassettes/sample_queries.json"
+
+
+def _kind(parameters_json_schema: Dict[str, Any]) -> str:
+    """Which agent is asking, from the schema of its output tool."""
+    properties = parameters_json_schema.get("properties", {})
+    for kind in ("workspaces", "tables", "pruned_schema"):
+        if kind in properties:
+            return kind
+    return "sql"
+
+
+def _referenced(
+    sql: str, schema_info: Dict[str, Any]
+) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Tables mentioned in `sql`, with those of their columns it mentions."""
+    words = set(re.findall(r"\w+", sql.lower()))
+    tables = [t for t in schema_info if t.lower() in words]
+    pruned = {
+        t: [c["name"] for c in schema_info[t]["columns"] if c["name"].lower() in words]
+        for t in tables
+    }
+    return tables, pruned
+
+
+def oracle_model(
+    gold: Dict[str, str],
+    schema_info: Dict[str, Any],
+    latency: float = 0.0,
+    sql_error_rate: float = 0.0,
+) -> FunctionModel:
+    """
+    Answer every agent as if it had produced the gold SQL of the question.
+
+    A `sql_error_rate` share of SQL answers is replaced by a valid query
+    returning a random number instead.
+    """
+    rng = random.Random(0)
+
+    async def respond(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        sql = gold[CURRENT_QUESTION.get()]
+        kind = _kind(info.output_tools[0].parameters_json_schema)
+        tables, pruned = _referenced(sql, schema_info)
+        if kind == "tables":
+            args: Dict[str, Any] = {"tables": tables, "explanation": "oracle"}
+        elif kind == "pruned_schema":
+            args = {"pruned_schema": pruned, "explanation": "oracle"}
+        elif kind == "sql":
+            if rng.random() < sql_error_rate:
+                sql = f"SELECT {rng.randrange(10**9)} AS wrong"
+            args = {"sql": sql, "explanation": "oracle"}
+        else:
+            args = canned_output(info)
+        if latency:
+            await asyncio.sleep(latency)
+        return ModelResponse(
+            parts=[ToolCallPart(tool_name=info.output_tools[0].name, args=args)]
+        )
+
+    return FunctionModel(respond)
+
+
+def replay_model(
+    cassette: Dict[str, Dict[str, List[Dict[str, Any]]]], latency: float = 0.0
+) -> FunctionModel:
+    """
+    Answer from a recorded cassette.
+
+    The n-th request of an agent for a question gets the n-th recorded answer,
+    so SQL repairs replay too; a question or agent missing from the cassette
+    fails that question.
+    """
+    calls: Dict[Tuple[str, str], int] = {}
+
+    async def respond(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        question = CURRENT_QUESTION.get()
+        kind = _kind(info.output_tools[0].parameters_json_schema)
+        answers = cassette.get(question, {}).get(kind)
+        if not answers:
+            raise KeyError(f"No recorded {kind} answer for {question!r}")
+        n = calls.get((question, kind), 0)
+        calls[(question, kind)] = n + 1
+        if latency:
+            await asyncio.sleep(latency)
+        return ModelResponse(
+            parts=[
+                ToolCallPart(
+                    tool_name=info.output_tools[0].name,
+                    args=answers[min(n, len(answers) - 1)],
+                )
+            ]
+        )
+
+    return FunctionModel(respond)
+
+
+@dataclass(init=False)
+class RecordingModel(WrapperModel):
+    """Pass requests through to a real model and keep its answers per question."""
+
+    cassette: Dict[str, Dict[str, List[Dict[str, Any]]]]
+
+    def __init__(self, wrapped: Any) -> None:
+        super().__init__(wrapped)
+        self.cassette = {}
+
+    async def request(
+        self,
+        messages: List[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        response = await super().request(
+            messages, model_settings, model_request_parameters
+        )
+        tool = model_request_parameters.output_tools[0]
+        for part in response.parts:
+            if isinstance(part, ToolCallPart) and part.tool_name == tool.name:
+                kind = _kind(tool.parameters_json_schema)
+                answers = self.cassette.setdefault(CURRENT_QUESTION.get(), {})
+                answers.setdefault(kind, []).append(part.args_as_dict())
+        return response
+
+
+def _rows(database: Database, sql: str) -> List[Tuple[Any, ...]]:
+    with database.cursor() as cursor:
+        cursor.execute(sql)
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def _canonical(rows: List[Tuple[Any, ...]], ordered: bool) -> List[Tuple[Any, ...]]:
+    def value(v: Any) -> Any:
+        if isinstance(v, bool):
+            return int(v)
+        if isinstance(v, float):
+            return round(v, 6)
+        return v
+
+    canonical = [tuple(value(v) for v in row) for row in rows]
+    return canonical if ordered else sorted(canonical, key=repr)
+
+
+def same_result(database: Database, gold_sql: str, sql: str) -> bool:
+    """
+    Whether two queries return the same rows.
+
+    Column names are ignored and row order only matters when the gold query
+    has an ORDER BY.
+    """
+    ordered = re.search(r"\border\s+by\b", gold_sql, re.IGNORECASE) is not None
+    return _canonical(_rows(database, gold_sql), ordered) == _canonical(
+        _rows(database, sql), ordered
+    )
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+async def run_suite(
+    pipeline: QueryGPT,
+    samples: List[Dict[str, str]],
+    concurrency: int = 1,
+    repeat: int = 1,
+    mode: str | None = None,
+) -> Dict[str, Any]:
+    """Run every sample `repeat` times under routing `mode` and build the report."""
+    semaphore = asyncio.Semaphore(concurrency)
+    METRICS.reset()
+
+    async def one(sample: Dict[str, str]) -> Dict[str, Any]:
+        async with semaphore:
+            question = sample["natural_language"]
+            CURRENT_QUESTION.set(question)
+            result = await pipeline.agenerate_query(question, mode=mode)
+            telemetry = result.get("telemetry", {})
+            record: Dict[str, Any] = {
+                "question": question,
+                "path": (result.get("route") or {}).get("path"),
+                "speculation": result.get("speculation"),
+                "ms": telemetry.get("total_ms", 0.0),
+                "prompt_tokens": telemetry.get("prompt_tokens", 0),
+                "completion_tokens": telemetry.get("completion_tokens", 0),
+            }
+            if "error" in result:
+                return {**record, "correct": False, "error": result["error"]}
+            sql = result["sql_result"].sql
+            try:
+                correct = await asyncio.to_thread(
+                    same_result, pipeline.database, sample["sql"], sql
+                )
+            except pipeline.database.errors as e:
+                return {**record, "sql": sql, "correct": False, "error": str(e)}
+            return {**record, "sql": sql, "correct": correct}
+
+    start = time.perf_counter()
+    records: List[Dict[str, Any]] = []
+    for _ in range(repeat):
+        records.extend(await asyncio.gather(*(one(s) for s in samples)))
+    elapsed = time.perf_counter() - start
+
+    stages = {
+        name: {
+            key: stats[key]
+            for key in ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms")
+            if key in stats
+        }
+        for name, stats in METRICS.snapshot().items()
+    }
+    latencies = [r["ms"] for r in records]
+    paths: Dict[str, int] = {}
+    for r in records[: len(samples)]:
+        paths[r["path"] or "none"] = paths.get(r["path"] or "none", 0) + 1
+    drafts = [r["speculation"] for r in records if r["speculation"]]
+    speculation = (
+        {
+            "drafts": len(drafts),
+            "acceptance_rate": round(
+                sum(d["accepted"] for d in drafts) / len(drafts), 4
+            ),
+            "saved_ms_per_question": round(
+                sum(d["saved_ms"] for d in drafts) / len(records), 3
+            ),
+        }
+        if drafts
+        else None
+    )
+    return {
+        "questions": len(samples),
+        "runs": len(records),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_qps": round(len(records) / elapsed, 3),
+        "accuracy": round(sum(r["correct"] for r in records) / len(records), 4),
+        "p50_ms": round(_percentile(latencies, 0.50), 3),
+        "p95_ms": round(_percentile(latencies, 0.95), 3),
+        "prompt_tokens_per_question": round(
+            sum(r["prompt_tokens"] for r in records) / len(records), 1
+        ),
+        "completion_tokens_per_question": round(
+            sum(r["completion_tokens"] for r in records) / len(records), 1
+        ),
+        "paths": paths,
+        "speculation": speculation,
+        "stages": stages,
+        # Answers are deterministic across repeats, keep the first pass only
+        "results": records[: len(samples)],
+    }
+
+
+def compare(
+    base: Dict[str, Any],
+    new: Dict[str, Any],
+    tolerance: float = 0.2,
+    min_delta_ms: float = 1.0,
+) -> List[str]:
+    """
+    List the regressions of `new` against `base`.
+
+    Any accuracy drop or newly failing question is a regression. Latencies,
+    throughput and tokens regress when they worsen by more than `tolerance`
+    (relative); latencies must also worsen by at least `min_delta_ms`, so
+    sub-millisecond stages do not flag on noise.
+    """
+    regressions: List[str] = []
+    if new["accuracy"] < base["accuracy"]:
+        regressions.append(f"accuracy {base['accuracy']:.2%} -> {new['accuracy']:.2%}")
+    passed = {r["question"] for r in base["results"] if r["correct"]}
+    for r in new["results"]:
+        if r["question"] in passed and not r["correct"]:
+            regressions.append(
+                f"now failing: {r['question']} ({r.get('error') or 'wrong result'})"
+            )
+
+    def slower(label: str, before: float, after: float) -> None:
+        if after > before * (1 + tolerance) and after - before >= min_delta_ms:
+            regressions.append(f"{label} {before:.1f} ms -> {after:.1f} ms")
+
+    slower("p50", base["p50_ms"], new["p50_ms"])
+    slower("p95", base["p95_ms"], new["p95_ms"])
+    for name, stage in base["stages"].items():
+        if name in new["stages"]:
+            for key in ("p50_ms", "p95_ms"):
+                if key in stage and key in new["stages"][name]:
+                    slower(f"{name} {key[:3]}", stage[key], new["stages"][name][key])
+    if new["throughput_qps"] < base["throughput_qps"] * (1 - tolerance):
+        regressions.append(
+            f"throughput {base['throughput_qps']:.1f} -> "
+            f"{new['throughput_qps']:.1f} questions/s"
+        )
+    for key in ("prompt_tokens_per_question", "completion_tokens_per_question"):
+        if new[key] > base[key] * (1 + tolerance):
+            regressions.append(f"{key} {base[key]:.0f} -> {new[key]:.0f}")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"questions     {report['questions']} x {report['runs'] // report['questions']}"
+    )
+    print(f"accuracy      {report['accuracy']:.2%}")
+    print(f"throughput    {report['throughput_qps']:.1f} questions/s")
+    print(f"p50 / p95 ms  {report['p50_ms']:.1f} / {report['p95_ms']:.1f}")
+    if report.get("paths"):
+        print(
+            "paths         "
+            + ", ".join(f"{n} {path}" for path, n in report["paths"].items())
+        )
+    speculation = report.get("speculation")
+    if speculation:
+        print(
+            f"speculation   {speculation['acceptance_rate']:.0%} of "
+            f"{speculation['drafts']} drafts accepted, "
+            f"{speculation['saved_ms_per_question']:.1f} ms saved per question"
+        )
+    print(
+        f"tokens/q      {report['prompt_tokens_per_question']:.0f} prompt, "
+        f"{report['completion_tokens_per_question']:.0f} completion"
+    )
+    print(f"\n{'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stage in report["stages"].items():
+        print(
+            f"{name:<16}{stage.get('count', 0):>7}{stage.get('p50_ms', 0):>10.2f}"
+            f"{stage.get('p95_ms', 0):>10.2f}{stage.get('p99_ms', 0):>10.2f}"
+        )
+    failed = [r for r in report["results"] if not r["correct"]]
+    if failed:
+        print("\nincorrect:")
+        for r in failed:
+            print(f"  {r['question']}: {r.get('error') or r.get('sql')}")
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    with open(args.questions, "r", encoding="utf-8") as f:
+        samples = [s for s in json.load(f) if s.get("sql", "...") != "..."]
+    latency = args.llm_latency_ms / 1000
+
+    recorder: RecordingModel | None = None
+    if args.mode == "record":
+        recorder = RecordingModel(args.model)
+        model: Any = recorder
+    elif args.mode == "replay":
+        with open(args.cassette, "r", encoding="utf-8") as f:
+            model = replay_model(json.load(f), latency)
+    else:
+        create_sample_university_data()
+        gold = {s["natural_language"]: s["sql"] for s in samples}
+        model = oracle_model(gold, load_database_schema(), latency, args.sql_error_rate)
+
+    pipeline = QueryGPT(
+        llama_config=LlamaIndexConfig(embed_model=HashEmbedding()),
+        vector_store_config=VectorStoreConfig(
+            backend="local", local_path=tempfile.mkdtemp()
+        ),
+        agent_model=model,
+        speculation_config=SpeculationConfig() if args.speculative else None,
+        voting_config=VotingConfig(candidates=args.candidates)
+        if args.candidates > 1
+        else None,
+    )
+    # Keep the one-off imports of the first question out of the latencies
+    pipeline.warm_up()
+    report = asyncio.run(
+        run_suite(pipeline, samples, args.concurrency, args.repeat, args.routing)
+    )
+    report["mode"] = args.mode
+    report["routing"] = args.routing
+    report["speculative"] = args.speculative
+    report["candidates"] = args.candidates
+    if recorder is not None:
+        os.makedirs(os.path.dirname(args.cassette) or ".", exist_ok=True)
+        with open(args.cassette, "w", encoding="utf-8") as f:
+            json.dump(recorder.cassette, f, indent=1)
+        print(f"Recorded {len(recorder.cassette)} questions to {args.cassette}")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--mode", choices=["oracle", "replay", "record"], default="oracle"
+    )
+    parser.add_argument("--cassette", type=str, default=DEFAULT_CASSETTE)
+    parser.add_argument(
+        "--model", type=str, default="openai:gpt-4o-mini", help="Model to record."
+    )
+    parser.add_argument("--questions", type=str, default="examples/sample_queries.json")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--routing", choices=ROUTING_MODES, default="full")
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument("--candidates", type=int, default=1)
+    parser.add_argument("--sql-error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write the report as JSON."
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        nargs=2,
+        metavar=("BASE", "NEW"),
+        help="Compare two saved reports and exit 1 on regressions.",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, "r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+        regressions = compare(*reports, tolerance=args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if not regressions:
+            print("No regressions.")
+        sys.exit(1 if regressions else 0)
+
+    # Pipeline progress and error messages are printed, keep them apart
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Compare sample-query retrieval latency of the local and Neo4j vector stores.
+
+Fills a LocalVectorStore with synthetic sample queries and measures top-k
+retrieval with the flat and IVF indexes, with and without hybrid keyword
+fusion, plus the time to reopen the persisted store from disk. When NEO4J_URI
+is set the same samples are loaded into Neo4j and queried for comparison;
+otherwise Neo4j is approximated by the flat local search plus a simulated
+network round-trip of --neo4j-rtt-ms, and the row is labelled as simulated.
+
+Run from the repository root:
+
+    python -m benchmarks.vector_store
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import VectorStore, VectorStoreQuery
+from typing import Callable, List
+
+from benchmarks.stubs import HashEmbedding
+from src.local_vector_store import LocalVectorStore
+
+SUBJECTS = ["students", "courses", "professors", "departments", "grades", "attendance"]
+FILTERS = ["in 2023", "per department", "with credits above 3", "this semester"]
+VERBS = ["How many", "List all", "Average of", "Top ten"]
+
+
+def synthetic_samples(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        f"Query: {rng.choice(VERBS)} {rng.choice(SUBJECTS)} {rng.choice(FILTERS)} "
+        f"#{i}\nSQL: SELECT * FROM {rng.choice(SUBJECTS)} WHERE id = {i}"
+        for i in range(n)
+    ]
+
+
+def build_nodes(texts: List[str], embed_model: HashEmbedding) -> List[TextNode]:
+    embeddings = embed_model.get_text_embedding_batch(texts)
+    return [
+        TextNode(
+            id_=f"sample_{i}",
+            text=text,
+            embedding=embedding,
+            relationships={
+                NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"sample_{i}")
+            },
+        )
+        for i, (text, embedding) in enumerate(zip(texts, embeddings))
+    ]
+
+
+def timed(
+    store: VectorStore,
+    queries: List[VectorStoreQuery],
+    delay: Callable[[], None] = lambda: None,
+) -> List[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        delay()
+        store.query(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label: str, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<28}{statistics.median(latencies):>10.3f}{p95:>10.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--neo4j-rtt-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    embed_model = HashEmbedding()
+    texts = synthetic_samples(args.samples)
+    persist_dir = tempfile.mkdtemp()
+
+    start = time.perf_counter()
+    store = LocalVectorStore(persist_dir=persist_dir, hybrid_search=False)
+    nodes = build_nodes(texts, embed_model)
+    for i in range(0, len(nodes), 1000):
+        store.add(nodes[i : i + 1000])
+    print(f"Ingested {store.node_count} samples in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    store = LocalVectorStore(persist_dir=persist_dir, hybrid_search=False)
+    print(f"Reopened persisted store in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    rng = random.Random(1)
+    questions = [
+        f"{rng.choice(VERBS)} {rng.choice(SUBJECTS)} {rng.choice(FILTERS)}"
+        for _ in range(args.queries)
+    ]
+    dense = [
+        VectorStoreQuery(
+            query_embedding=embed_model.get_query_embedding(q),
+            similarity_top_k=args.top_k,
+        )
+        for q in questions
+    ]
+    hybrid = [
+        VectorStoreQuery(
+            query_embedding=d.query_embedding,
+            query_str=q,
+            similarity_top_k=args.top_k,
+            mode="hybrid",
+        )
+        for d, q in zip(dense, questions)
+    ]
+
+    print(f"{'backend':<28}{'p50 ms':>10}{'p95 ms':>10}")
+    report("local flat", timed(store, dense))
+
+    ivf = LocalVectorStore(persist_dir=persist_dir, index_type="ivf")
+    start = time.perf_counter()
+    ivf.query(dense[0])
+    print(f"(IVF index trained in {time.perf_counter() - start:.2f}s)")
+    report("local ivf", timed(ivf, dense))
+    report("local ivf + bm25", timed(ivf, hybrid))
+
+    if os.getenv("NEO4J_URI"):
+        from llama_index.vector_stores.neo4jvector import Neo4jVectorStore
+
+        neo4j = Neo4jVectorStore(
+            username=os.getenv("NEO4J_USERNAME", "neo4j"),
+            password=os.getenv("NEO4J_PASSWORD", ""),
+            url=os.environ["NEO4J_URI"],
+            embedding_dimension=embed_model.embed_dim,
+            index_name="querygpt_benchmark",
+            node_label="QueryGPTBenchmark",
+        )
+        for i in range(0, len(nodes), 1000):
+            neo4j.add(nodes[i : i + 1000])
+        report("neo4j", timed(neo4j, dense))
+    else:
+        rtt = args.neo4j_rtt_ms / 1000
+        report(
+            f"neo4j (simulated {args.neo4j_rtt_ms:g}ms rtt)",
+            timed(store, dense, delay=lambda: time.sleep(rtt)),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any
+from ..prompt_budget import PromptBudget, key_columns
+from ..telemetry import record_usage
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
 
 
 class PrunedSchemaSelection(BaseModel):
@@ -8,40 +12,96 @@ class PrunedSchemaSelection(BaseModel):
     explanation: str = Field(..., description="Explanation")
 
 
+SYSTEM_PROMPT = """
+Based on the user query and the tables that have been selected, determine which columns are relevant to answer the query.
+
+For each table, return only the columns that are necessary to answer the query.
+Respond with a JSON object with the following structure:
+{
+    "pruned_schema": {
+        "table_name1": ["column1", "column2"],
+        "table_name2": ["column1", "column3"]
+    },
+    "explanation": "Brief explanation of why these columns were chosen"
+}
+"""
+
+
 class ColumnPruneAgent:
-    def __init__(self, schema_info: Dict[str, Any]) -> None:
+    def __init__(
+        self,
+        schema_info: Dict[str, Any],
+        model: "Model | str" = "gpt-4o-mini",
+        budget: PromptBudget | None = None,
+    ) -> None:
+        """
+        Args:
+            schema_info: Database schema metadata.
+            model: pydantic-ai model used for column pruning.
+            budget: Token budget for the schema text; selected tables over the
+                column_pruning budget are cut down to their key columns and
+                the columns relevant to the query.
+        """
         self.schema_info = schema_info
+        self.budget = budget
+        self.key_columns = key_columns(schema_info)
+        from pydantic_ai import Agent
 
-    def prune_columns(self, query: str, tables: List[str]) -> PrunedSchemaSelection:
-        schema_text = "\n".join(
-            [
-                f"Table '{t}': {', '.join([c['name'] for c in self.schema_info[t]['columns']])}"
-                for t in tables
-            ]
-        )
-        prompt = f"""
-        Based on the following user query and the tables that have been selected, determine which columns are relevant to answer the query.
-
-        User Query: "{query}"
-
-        Selected Tables Schema:
-        {schema_text}
-
-        For each table, return only the columns that are necessary to answer the query.
-        Respond with a JSON object with the following structure:
-        {{
-            "pruned_schema": {{
-                "table_name1": ["column1", "column2"],
-                "table_name2": ["column1", "column3"]
-            }},
-            "explanation": "Brief explanation of why these columns were chosen"
-        }}
-        """
-        agent = Agent(
-            model="gpt-4o-mini",
-            system_prompt=prompt,
+        self.agent: Agent[None, PrunedSchemaSelection] = Agent(
+            model=model,
+            system_prompt=SYSTEM_PROMPT,
             output_type=PrunedSchemaSelection,
             retries=3,
         )
-        result: PrunedSchemaSelection = agent.run_sync(query).output
+
+    def _columns(self, table: str) -> List[str]:
+        return [c["name"] for c in self.schema_info[table]["columns"]]
+
+    def _user_prompt(
+        self,
+        query: str,
+        tables: List[str],
+        candidates: Dict[str, List[str]] | None,
+    ) -> str:
+        # Linked candidates narrow each table to the columns worth considering
+        candidates = candidates or {}
+        columns = {t: candidates.get(t) or self._columns(t) for t in tables}
+        if self.budget is not None:
+            # The tables are already chosen, so only their columns are cut
+            columns = self.budget.fit_schema(
+                query,
+                columns,
+                self.budget.limit("column_pruning"),
+                self.key_columns,
+                drop_tables=False,
+            )
+        schema_text = "\n".join(
+            [f"Table '{t}': {', '.join(cols)}" for t, cols in columns.items()]
+        )
+        return f"""Selected Tables Schema:
+{schema_text}
+
+User Query: "{query}"
+"""
+
+    def prune_columns(
+        self,
+        query: str,
+        tables: List[str],
+        candidates: Dict[str, List[str]] | None = None,
+    ) -> PrunedSchemaSelection:
+        run = self.agent.run_sync(self._user_prompt(query, tables, candidates))
+        record_usage(run.usage(), self.agent.model)
+        result: PrunedSchemaSelection = run.output
+        return result
+
+    async def aprune_columns(
+        self,
+        query: str,
+        tables: List[str],
+        candidates: Dict[str, List[str]] | None = None,
+    ) -> PrunedSchemaSelection:
+        run = await self.agent.run(self._user_prompt(query, tables, candidates))
+        record_usage(run.usage(), self.agent.model)
+        result: PrunedSchemaSelection = run.output
         return result
@@ -1,6 +1,13 @@
+import asyncio
+import time
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from typing import List
+from typing import TYPE_CHECKING, List
+from ..telemetry import annotate, record_usage
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
+
+    from .intent_classifier import EmbeddingIntentClassifier
 
 
 class WorkspaceClassification(BaseModel):
@@ -9,7 +16,12 @@ class WorkspaceClassification(BaseModel):
 
 
 class IntentAgent:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        model: "Model | str" = "gpt-4o-mini",
+        classifier: "EmbeddingIntentClassifier | None" = None,
+    ) -> None:
+        self.classifier = classifier
         self.workspaces = [
             "student_management",
             "course_information",
@@ -18,25 +30,58 @@ class IntentAgent:
             "department_statistics",
             "attendance_tracking",
         ]
-
-    def determine_intent(self, user_query: str) -> WorkspaceClassification:
+        # The system prompt only depends on the workspaces, so it is identical for
+        # every call and the provider can cache it.
         prompt = f"""
-        Based on the following user query, determine which workspace or workspaces it belongs to.
+        Based on the user query, determine which workspace or workspaces it belongs to.
         The available workspaces are: {", ".join(self.workspaces)}
 
-        User Query: "{user_query}"
-
         Respond with a JSON object with the following structure:
         {{
             "workspaces": ["workspace1", "workspace2"],
             "explanation": "Brief explanation of why these workspaces were chosen"
         }}
         """
-        agent: Agent[str, WorkspaceClassification] = Agent(
-            model="gpt-4o-mini",
+        from pydantic_ai import Agent
+
+        self.agent: Agent[None, WorkspaceClassification] = Agent(
+            model=model,
             system_prompt=prompt,
             output_type=WorkspaceClassification,
             retries=3,
         )
-        result: WorkspaceClassification = agent.run_sync(user_query).output
+
+    @staticmethod
+    def _user_prompt(user_query: str) -> str:
+        return f'User Query: "{user_query}"'
+
+    def determine_intent(self, user_query: str) -> WorkspaceClassification:
+        if self.classifier is not None:
+            fast = self.classifier.classify(user_query)
+            if fast is not None:
+                annotate(cache_hit="classifier")
+                return fast
+
+        start = time.perf_counter()
+        run = self.agent.run_sync(self._user_prompt(user_query))
+        record_usage(run.usage(), self.agent.model)
+        result: WorkspaceClassification = run.output
+        if self.classifier is not None:
+            self.classifier.record_fallback_latency(time.perf_counter() - start)
+        return result
+
+    async def adetermine_intent(self, user_query: str) -> WorkspaceClassification:
+        if self.classifier is not None:
+            # Embedding the query is a blocking call, keep it off the loop
+            fast = await asyncio.to_thread(self.classifier.classify, user_query)
+            if fast is not None:
+                annotate(cache_hit="classifier")
+                return fast
+
+        start = time.perf_counter()
+        run = await self.agent.run(self._user_prompt(user_query))
+        record_usage(run.usage(), self.agent.model)
+        result: WorkspaceClassification = run.output
+        if self.classifier is not None:
+            self.classifier.record_fallback_latency(time.perf_counter() - start)
         return result
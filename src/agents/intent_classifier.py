@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+import numpy as np
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from ..config import IntentClassifierConfig
+from .intent_agent import WorkspaceClassification
+
+if TYPE_CHECKING:
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+
+WORKSPACE_DESCRIPTIONS: Dict[str, str] = {
+    "student_management": (
+        "Students, their names, emails, dates of birth, departments and enrollments."
+    ),
+    "course_information": (
+        "Courses, titles, codes, credits, schedules, classrooms and meeting times."
+    ),
+    "academic_performance": (
+        "Grades, results and academic performance of students in their courses."
+    ),
+    "professor_workload": (
+        "Professors, the courses they teach and their teaching load."
+    ),
+    "department_statistics": (
+        "Departments, buildings and aggregate counts of students, professors "
+        "and courses per department."
+    ),
+    "attendance_tracking": (
+        "Attendance records, presence and absence of students on given dates."
+    ),
+}
+
+
+class EmbeddingIntentClassifier:
+    """
+    Closed-set workspace classifier using cosine similarity to embedding centroids.
+
+    Each workspace centroid is the mean of its description embedding and the
+    embeddings of its labelled example questions. Everything is embedded once on
+    first use; classifying a query then costs one query embedding and a single
+    matrix-vector product. Queries whose best score is too low, or too close to
+    the runner-up, are left to the LLM.
+    """
+
+    def __init__(
+        self,
+        workspaces: List[str],
+        embed_model: "BaseEmbedding",
+        config: IntentClassifierConfig | None = None,
+    ) -> None:
+        self.workspaces = workspaces
+        self.embed_model = embed_model
+        self.config = config or IntentClassifierConfig()
+        self._centroids: np.ndarray | None = None
+        self._lock = threading.Lock()
+
+        # Counters for reporting how often the fast path is enough
+        self.fast_hits = 0
+        self.fallbacks = 0
+        self._fast_seconds = 0.0
+        self._llm_seconds = 0.0
+        self._llm_calls = 0
+
+    def _load_examples(self) -> List[Tuple[str, str]]:
+        try:
+            with open(self.config.examples_path, "r", encoding="utf-8") as f:
+                samples: List[Dict[str, Any]] = json.load(f)
+        except Exception as e:
+            print(f"Error loading intent examples: {e}")
+            return []
+        return [
+            (sample["natural_language"], workspace)
+            for sample in samples
+            for workspace in sample.get("workspaces", [])
+            if workspace in self.workspaces
+        ]
+
+    def _build_centroids(self) -> np.ndarray:
+        labelled: List[Tuple[str, str]] = [
+            (WORKSPACE_DESCRIPTIONS.get(w, w.replace("_", " ")), w)
+            for w in self.workspaces
+        ]
+        labelled.extend(self._load_examples())
+        vectors = np.asarray(
+            self.embed_model.get_text_embedding_batch([text for text, _ in labelled]),
+            dtype=np.float32,
+        )
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+        labels = np.array([self.workspaces.index(w) for _, w in labelled])
+
+        centroids = np.stack(
+            [vectors[labels == i].mean(axis=0) for i in range(len(self.workspaces))]
+        )
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True).clip(min=1e-12)
+        return centroids
+
+    def _ensure_centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    self._centroids = self._build_centroids()
+        return self._centroids
+
+    def scores(self, query: str) -> np.ndarray:
+        """Cosine similarity of `query` to every workspace centroid."""
+        centroids = self._ensure_centroids()
+        vector = np.asarray(
+            self.embed_model.get_query_embedding(query), dtype=np.float32
+        )
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+        return centroids @ vector
+
+    def classify(self, query: str) -> WorkspaceClassification | None:
+        """Return the workspace for `query`, or None when the LLM should decide."""
+        start = time.perf_counter()
+        scores = self.scores(query)
+        order = np.argsort(scores)[::-1]
+        top = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else -1.0
+        elapsed = time.perf_counter() - start
+
+        if top < self.config.min_score or top - runner_up < self.config.margin:
+            self.fallbacks += 1
+            return None
+        self.fast_hits += 1
+        self._fast_seconds += elapsed
+        workspace = self.workspaces[int(order[0])]
+        return WorkspaceClassification(
+            workspaces=[workspace],
+            explanation=(
+                f"Closest workspace by embedding similarity ({top:.3f}, "
+                f"margin {top - runner_up:.3f})."
+            ),
+        )
+
+    def record_fallback_latency(self, seconds: float) -> None:
+        """Record how long an LLM classification took after the fast path declined."""
+        self._llm_seconds += seconds
+        self._llm_calls += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.fast_hits + self.fallbacks
+        fast_ms = self._fast_seconds / self.fast_hits * 1000 if self.fast_hits else 0.0
+        llm_ms = self._llm_seconds / self._llm_calls * 1000 if self._llm_calls else None
+        return {
+            "queries": total,
+            "fast_hits": self.fast_hits,
+            "fallbacks": self.fallbacks,
+            "fallback_rate": self.fallbacks / total if total else 0.0,
+            "fast_path_ms": fast_ms,
+            "llm_ms": llm_ms,
+            # Each fast hit saves roughly one LLM classification round-trip
+            "saved_ms_per_query": (
+                (llm_ms - fast_ms) * self.fast_hits / total
+                if llm_ms is not None and total
+                else None
+            ),
+        }
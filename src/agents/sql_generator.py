@@ -1,7 +1,11 @@
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from llama_index.core.base.base_retriever import BaseRetriever
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any
+from ..prompt_budget import PromptBudget
+from ..telemetry import annotate, record_usage
+
+if TYPE_CHECKING:
+    from llama_index.core.base.base_retriever import BaseRetriever
+    from pydantic_ai.models import Model
 
 
 class SQLGeneration(BaseModel):
@@ -9,25 +13,8 @@ class SQLGeneration(BaseModel):
     explanation: str = Field(..., description="Explanation of the SQL query")
 
 
-class SQLGenerator:
-    def __init__(self, schema_info: Dict[str, Any], retriever: BaseRetriever) -> None:
-        self.schema_info = schema_info
-        self.retriever = retriever
-
-    def generate_sql(
-        self,
-        query: str,
-        workspaces: List[str],
-        tables: List[str],
-        pruned: Dict[str, List[str]],
-        samples: List[str],
-    ) -> SQLGeneration:
-        schema_text = "\n".join(
-            [f"Table '{t}': {', '.join(pruned.get(t, []))}" for t in tables]
-        )
-        samples_text = "\n\n".join(samples)
-        prompt = f"""
-You are an expert SQL generator. Convert the following natural language question into a syntactically correct SQL query.
+SYSTEM_PROMPT = """
+You are an expert SQL generator. Convert the natural language question into a syntactically correct SQL query.
 Use the provided database schema to inform your query construction.
 Instructions:
 - Given an input question, first create a syntactically correct query to run.
@@ -37,26 +24,197 @@ Instructions:
 - Pay attention to which column belongs to which table.
 - Qualify column names with the table name when needed.
 
-- Database Schema:
+Respond with a JSON object with the following structure:
+{
+    "sql": "The SQL query",
+    "explanation": "Step-by-step explanation of how the query works"
+}
+"""
+
+
+DIALECT_NAMES = {"sqlite": "SQLite", "postgresql": "PostgreSQL"}
+
+
+class SQLGenerator:
+    def __init__(
+        self,
+        schema_info: Dict[str, Any],
+        retriever: "BaseRetriever",
+        model: "Model | str" = "gpt-4o-mini",
+        dialect: str = "sqlite",
+        budget: PromptBudget | None = None,
+    ) -> None:
+        """
+        Args:
+            schema_info: Database schema metadata.
+            retriever: Retriever of few-shot samples.
+            model: pydantic-ai model used for SQL generation.
+            dialect: SQL dialect the queries are written in.
+            budget: Token budget for the prompt; samples are de-duplicated and
+                packed into what the schema leaves of the sql_generation budget.
+        """
+        self.schema_info = schema_info
+        self.retriever = retriever
+        self.dialect = dialect
+        self.budget = budget
+        # pydantic-ai is only imported once a pipeline builds its agents
+        from pydantic_ai import Agent
+
+        # The dialect is fixed per instance, so the system prompt stays static
+        self.agent: Agent[None, SQLGeneration] = Agent(
+            model=model,
+            system_prompt=SYSTEM_PROMPT
+            + f"\nWrite the query in the {DIALECT_NAMES.get(dialect, dialect)} "
+            "SQL dialect.\n",
+            output_type=SQLGeneration,
+            retries=3,
+        )
+
+    @staticmethod
+    def _schema_text(
+        tables: List[str],
+        pruned: Dict[str, List[str]],
+        joins: List[str] | None = None,
+    ) -> str:
+        schema_text = "\n".join(
+            [f"Table '{t}': {', '.join(pruned.get(t, []))}" for t in tables]
+        )
+        joins_text = (
+            "\n- Join the tables using these foreign key conditions:\n"
+            + "\n".join(joins)
+            + "\n"
+            if joins
+            else ""
+        )
+        return f"""- Database Schema:
 {schema_text}
+{joins_text}"""
 
+    @classmethod
+    def _user_prompt(
+        cls,
+        query: str,
+        tables: List[str],
+        pruned: Dict[str, List[str]],
+        samples: List[str],
+        joins: List[str] | None = None,
+    ) -> str:
+        samples_text = "\n\n".join(samples)
+        return f"""{cls._schema_text(tables, pruned, joins)}
 - Here are some examples of questions and their corresponding SQL queries:
 {samples_text.strip()}
 
 Now, generate an SQL query for the following question:
 Question: {query}
+"""
 
-Respond with a JSON object with the following structure:
-{{
-    "sql": "The SQL query",
-    "explanation": "Step-by-step explanation of how the query works"
-}}
+    def _fit_samples(
+        self,
+        query: str,
+        tables: List[str],
+        pruned: Dict[str, List[str]],
+        samples: List[str],
+        joins: List[str] | None = None,
+    ) -> List[str]:
+        if self.budget is None:
+            return samples
+        base = self.budget.count(self._user_prompt(query, tables, pruned, [], joins))
+        fitted = self.budget.select_samples(
+            samples, self.budget.limit("sql_generation") - base
+        )
+        annotate(samples=len(fitted), samples_dropped=len(samples) - len(fitted))
+        return fitted
+
+    def generate_sql(
+        self,
+        query: str,
+        workspaces: List[str],
+        tables: List[str],
+        pruned: Dict[str, List[str]],
+        samples: List[str],
+        joins: List[str] | None = None,
+    ) -> SQLGeneration:
+        samples = self._fit_samples(query, tables, pruned, samples, joins)
+        run = self.agent.run_sync(
+            self._user_prompt(query, tables, pruned, samples, joins)
+        )
+        record_usage(run.usage(), self.agent.model)
+        result: SQLGeneration = run.output
+        return result
+
+    async def agenerate_sql(
+        self,
+        query: str,
+        workspaces: List[str],
+        tables: List[str],
+        pruned: Dict[str, List[str]],
+        samples: List[str],
+        joins: List[str] | None = None,
+        temperature: float | None = None,
+    ) -> SQLGeneration:
+        from pydantic_ai.settings import ModelSettings
+
+        samples = self._fit_samples(query, tables, pruned, samples, joins)
+        run = await self.agent.run(
+            self._user_prompt(query, tables, pruned, samples, joins),
+            model_settings=ModelSettings(temperature=temperature)
+            if temperature is not None
+            else None,
+        )
+        record_usage(run.usage(), self.agent.model)
+        result: SQLGeneration = run.output
+        return result
+
+    @classmethod
+    def _repair_prompt(
+        cls,
+        query: str,
+        tables: List[str],
+        pruned: Dict[str, List[str]],
+        failed_sql: str,
+        error: str,
+        joins: List[str] | None = None,
+    ) -> str:
+        return f"""{cls._schema_text(tables, pruned, joins)}
+- This SQL query was generated for the question below but cannot run:
+{failed_sql}
+
+- Database error:
+{error}
+
+Fix the query so that it runs and answers the question.
+Question: {query}
 """
-        agent: Agent[str, SQLGeneration] = Agent(
-            model="gpt-4o-mini",
-            system_prompt=prompt,
-            output_type=SQLGeneration,
-            retries=3,
+
+    def repair_sql(
+        self,
+        query: str,
+        tables: List[str],
+        pruned: Dict[str, List[str]],
+        failed_sql: str,
+        error: str,
+        joins: List[str] | None = None,
+    ) -> SQLGeneration:
+        """Ask for a corrected query given the failing SQL and the database error."""
+        run = self.agent.run_sync(
+            self._repair_prompt(query, tables, pruned, failed_sql, error, joins)
+        )
+        record_usage(run.usage(), self.agent.model)
+        result: SQLGeneration = run.output
+        return result
+
+    async def arepair_sql(
+        self,
+        query: str,
+        tables: List[str],
+        pruned: Dict[str, List[str]],
+        failed_sql: str,
+        error: str,
+        joins: List[str] | None = None,
+    ) -> SQLGeneration:
+        run = await self.agent.run(
+            self._repair_prompt(query, tables, pruned, failed_sql, error, joins)
         )
-        result: SQLGeneration = agent.run_sync(query).output
+        record_usage(run.usage(), self.agent.model)
+        result: SQLGeneration = run.output
         return result
@@ -1,6 +1,10 @@
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any
+from ..prompt_budget import PromptBudget, key_columns
+from ..telemetry import record_usage
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
 
 
 class TableSelection(BaseModel):
@@ -8,37 +12,115 @@ class TableSelection(BaseModel):
     explanation: str = Field(..., description="Explanation for table selection")
 
 
-class TableAgent:
-    def __init__(self, schema_info: Dict[str, Any]) -> None:
-        self.schema_info = schema_info
+RESPONSE_FORMAT = """
+        Respond with a JSON object with the following structure:
+        {
+            "tables": ["table1", "table2"],
+            "explanation": "Brief explanation of why these tables were chosen"
+        }
+        """
 
-    def determine_tables(self, query: str, workspaces: List[str]) -> TableSelection:
-        schema_text = "\n".join(
-            [
-                f"Table '{t}': {', '.join([c['name'] for c in info['columns']])}"
-                for t, info in self.schema_info.items()
-            ]
-        )
-        prompt = f"""
-        Based on the following user query and database schema, determine which tables are needed to answer the query.
 
-        User Query: "{query}"
-        Workspaces: {workspaces}
+class TableAgent:
+    def __init__(
+        self,
+        schema_info: Dict[str, Any],
+        model: "Model | str" = "gpt-4o-mini",
+        linked_schema: bool = False,
+        budget: PromptBudget | None = None,
+    ) -> None:
+        """
+        Args:
+            schema_info: Database schema metadata.
+            model: pydantic-ai model used for table selection.
+            linked_schema: Send a per-query slice of candidate tables in the user
+                message instead of the full schema in the system prompt. Used
+                with a SchemaIndex on schemas too large to list in full.
+            budget: Token budget for the schema text. A full schema over the
+                table_selection budget is sent per query, trimmed to the
+                tables most relevant to it, as with `linked_schema`.
+        """
+        self.schema_info = schema_info
+        self.budget = budget
+        self.key_columns = key_columns(schema_info)
+        if budget is not None and not linked_schema:
+            full = self._schema_text({t: self._columns(t) for t in schema_info})
+            linked_schema = budget.count(full) > budget.limit("table_selection")
+        self.linked_schema = linked_schema
+        if linked_schema:
+            prompt = (
+                """
+        Based on the user query and the candidate tables listed with it, determine which tables are needed to answer the query.
+        """
+                + RESPONSE_FORMAT
+            )
+        else:
+            # The schema is fixed for the lifetime of the agent, so it lives in the
+            # system prompt and forms a cacheable prefix shared by every call.
+            prompt = (
+                f"""
+        Based on the user query and the following database schema, determine which tables are needed to answer the query.
 
         Database Schema:
-        {schema_text}
-
-        Respond with a JSON object with the following structure:
-        {{
-            "tables": ["table1", "table2"],
-            "explanation": "Brief explanation of why these tables were chosen"
-        }}
+        {self._schema_text({t: self._columns(t) for t in schema_info})}
         """
-        agent: Agent[str, TableSelection] = Agent(
-            model="gpt-4o-mini",
+                + RESPONSE_FORMAT
+            )
+        from pydantic_ai import Agent
+
+        self.agent: Agent[None, TableSelection] = Agent(
+            model=model,
             system_prompt=prompt,
             output_type=TableSelection,
             retries=3,
         )
-        result: TableSelection = agent.run_sync(query).output
+
+    def _columns(self, table: str) -> List[str]:
+        return [c["name"] for c in self.schema_info[table]["columns"]]
+
+    @staticmethod
+    def _schema_text(columns: Dict[str, List[str]]) -> str:
+        return "\n".join(
+            f"Table '{t}': {', '.join(cols)}" for t, cols in columns.items()
+        )
+
+    def _user_prompt(
+        self,
+        query: str,
+        workspaces: List[str],
+        candidates: Dict[str, List[str]] | None,
+    ) -> str:
+        prompt = f'User Query: "{query}"\nWorkspaces: {workspaces}'
+        if self.linked_schema:
+            linked = candidates or {t: self._columns(t) for t in self.schema_info}
+            if self.budget is not None:
+                linked = self.budget.fit_schema(
+                    query,
+                    linked,
+                    self.budget.limit("table_selection"),
+                    self.key_columns,
+                )
+            prompt += f"\n\nCandidate Tables:\n{self._schema_text(linked)}"
+        return prompt
+
+    def determine_tables(
+        self,
+        query: str,
+        workspaces: List[str],
+        candidates: Dict[str, List[str]] | None = None,
+    ) -> TableSelection:
+        run = self.agent.run_sync(self._user_prompt(query, workspaces, candidates))
+        record_usage(run.usage(), self.agent.model)
+        result: TableSelection = run.output
+        return result
+
+    async def adetermine_tables(
+        self,
+        query: str,
+        workspaces: List[str],
+        candidates: Dict[str, List[str]] | None = None,
+    ) -> TableSelection:
+        run = await self.agent.run(self._user_prompt(query, workspaces, candidates))
+        record_usage(run.usage(), self.agent.model)
+        result: TableSelection = run.output
         return result
@@ -0,0 +1,267 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from typing import TYPE_CHECKING, Callable, List, Literal
+
+from ..agents.sql_generator import SQLGeneration
+from ..config import ResponseCacheConfig
+from ..utils import normalize_query
+
+if TYPE_CHECKING:
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+
+
+@dataclass
+class CacheHit:
+    result: SQLGeneration
+    level: Literal["exact", "semantic"]
+    score: float
+
+
+@dataclass
+class _Entry:
+    question: str
+    result: SQLGeneration
+    embedding: np.ndarray | None
+    created_at: float
+    # "<model name>:<dimension>" the embedding was computed with
+    embedding_model: str | None = None
+
+
+class ResponseCache:
+    """
+    Two-level cache mapping natural language questions to generated SQL.
+
+    The first level is an exact-match LRU keyed on the normalized question and
+    the schema fingerprint. The second level compares the question embedding
+    against every cached question and returns the closest entry when it scores
+    above the configured threshold. Entries are written through to a SQLite file
+    and reloaded on start; rows from a different schema are dropped. Each stored
+    embedding records the model and dimension it was computed with; once the
+    current model is known, embeddings of any other model are discarded, so
+    those entries only serve exact hits.
+    """
+
+    _RECENT_EMBEDDINGS = 64
+
+    def __init__(
+        self,
+        config: ResponseCacheConfig,
+        schema_fingerprint: str,
+        embed_model: "Callable[[], BaseEmbedding]",
+    ) -> None:
+        """
+        Args:
+            config: Cache file, size, TTL and similarity threshold.
+            schema_fingerprint: Fingerprint of the schema entries are valid for.
+            embed_model: Returns the embedding model; only called once a
+                question misses the exact level, so exact hits never load it.
+        """
+        self.config = config
+        self.get_embed_model = embed_model
+        self.fingerprint = schema_fingerprint
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._matrix: np.ndarray | None = None
+        self._matrix_keys: List[str] = []
+        # Embeddings computed on a miss, reused when the answer is stored
+        self._recent: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._embedding_model: str | None = None
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(config.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                embedding_model TEXT
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "embedding_model" not in columns:
+            # Files written before embeddings recorded their model
+            with self._conn:
+                self._conn.execute(
+                    "ALTER TABLE responses ADD COLUMN embedding_model TEXT"
+                )
+        self._load()
+
+    def _key(self, normalized: str) -> str:
+        raw = f"{self.fingerprint}\x00{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        ttl = self.config.ttl_seconds
+        return ttl is not None and now - entry.created_at > ttl
+
+    def _load(self) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM responses WHERE fingerprint != ?", (self.fingerprint,)
+            )
+            if self.config.ttl_seconds is not None:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (now - self.config.ttl_seconds,),
+                )
+            # Rows past the size bound would never be loaded again
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT ?)",
+                (self.config.max_entries,),
+            )
+            if self._embedding_model is not None:
+                self._drop_other_embeddings()
+        rows = self._conn.execute(
+            "SELECT key, question, embedding, payload, created_at, embedding_model "
+            "FROM responses ORDER BY accessed_at DESC"
+        ).fetchall()
+        # Most recently used rows are read first, so append them at the front
+        for key, question, blob, payload, created_at, model in rows:
+            embedding = np.frombuffer(blob, dtype=np.float32) if blob else None
+            self._entries[key] = _Entry(
+                question=question,
+                result=SQLGeneration.model_validate_json(payload),
+                embedding=embedding if model else None,
+                created_at=created_at,
+                embedding_model=model if blob else None,
+            )
+            self._entries.move_to_end(key, last=False)
+        self._matrix = None
+
+    def _drop_other_embeddings(self) -> None:
+        # The SQL of these entries is still valid; only their vectors are not
+        self._conn.execute(
+            "UPDATE responses SET embedding = NULL, embedding_model = NULL "
+            "WHERE embedding_model IS NOT ?",
+            (self._embedding_model,),
+        )
+        for entry in self._entries.values():
+            if entry.embedding_model != self._embedding_model:
+                entry.embedding = None
+                entry.embedding_model = None
+
+    def _embed(self, normalized: str) -> np.ndarray:
+        # Called without the lock held, so a slow model never blocks lookups
+        with self._lock:
+            embedding = self._recent.get(normalized)
+        if embedding is not None:
+            return embedding
+        model = self.get_embed_model()
+        vector = np.asarray(model.get_query_embedding(normalized), dtype=np.float32)
+        embedding = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            if self._embedding_model is None:
+                self._embedding_model = f"{model.model_name}:{len(embedding)}"
+                with self._conn:
+                    self._drop_other_embeddings()
+                self._matrix = None
+            self._recent[normalized] = embedding
+            if len(self._recent) > self._RECENT_EMBEDDINGS:
+                self._recent.popitem(last=False)
+        return embedding
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._matrix = None
+        with self._conn:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _touch(self, key: str, now: float) -> None:
+        self._entries.move_to_end(key)
+        with self._conn:
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+
+    def _semantic_match(self, embedding: np.ndarray) -> tuple[str, float] | None:
+        if self._matrix is None:
+            self._matrix_keys = [
+                k for k, e in self._entries.items() if e.embedding is not None
+            ]
+            if not self._matrix_keys:
+                return None
+            self._matrix = np.stack(
+                [self._entries[k].embedding for k in self._matrix_keys]  # type: ignore[misc]
+            )
+        if not self._matrix_keys:
+            return None
+        scores = self._matrix @ embedding
+        best = int(np.argmax(scores))
+        return self._matrix_keys[best], float(scores[best])
+
+    def get(self, query: str) -> CacheHit | None:
+        """Return a cached SQL generation for `query`, or None on a miss."""
+        normalized = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            key = self._key(normalized)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry, now):
+                    self._touch(key, now)
+                    return CacheHit(result=entry.result, level="exact", score=1.0)
+                self._remove(key)
+            if not self._entries:
+                return None
+
+        embedding = self._embed(normalized)
+        with self._lock:
+            match = self._semantic_match(embedding)
+            if match is None or match[1] < self.config.similarity_threshold:
+                return None
+            key, score = match
+            entry = self._entries[key]
+            if self._expired(entry, now):
+                self._remove(key)
+                return None
+            self._touch(key, now)
+            return CacheHit(result=entry.result, level="semantic", score=score)
+
+    def put(self, query: str, result: SQLGeneration) -> None:
+        """Store the SQL generated for `query`, evicting the least recently used."""
+        normalized = normalize_query(query)
+        now = time.time()
+        embedding = self._embed(normalized)
+        with self._lock:
+            key = self._key(normalized)
+            self._entries[key] = _Entry(
+                question=query,
+                result=result,
+                embedding=embedding,
+                created_at=now,
+                embedding_model=self._embedding_model,
+            )
+            self._entries.move_to_end(key)
+            self._matrix = None
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        self.fingerprint,
+                        query,
+                        embedding.tobytes(),
+                        result.model_dump_json(),
+                        now,
+                        now,
+                        self._embedding_model,
+                    ),
+                )
+            while len(self._entries) > self.config.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Set, Tuple, cast
+
+from ..config import ResultCacheConfig
+from ..db.engine import Database
+from ..telemetry import annotate
+
+if TYPE_CHECKING:
+    import polars as pl
+
+_LITERAL = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_TABLE = re.compile(r"\b(?:from|join)\s+[\"`\[]?(\w+)", re.IGNORECASE)
+_CTE = re.compile(r"\b(\w+)\s+as\s*\(", re.IGNORECASE)
+
+
+def _canonical_text(sql: str) -> Tuple[str, List[str]]:
+    # Without a parser: drop comments, collapse whitespace and lowercase
+    # everything but string literals and quoted identifiers
+    parts = _LITERAL.split(_COMMENT.sub(" ", sql))
+    text = "".join(
+        part if i % 2 else " ".join(part.lower().split())
+        for i, part in enumerate(parts)
+    )
+    ctes = {name.lower() for name in _CTE.findall(text)}
+    tables = [t.lower() for t in _TABLE.findall(text) if t.lower() not in ctes]
+    return text.strip().rstrip(";").strip(), tables
+
+
+@lru_cache(maxsize=4096)
+def canonical_sql(sql: str, dialect: str) -> Tuple[str, Tuple[str, ...]] | None:
+    """
+    Canonical form of a query and the tables it reads, or None for non-queries.
+
+    With sqlglot installed the query is parsed, identifiers are normalized to
+    the dialect's casing, table aliases are renamed to t0, t1, ... in order of
+    appearance and the query is printed back in one standard layout. Without
+    it, comments, whitespace and the case of keywords and identifiers are
+    normalized textually.
+    """
+    try:
+        import sqlglot
+        from sqlglot import exp
+        from sqlglot.optimizer.normalize_identifiers import normalize_identifiers
+    except ImportError:
+        text, tables = _canonical_text(sql)
+        return (text, tuple(sorted(set(tables)))) if tables else None
+
+    try:
+        tree = sqlglot.parse_one(sql, read=dialect)
+    except sqlglot.errors.ParseError:
+        return None
+    if not isinstance(tree, exp.Query):
+        return None
+    tree = normalize_identifiers(tree, dialect=dialect)
+    ctes = {cte.alias for cte in tree.find_all(exp.CTE)}
+    refs = list(tree.find_all(exp.Table))
+    names = [ref.alias_or_name for ref in refs]
+    # Aliases are only renamed when each names one table, whatever the scope
+    if len(set(names)) == len(names):
+        renamed = {name: f"t{i}" for i, name in enumerate(names)}
+        for ref in refs:
+            ref.set(
+                "alias",
+                exp.TableAlias(this=exp.to_identifier(renamed[ref.alias_or_name])),
+            )
+        for column in tree.find_all(exp.Column):
+            if column.table in renamed:
+                column.set("table", exp.to_identifier(renamed[column.table]))
+    tables = {ref.name for ref in refs if ref.name not in ctes}
+    return tree.sql(dialect=dialect, comments=False), tuple(sorted(tables))
+
+
+def _read(path: str) -> "pl.DataFrame":
+    import polars as pl
+
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+    except ImportError:
+        return pl.read_ipc(path)
+    # Polars reads IPC files into memory; through a pyarrow memory map the
+    # uncompressed buffers stay in the page cache and are not copied
+    table = pyarrow.ipc.open_file(pa.memory_map(path)).read_all()
+    return cast(pl.DataFrame, pl.from_arrow(table, rechunk=False))
+
+
+@dataclass
+class _Entry:
+    path: str
+    versions: Dict[str, str]
+    rows: int
+
+
+class ResultCache:
+    """
+    Query results cached as Arrow IPC files, keyed by canonical SQL.
+
+    Different questions often end up as the same query, so results are stored
+    under the canonical form of their SQL and served without touching the
+    database. Each result records the data version of every table it read
+    (see `Database.data_versions`) and is dropped as soon as one of them
+    changes. With pyarrow installed, uncompressed files are memory mapped, so
+    a hit returns a Polars frame backed by the file without copying it. An LRU of
+    `max_entries` results is kept; its index is a SQLite file in the cache
+    directory, so results survive restarts.
+    """
+
+    def __init__(
+        self,
+        config: ResultCacheConfig,
+        database: Database,
+        known_tables: Set[str],
+    ) -> None:
+        """
+        Args:
+            config: Cache directory, size limits and compression.
+            database: Database results are read from and versioned by.
+            known_tables: Tables of the schema; queries reading anything else,
+                such as views, are not cached as they cannot be versioned.
+        """
+        self.config = config
+        self.database = database
+        self.known_tables = {t.lower() for t in known_tables}
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(config.path, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(config.path, "index.sqlite"), check_same_thread=False
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                sql TEXT NOT NULL,
+                versions TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._load()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.config.path, f"{key}.arrow")
+
+    def _load(self) -> None:
+        rows = self._conn.execute(
+            "SELECT key, versions, rows FROM results ORDER BY accessed_at"
+        ).fetchall()
+        for key, versions, count in rows:
+            if os.path.exists(self._file(key)):
+                self._entries[key] = _Entry(
+                    self._file(key), json.loads(versions), count
+                )
+            else:
+                self._forget(key)
+
+    def _key(self, sql: str) -> Tuple[str, Tuple[str, ...]] | None:
+        canonical = canonical_sql(sql, self.database.dialect)
+        if canonical is None:
+            return None
+        text, tables = canonical
+        if not tables or not self.known_tables.issuperset(tables):
+            return None
+        raw = f"{self.database.dialect}\x00{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest(), tables
+
+    def _forget(self, key: str) -> None:
+        self._entries.pop(key, None)
+        with self._conn:
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+        try:
+            os.remove(self._file(key))
+        except OSError:
+            pass
+
+    def get(self, sql: str) -> "pl.DataFrame | None":
+        """The cached result of `sql` if every table it reads is unchanged."""
+        keyed = self._key(sql)
+        if keyed is None:
+            return None
+        key, tables = keyed
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        versions = self.database.data_versions(list(tables))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.versions != versions:
+                if entry is not None:
+                    self._forget(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE results SET accessed_at = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+            self.hits += 1
+            # Read under the lock, as eviction deletes the file
+            frame = _read(entry.path)
+        annotate(cache_hit="result")
+        return frame
+
+    def versions(self, sql: str) -> Dict[str, str] | None:
+        """
+        Data versions to store a result of `sql` under, or None if uncacheable.
+
+        Take them before running the query, so a write racing the query leaves
+        the stored result already out of date rather than wrongly current.
+        """
+        keyed = self._key(sql)
+        if keyed is None:
+            return None
+        versions = self.database.data_versions(list(keyed[1]))
+        return versions if len(versions) == len(keyed[1]) else None
+
+    def put(self, sql: str, frame: "pl.DataFrame", versions: Dict[str, str]) -> None:
+        """Store the full result of `sql`, read at `versions`."""
+        keyed = self._key(sql)
+        if keyed is None or frame.height > self.config.max_rows:
+            return
+        key = keyed[0]
+        path = self._file(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            frame.write_ipc(tmp, compression=self.config.compression)
+            os.replace(tmp, path)
+        except Exception as e:
+            # Some column types have no Arrow equivalent; skip those results
+            print(f"Error caching query result: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            self._entries[key] = _Entry(path, versions, frame.height)
+            self._entries.move_to_end(key)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, sql, json.dumps(versions), frame.height, time.time()),
+                )
+            while len(self._entries) > self.config.max_entries:
+                self._forget(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,311 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+from ..config import RetrievalCacheConfig
+from ..telemetry import annotate
+from ..utils import normalize_query
+
+
+class QueryEmbeddingCache(BaseEmbedding):
+    """
+    Embedding model wrapper that embeds each distinct question once.
+
+    Query embeddings are computed for the question as asked and kept in an LRU
+    keyed on the normalized question, written through to SQLite and reloaded
+    on start, so the
+    response cache, intent classifier, schema index and retriever all share one
+    embedding per question, across restarts too. Concurrent requests for the
+    same question wait for the first one instead of embedding it again. Text
+    embeddings (samples, schema) pass through uncached.
+    """
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _config: RetrievalCacheConfig = PrivateAttr()
+    _vectors: "OrderedDict[str, np.ndarray]" = PrivateAttr()
+    _pending: Dict[str, threading.Event] = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr()
+    _conn: sqlite3.Connection = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, config: RetrievalCacheConfig) -> None:
+        super().__init__(
+            model_name=inner.model_name, embed_batch_size=inner.embed_batch_size
+        )
+        self._inner = inner
+        self._config = config
+        self._vectors = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(config.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS query_embeddings (
+                key TEXT PRIMARY KEY,
+                embedding BLOB NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._load()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "QueryEmbeddingCache"
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    def _key(self, normalized: str) -> str:
+        # Vectors of different models are not interchangeable
+        raw = f"{self._inner.model_name}\x00{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        rows = self._conn.execute(
+            "SELECT key, embedding FROM query_embeddings "
+            "ORDER BY accessed_at DESC LIMIT ?",
+            (self._config.max_embeddings,),
+        ).fetchall()
+        for key, blob in rows:
+            self._vectors[key] = np.frombuffer(blob, dtype=np.float32)
+            self._vectors.move_to_end(key, last=False)
+
+    def _claim(self, key: str) -> Tuple[np.ndarray | None, threading.Event, bool]:
+        """Cached vector, or the event to wait on and whether this caller owns it."""
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                return vector, threading.Event(), False
+            event = self._pending.get(key)
+            if event is not None:
+                return None, event, False
+            event = self._pending[key] = threading.Event()
+            return None, event, True
+
+    def _store(self, key: str, embedding: List[float]) -> None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        now = time.time()
+        with self._lock:
+            self._vectors[key] = vector
+            self._vectors.move_to_end(key)
+            evicted = []
+            while len(self._vectors) > self._config.max_embeddings:
+                evicted.append(self._vectors.popitem(last=False)[0])
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?)",
+                    (key, vector.tobytes(), now),
+                )
+                self._conn.executemany(
+                    "DELETE FROM query_embeddings WHERE key = ?",
+                    [(k,) for k in evicted],
+                )
+
+    def _release(self, key: str, event: threading.Event) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+        event.set()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        normalized = normalize_query(query)
+        key = self._key(normalized)
+        vector, event, owner = self._claim(key)
+        if vector is None and not owner:
+            event.wait()
+            vector, event, owner = self._claim(key)
+        if vector is not None:
+            annotate(embedding_cache_hit=True)
+            return vector.tolist()
+        try:
+            embedding = self._inner.get_query_embedding(query)
+            self._store(key, embedding)
+        finally:
+            if owner:
+                self._release(key, event)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        normalized = normalize_query(query)
+        key = self._key(normalized)
+        vector, event, owner = self._claim(key)
+        if vector is None and not owner:
+            await asyncio.to_thread(event.wait)
+            vector, event, owner = self._claim(key)
+        if vector is not None:
+            annotate(embedding_cache_hit=True)
+            return vector.tolist()
+        try:
+            embedding = await self._inner.aget_query_embedding(query)
+            self._store(key, embedding)
+        finally:
+            if owner:
+                self._release(key, event)
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._inner.get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return await self._inner.aget_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._inner.get_text_embedding_batch(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._inner.aget_text_embedding_batch(texts)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+@dataclass
+class _Result:
+    embedding: np.ndarray
+    nodes: List[NodeWithScore]
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Retriever caching top-k few-shot samples per region of embedding space.
+
+    The question is embedded once and the vector is handed to the wrapped
+    retriever in the QueryBundle, so it does not embed the question again.
+    Results are bucketed by a random-hyperplane LSH signature of that vector;
+    a question reuses a cached result from its bucket when the cosine
+    similarity to the cached question is at least `min_similarity`. The cache
+    is dropped when the sample manifest written by `initialize_embeddings`
+    changes, i.e. when samples were added to, removed from or re-embedded into
+    the store.
+    """
+
+    def __init__(
+        self,
+        retriever: BaseRetriever,
+        embed_model: BaseEmbedding,
+        config: RetrievalCacheConfig,
+    ) -> None:
+        super().__init__()
+        self.retriever = retriever
+        self.embed_model = embed_model
+        self.config = config
+        self.hits = 0
+        self.misses = 0
+        self._planes: np.ndarray | None = None
+        self._buckets: OrderedDict[bytes, List[_Result]] = OrderedDict()
+        self._size = 0
+        self._manifest_stat: Tuple[int, int] | None = None
+        self._manifest_hash: str | None = None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Drop every cached result."""
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+    def _check_manifest(self) -> None:
+        try:
+            stat = os.stat(self.config.manifest_path)
+        except OSError:
+            return
+        # Only a rewritten manifest is read, and only a changed one invalidates
+        if (stat.st_mtime_ns, stat.st_size) == self._manifest_stat:
+            return
+        try:
+            with open(self.config.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable embedding manifest: {e}")
+            return
+        # Re-embedding every sample into a new store or model changes no id
+        lines = [
+            str(manifest.get("store")),
+            str(manifest.get("embedding_model")),
+            *sorted(manifest.get("node_ids", [])),
+        ]
+        digest = hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+        # Results cached before any manifest was seen may predate this one too
+        if digest != self._manifest_hash and (
+            self._manifest_hash is not None or self._size > 0
+        ):
+            self.invalidate()
+        self._manifest_stat = (stat.st_mtime_ns, stat.st_size)
+        self._manifest_hash = digest
+
+    def _signature(self, vector: np.ndarray) -> bytes:
+        if self._planes is None or self._planes.shape[1] != len(vector):
+            rng = np.random.default_rng(0)
+            self._planes = rng.standard_normal(
+                (self.config.lsh_bits, len(vector))
+            ).astype(np.float32)
+        return np.packbits(self._planes @ vector > 0).tobytes()
+
+    def _match(self, bucket: bytes, vector: np.ndarray) -> List[NodeWithScore] | None:
+        # Called with the lock held
+        results = self._buckets.get(bucket)
+        if not results:
+            return None
+        best = max(results, key=lambda r: float(r.embedding @ vector))
+        if float(best.embedding @ vector) < self.config.min_similarity:
+            return None
+        self._buckets.move_to_end(bucket)
+        return list(best.nodes)
+
+    def _lookup(self, bucket: bytes, vector: np.ndarray) -> List[NodeWithScore] | None:
+        with self._lock:
+            nodes = self._match(bucket, vector)
+            if nodes is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return nodes
+
+    def _store(
+        self, bucket: bytes, vector: np.ndarray, nodes: List[NodeWithScore]
+    ) -> None:
+        with self._lock:
+            self._buckets.setdefault(bucket, []).append(_Result(vector, list(nodes)))
+            self._buckets.move_to_end(bucket)
+            self._size += 1
+            while self._size > self.config.max_results:
+                _, evicted = self._buckets.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _embed(self, query_bundle: QueryBundle) -> np.ndarray:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self.embed_model.get_query_embedding(
+                query_bundle.query_str
+            )
+        vector = np.asarray(query_bundle.embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        self._check_manifest()
+        vector = self._embed(query_bundle)
+        bucket = self._signature(vector)
+        nodes = self._lookup(bucket, vector)
+        if nodes is not None:
+            annotate(cache_hit="retrieval")
+            return nodes
+        nodes = self.retriever.retrieve(query_bundle)
+        self._store(bucket, vector, nodes)
+        return nodes
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": self._size}
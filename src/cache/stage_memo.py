@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+from ..telemetry import annotate
+
+T = TypeVar("T")
+
+
+class StageMemo(Generic[T]):
+    """
+    Bounded in-memory LRU memo for the output of a single pipeline stage.
+
+    Keys are built by the caller from the normalized query plus the stage
+    inputs. Entries are evicted least-recently-used first once `max_entries`
+    is reached, and ignored once they are older than `ttl_seconds`.
+    """
+
+    def __init__(
+        self, max_entries: int = 512, ttl_seconds: float | None = None
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Tuple[float, T]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> T | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                stored_at, value = item
+                if (
+                    self.ttl_seconds is None
+                    or time.time() - stored_at <= self.ttl_seconds
+                ):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    annotate(cache_hit="memo")
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: T) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    async def aget_or_compute(
+        self, key: Hashable, compute: Callable[[], Awaitable[T]]
+    ) -> T:
+        value = self.get(key)
+        if value is None:
+            value = await compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
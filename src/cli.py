@@ -0,0 +1,115 @@
+import argparse
+from typing import TYPE_CHECKING
+
+from .config import (
+    IntentClassifierConfig,
+    ResponseCacheConfig,
+    ResultCacheConfig,
+    RetrievalCacheConfig,
+    RoutingConfig,
+    SpeculationConfig,
+    TelemetryConfig,
+    VotingConfig,
+)
+from .router import ROUTING_MODES
+
+if TYPE_CHECKING:
+    from .querygpt import QueryGPT
+
+
+def add_pipeline_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the flags configuring the pipeline, shared by the CLI and the server."""
+    parser.add_argument(
+        "--cache-path",
+        type=str,
+        default=None,
+        help="SQLite file for the response cache; caching is off when omitted.",
+    )
+    parser.add_argument(
+        "--embedding-cache",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help=(
+            "SQLite file caching question embeddings, shared by every stage, and "
+            "few-shot retrieval results; off when omitted."
+        ),
+    )
+    parser.add_argument(
+        "--result-cache",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help=(
+            "Directory caching query results by canonical SQL until a table they "
+            "read changes; off when omitted."
+        ),
+    )
+    parser.add_argument(
+        "--intent-classifier",
+        action="store_true",
+        help="Classify intent with local embeddings before falling back to the LLM.",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Append a trace of every run to FILE as OTLP/JSON lines.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=ROUTING_MODES,
+        default=None,
+        help=(
+            "'fast' answers with a single LLM call and falls back to the full "
+            "agent chain on invalid SQL, 'auto' does so for simple questions only, "
+            "'full' always runs the chain (default: QUERYGPT_ROUTING or full). "
+            "Server requests may override it."
+        ),
+    )
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        help=(
+            "Draft SQL from the selected tables while their columns are pruned, "
+            "keeping the draft when it fits the pruned schema or validates."
+        ),
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "Generate N SQL candidates concurrently and keep the one whose result, "
+            "on a sampled copy of the database, most candidates agree on."
+        ),
+    )
+
+
+def pipeline_from_args(args: argparse.Namespace) -> "QueryGPT":
+    """Build the pipeline configured by the flags of `add_pipeline_arguments`."""
+    # Imported on use, so --help and usage errors return immediately
+    from .querygpt import QueryGPT
+
+    return QueryGPT(
+        response_cache_config=ResponseCacheConfig(path=args.cache_path)
+        if args.cache_path
+        else None,
+        intent_classifier_config=IntentClassifierConfig()
+        if args.intent_classifier
+        else None,
+        telemetry_config=TelemetryConfig(trace_path=args.trace) if args.trace else None,
+        routing_config=RoutingConfig(mode=args.mode) if args.mode else None,
+        retrieval_cache_config=RetrievalCacheConfig(path=args.embedding_cache)
+        if args.embedding_cache
+        else None,
+        speculation_config=SpeculationConfig() if args.speculative else None,
+        voting_config=VotingConfig(candidates=args.candidates)
+        if args.candidates
+        else None,
+        result_cache_config=ResultCacheConfig(path=args.result_cache)
+        if args.result_cache
+        else None,
+    )
@@ -0,0 +1,349 @@
+import abc
+import itertools
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Tuple, Type
+from urllib.parse import quote
+
+from ..config import DatabaseConfig
+from .schema import introspect_postgres, load_database_schema
+
+# FROM/JOIN targets with their optional alias, used to map plan entries back to tables
+_TABLE_REF = re.compile(
+    r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)[\"`\]]?(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE
+)
+_NOT_ALIAS = {
+    "WHERE", "ON", "USING", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS",
+    "NATURAL", "OUTER", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "EXCEPT",
+    "INTERSECT", "WINDOW", "AS",
+}  # fmt: skip
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+@dataclass
+class QueryPlan:
+    """
+    Plan of a statement, obtained without executing it.
+
+    Attributes:
+        steps: Human-readable plan steps, one per line.
+        full_scans: Tables the plan reads in full, with their estimated rows.
+    """
+
+    steps: List[str] = field(default_factory=list)
+    full_scans: Dict[str, int] = field(default_factory=dict)
+
+
+class Database(abc.ABC):
+    """
+    Pooled access to the database generated SQL runs against.
+
+    Subclasses hand out pooled connections, introspect the schema into the
+    `schema_info` layout used by the agents, and explain statements for
+    validation. `errors` holds the exception types raised for invalid SQL.
+    """
+
+    dialect: str = ""
+    errors: Tuple[Type[BaseException], ...] = ()
+
+    @abc.abstractmethod
+    def connection(self) -> Any:
+        """Context manager lending a pooled connection."""
+
+    @abc.abstractmethod
+    def cursor(self, timeout_ms: float | None = None) -> Any:
+        """
+        Context manager lending a cursor that fetches rows incrementally.
+
+        With `timeout_ms`, statements run through the cursor are cancelled
+        once they take longer than that.
+        """
+
+    @abc.abstractmethod
+    def load_schema(self) -> Dict[str, Any]: ...
+
+    @abc.abstractmethod
+    def explain(self, sql: str) -> QueryPlan: ...
+
+    @abc.abstractmethod
+    def data_versions(self, tables: List[str]) -> Dict[str, str]:
+        """
+        Current data version of each of `tables`.
+
+        A version changes whenever the table's rows may have changed. Tables
+        without a version (e.g. views) are left out of the result.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteDatabase(Database):
+    """
+    Thread-safe pool of read-only SQLite connections.
+
+    The database is switched to WAL once, so pooled readers never block on, or
+    block, a writer such as the seeder. Connections open the file through a
+    read-only URI, are created on demand up to `pool_size` and then reused;
+    callers wait up to `timeout` seconds for a free one. A missing file is
+    never created.
+    """
+
+    dialect = "sqlite"
+    errors = (sqlite3.Error, sqlite3.Warning)
+
+    def __init__(self, path: str, pool_size: int = 8, timeout: float = 30.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        try:
+            # The journal mode is stored in the file, so this only needs doing once
+            with closing(
+                sqlite3.connect(f"file:{quote(path)}?mode=rw", uri=True)
+            ) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error as e:
+            print(f"Could not enable WAL on {path}: {e}")
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        # Row estimates hold until the file changes, schema changes included
+        self._row_estimates: Dict[str, int] = {}
+        self._estimates_version = ""
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(
+            f"file:{quote(self.path)}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            timeout=self.timeout,
+        )
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No SQLite connection free after {self.timeout}s")
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self, timeout_ms: float | None = None) -> Iterator[sqlite3.Cursor]:
+        with self.connection() as conn, closing(conn.cursor()) as cursor:
+            if timeout_ms is None:
+                yield cursor
+                return
+            deadline = time.monotonic() + timeout_ms / 1000
+            # A true return interrupts the running statement
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, 10_000)
+            try:
+                yield cursor
+            finally:
+                conn.set_progress_handler(None, 0)
+
+    def load_schema(self) -> Dict[str, Any]:
+        return load_database_schema(self.path)
+
+    def _estimate_rows(self, conn: sqlite3.Connection, table: str) -> int:
+        version = self._file_version()
+        if version != self._estimates_version:
+            self._row_estimates = {}
+            self._estimates_version = version
+        if table not in self._row_estimates:
+            try:
+                # The largest rowid is a B-tree lookup, unlike COUNT(*)
+                (rows,) = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()
+            except sqlite3.Error:
+                (rows,) = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()
+            self._row_estimates[table] = rows or 0
+        return self._row_estimates[table]
+
+    def explain(self, sql: str) -> QueryPlan:
+        with self.connection() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            plan = QueryPlan(steps=[row[3] for row in rows])
+            aliases: Dict[str, str] = {}
+            for table, alias in _TABLE_REF.findall(sql):
+                aliases[table] = table
+                if alias and alias.upper() not in _NOT_ALIAS:
+                    aliases[alias] = table
+            tables = {
+                name
+                for (name,) in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
+            for step in plan.steps:
+                match = _SQLITE_SCAN.match(step)
+                if not match:
+                    continue
+                table = aliases.get(match.group(1), match.group(1))
+                # CTEs and subqueries show up as scans too, but are not tables
+                if table in tables:
+                    plan.full_scans[table] = self._estimate_rows(conn, table)
+        return plan
+
+    def _file_version(self) -> str:
+        # SQLite keeps no per-table counters, and PRAGMA data_version is only
+        # comparable within one connection, so versions come from the database
+        # file and its WAL; every commit writes to one or the other. Readers
+        # create an empty WAL, which counts as none.
+        parts = []
+        for path in (self.path, f"{self.path}-wal"):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            if stat is None or stat.st_size == 0:
+                parts.append("-")
+            else:
+                parts.append(f"{stat.st_ino}.{stat.st_mtime_ns}.{stat.st_size}")
+        return ":".join(parts)
+
+    def data_versions(self, tables: List[str]) -> Dict[str, str]:
+        version = self._file_version()
+        return {table: version for table in tables}
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class PostgresDatabase(Database):
+    """
+    PostgreSQL through a psycopg connection pool.
+
+    Pooled connections run every transaction read-only. Results are read
+    through named server-side cursors, so a preview only transfers the rows it
+    fetches.
+    """
+
+    dialect = "postgresql"
+
+    def __init__(
+        self,
+        url: str,
+        min_size: int = 1,
+        max_size: int = 8,
+        schema: str = "public",
+        timeout: float = 30.0,
+    ) -> None:
+        import psycopg
+        from psycopg_pool import ConnectionPool
+
+        self.errors = (psycopg.Error,)
+        self.schema = schema
+        self._pool = ConnectionPool(
+            url,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            configure=self._configure,
+            open=True,
+        )
+        self._cursor_ids = itertools.count()
+
+    @staticmethod
+    def _configure(conn: Any) -> None:
+        conn.read_only = True
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        with self._pool.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def cursor(self, timeout_ms: float | None = None) -> Iterator[Any]:
+        with self._pool.connection() as conn:
+            if timeout_ms is not None:
+                # Local to the transaction the cursor runs in
+                conn.execute(
+                    "SELECT set_config('statement_timeout', %s, true)",
+                    (str(int(timeout_ms)),),
+                )
+            with conn.cursor(name=f"querygpt_{next(self._cursor_ids)}") as cursor:
+                yield cursor
+
+    def load_schema(self) -> Dict[str, Any]:
+        with self.connection() as conn:
+            return introspect_postgres(conn, self.schema)
+
+    def explain(self, sql: str) -> QueryPlan:
+        import psycopg
+
+        with self.connection() as conn:
+            cursor = conn.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            ((document,),) = cursor.fetchall()
+            # The simple query protocol runs every statement; SQLite refuses these
+            if cursor.nextset():
+                raise psycopg.ProgrammingError(
+                    "You can only execute one statement at a time."
+                )
+            plan = QueryPlan()
+            scanned: List[str] = []
+            nodes = [document[0]["Plan"]]
+            while nodes:
+                node = nodes.pop()
+                relation = node.get("Relation Name")
+                plan.steps.append(
+                    f"{node['Node Type']} on {relation}"
+                    if relation
+                    else node["Node Type"]
+                )
+                if node["Node Type"] == "Seq Scan" and relation:
+                    scanned.append(relation)
+                nodes.extend(reversed(node.get("Plans", [])))
+            if scanned:
+                # reltuples is the planner's table size estimate; -1 before ANALYZE
+                rows = conn.execute(
+                    "SELECT c.relname, c.reltuples::bigint FROM pg_class c "
+                    "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                    "WHERE n.nspname = %s AND c.relname = ANY(%s)",
+                    (self.schema, scanned),
+                ).fetchall()
+                estimates = dict(rows)
+                plan.full_scans = {t: max(int(estimates.get(t, 0)), 0) for t in scanned}
+        return plan
+
+    def data_versions(self, tables: List[str]) -> Dict[str, str]:
+        # Tuple counters change with every write, the filenode on TRUNCATE; the
+        # counters reach the statistics views up to a second after the commit
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT relname, pg_relation_filenode(relid), n_tup_ins, "
+                "n_tup_upd, n_tup_del FROM pg_stat_user_tables "
+                "WHERE schemaname = %s AND relname = ANY(%s)",
+                (self.schema, tables),
+            ).fetchall()
+        return {name: ":".join(map(str, counters)) for name, *counters in rows}
+
+    def close(self) -> None:
+        self._pool.close()
+
+
+def create_database(config: DatabaseConfig) -> Database:
+    """Open the database described by `config.url`."""
+    if config.url.startswith(("postgresql://", "postgres://")):
+        return PostgresDatabase(
+            config.url, max_size=config.pool_size, schema=config.schema
+        )
+    if config.sqlite_path is None:
+        raise ValueError(f"Unsupported database URL: {config.url}")
+    return SQLiteDatabase(config.sqlite_path, pool_size=config.pool_size)
@@ -0,0 +1,110 @@
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Sequence, Tuple
+
+from .engine import Database
+
+if TYPE_CHECKING:
+    import polars as pl
+
+PREVIEW_ROWS = 5
+BATCH_ROWS = 10_000
+
+
+def _column_names(description: Sequence[Tuple[Any, ...]]) -> List[str]:
+    # Joins often select the same column name twice, which a DataFrame rejects
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for column in description:
+        name = column[0]
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def _frame(
+    columns: List[str],
+    rows: List[Tuple[Any, ...]],
+    schema: "Dict[str, pl.DataType] | None" = None,
+) -> "pl.DataFrame":
+    import polars as pl
+
+    frame = pl.DataFrame(rows, schema=columns, orient="row", infer_schema_length=None)
+    return frame.cast(schema, strict=False) if schema else frame  # type: ignore[arg-type]
+
+
+def _iter_frames(
+    cursor: Any, batch_size: int, schema: "Dict[str, pl.DataType] | None" = None
+) -> "Iterator[pl.DataFrame]":
+    columns = _column_names(cursor.description or ())
+    while rows := cursor.fetchmany(batch_size):
+        yield _frame(columns, rows, schema)
+
+
+def preview(database: Database, sql: str, limit: int = PREVIEW_ROWS) -> "pl.DataFrame":
+    """
+    Run `sql` and return at most its first `limit` rows.
+
+    Rows are fetched from an incremental cursor (SQLite steps lazily, PostgreSQL
+    uses a server-side cursor), so only the rows fetched here are produced and
+    transferred, however large the full result is.
+
+    Args:
+        database: Database to run the query on.
+        sql: Query to run.
+        limit: Maximum number of rows returned.
+    """
+    with database.cursor() as cursor:
+        cursor.execute(sql)
+        rows = cursor.fetchmany(limit)
+        return _frame(_column_names(cursor.description or ()), rows)
+
+
+def iter_batches(
+    database: Database,
+    sql: str,
+    batch_size: int = BATCH_ROWS,
+    schema: "Dict[str, pl.DataType] | None" = None,
+) -> "Iterator[pl.DataFrame]":
+    """
+    Stream the full result of `sql` as Polars DataFrames of `batch_size` rows.
+
+    Only one batch is held in memory at a time, so results of any size can be
+    paged through or exported. Column types are inferred per batch, as SQLite
+    values carry no declared type; pass `schema` to cast every batch to fixed
+    types, e.g. when writing the batches to one file. Call `to_arrow()` on a
+    batch to get an Arrow table.
+
+    Args:
+        database: Database to run the query on.
+        sql: Query to run.
+        batch_size: Number of rows per batch.
+        schema: Optional column name -> Polars type applied to every batch.
+    """
+    with database.cursor() as cursor:
+        cursor.execute(sql)
+        yield from _iter_frames(cursor, batch_size, schema)
+
+
+def export_csv(
+    database: Database, sql: str, path: str, batch_size: int = BATCH_ROWS
+) -> int:
+    """
+    Write the full result of `sql` to a CSV file with constant memory.
+
+    Returns:
+        The number of rows written.
+    """
+    written = 0
+    with (
+        database.cursor() as cursor,
+        open(path, "w", encoding="utf-8", newline="") as f,
+    ):
+        cursor.execute(sql)
+        for batch in _iter_frames(cursor, batch_size):
+            batch.write_csv(f, include_header=written == 0)
+            written += batch.height
+        if written == 0:
+            f.write(",".join(_column_names(cursor.description or ())) + "\n")
+    return written
@@ -0,0 +1,145 @@
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set, Tuple
+
+
+@dataclass(frozen=True)
+class JoinEdge:
+    """
+    One foreign key hop from `left_table` to `right_table`.
+
+    `forward` is True when the hop follows the foreign key from the referencing
+    table to the referenced one, and False when it goes the other way.
+    """
+
+    left_table: str
+    left_column: str
+    right_table: str
+    right_column: str
+    forward: bool = True
+
+    def reversed(self) -> "JoinEdge":
+        return JoinEdge(
+            self.right_table,
+            self.right_column,
+            self.left_table,
+            self.left_column,
+            not self.forward,
+        )
+
+    @property
+    def condition(self) -> str:
+        return (
+            f"{self.left_table}.{self.left_column} = "
+            f"{self.right_table}.{self.right_column}"
+        )
+
+
+@dataclass
+class JoinPlan:
+    """Tables to query, including bridge tables, and the joins connecting them."""
+
+    tables: List[str] = field(default_factory=list)
+    edges: List[JoinEdge] = field(default_factory=list)
+
+    @property
+    def conditions(self) -> List[str]:
+        return [edge.condition for edge in self.edges]
+
+    @property
+    def join_columns(self) -> Dict[str, Set[str]]:
+        columns: Dict[str, Set[str]] = {}
+        for edge in self.edges:
+            columns.setdefault(edge.left_table, set()).add(edge.left_column)
+            columns.setdefault(edge.right_table, set()).add(edge.right_column)
+        return columns
+
+
+# Search state: the table reached and whether the last hop followed a foreign key
+_State = Tuple[str, bool]
+
+
+class JoinGraph:
+    """
+    Undirected graph of tables connected by their foreign keys.
+
+    `plan` connects a set of tables with as few joins as possible. Finding the
+    minimum tree is the Steiner tree problem, so it uses the usual greedy
+    approximation: grow the tree from the first table by repeatedly attaching
+    the closest remaining table along a shortest path.
+
+    Going up a foreign key to a parent and straight back down to another of its
+    children (a fan trap, such as students and courses that merely share a
+    department) costs extra, so link tables like enrollments win ties.
+    """
+
+    FAN_TRAP_PENALTY = 0.5
+
+    def __init__(self, schema_info: Dict[str, Any]) -> None:
+        self.adjacency: Dict[str, List[JoinEdge]] = {t: [] for t in schema_info}
+        for table, info in schema_info.items():
+            for fk in info.get("foreign_keys", []):
+                target = fk["references_table"]
+                if target not in self.adjacency:
+                    continue
+                edge = JoinEdge(table, fk["column"], target, fk["references_column"])
+                self.adjacency[table].append(edge)
+                self.adjacency[target].append(edge.reversed())
+
+    def _nearest(self, tree: Set[str], targets: Set[str]) -> List[JoinEdge] | None:
+        # Dijkstra from every table already in the tree
+        best: Dict[_State, float] = {}
+        came_from: Dict[_State, Tuple[JoinEdge, _State] | None] = {}
+        heap: List[Tuple[float, int, _State]] = []
+        for counter, table in enumerate(sorted(tree)):
+            best[(table, False)] = 0.0
+            came_from[(table, False)] = None
+            heap.append((0.0, counter, (table, False)))
+        counter = len(heap)
+
+        while heap:
+            cost, _, state = heapq.heappop(heap)
+            if cost > best[state]:
+                continue
+            table, went_up = state
+            if table in targets:
+                path: List[JoinEdge] = []
+                step = came_from[state]
+                while step is not None:
+                    edge, state = step
+                    path.append(edge)
+                    step = came_from[state]
+                return path[::-1]
+            for edge in self.adjacency.get(table, []):
+                weight = 1.0
+                if went_up and not edge.forward:
+                    weight += self.FAN_TRAP_PENALTY
+                nxt = (edge.right_table, edge.forward)
+                if cost + weight < best.get(nxt, float("inf")):
+                    best[nxt] = cost + weight
+                    came_from[nxt] = (edge, state)
+                    counter += 1
+                    heapq.heappush(heap, (cost + weight, counter, nxt))
+        return None
+
+    def plan(self, tables: List[str]) -> JoinPlan:
+        """Connect `tables` through foreign keys, adding bridge tables as needed."""
+        terminals = [t for t in dict.fromkeys(tables) if t in self.adjacency]
+        result = JoinPlan(tables=list(dict.fromkeys(tables)))
+        if len(terminals) < 2:
+            return result
+
+        tree = {terminals[0]}
+        remaining = set(terminals[1:])
+        while remaining:
+            path = self._nearest(tree, remaining)
+            if path is None:
+                # Disconnected tables are left for the SQL generator to handle
+                break
+            for edge in path:
+                result.edges.append(edge)
+                tree.add(edge.right_table)
+                if edge.right_table not in result.tables:
+                    result.tables.append(edge.right_table)
+            remaining -= tree
+        return result
@@ -0,0 +1,89 @@
+import os
+import sqlite3
+from contextlib import closing
+from typing import Any, Dict, List, Tuple
+from urllib.parse import quote
+
+
+def _children_first(schema_info: Dict[str, Any]) -> List[str]:
+    """Tables ordered so every table comes after the tables referencing it."""
+    referencing: Dict[str, int] = {t: 0 for t in schema_info}
+    for table, info in schema_info.items():
+        for fk in info.get("foreign_keys", []):
+            parent = fk["references_table"]
+            if parent in referencing and parent != table:
+                referencing[parent] += 1
+    order = [t for t, n in referencing.items() if n == 0]
+    for table in order:
+        for fk in schema_info[table].get("foreign_keys", []):
+            parent = fk["references_table"]
+            if parent in referencing and parent != table:
+                referencing[parent] -= 1
+                if referencing[parent] == 0:
+                    order.append(parent)
+    # Tables on a reference cycle keep their schema order
+    return order + [t for t in schema_info if t not in order]
+
+
+def create_sampled_copy(
+    source: str, schema_info: Dict[str, Any], path: str, rows_per_table: int
+) -> None:
+    """
+    Write a small SQLite copy of `source` for checking candidate queries.
+
+    Every table keeps its first `rows_per_table` rows plus the rows referenced
+    by the rows kept in the tables pointing at it, so joins along foreign keys
+    still find their matches. Tables are filled children first for that reason.
+    The copy is written to a temporary file and moved into place, so readers
+    never see a partial copy.
+
+    Args:
+        source: SQLite file to sample.
+        schema_info: Schema of `source`, for its tables and foreign keys.
+        path: File the copy is written to.
+        rows_per_table: Rows taken from the start of every table.
+    """
+    tmp = f"{path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    with closing(sqlite3.connect(tmp, uri=True)) as conn:
+        conn.execute(
+            "ATTACH DATABASE ? AS source",
+            (f"file:{quote(os.path.abspath(source))}?mode=ro",),
+        )
+        for (ddl,) in conn.execute(
+            "SELECT sql FROM source.sqlite_master "
+            "WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall():
+            conn.execute(ddl)
+
+        references: Dict[str, List[Tuple[str, str, str]]] = {}
+        for table, info in schema_info.items():
+            for fk in info.get("foreign_keys", []):
+                references.setdefault(fk["references_table"], []).append(
+                    (table, fk["column"], fk["references_column"])
+                )
+        for table in _children_first(schema_info):
+            conn.execute(
+                f'INSERT INTO main."{table}" SELECT * FROM source."{table}" LIMIT ?',
+                (rows_per_table,),
+            )
+            for child, column, key in references.get(table, []):
+                conn.execute(
+                    f'INSERT INTO main."{table}" SELECT * FROM source."{table}" '
+                    f'WHERE "{key}" IN (SELECT "{column}" FROM main."{child}") '
+                    f'AND "{key}" NOT IN (SELECT "{key}" FROM main."{table}")'
+                )
+        conn.commit()
+        conn.execute("DETACH DATABASE source")
+    os.replace(tmp, path)
+
+
+def sampled_copy_stale(source: str, path: str) -> bool:
+    """Whether `source` (or its WAL) changed since the copy at `path` was made."""
+    if not os.path.exists(path):
+        return True
+    modified = max(
+        os.path.getmtime(p) for p in (source, f"{source}-wal") if os.path.exists(p)
+    )
+    return modified > os.path.getmtime(path)
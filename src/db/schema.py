@@ -1,20 +1,220 @@
+import hashlib
+import json
+import os
 import sqlite3
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+from urllib.parse import quote
+
+
+def _introspect_table(cursor: sqlite3.Cursor, t: str) -> Dict[str, Any]:
+    cursor.execute(f"PRAGMA table_info({t})")
+    cols = cursor.fetchall()
+    cursor.execute(f"PRAGMA foreign_key_list({t})")
+    fks = cursor.fetchall()
+    cursor.execute(f"PRAGMA index_list({t})")
+    indexes = []
+    for _, index_name, unique, *_ in cursor.fetchall():
+        cursor.execute(f"PRAGMA index_info('{index_name}')")
+        indexes.append(
+            {
+                "name": index_name,
+                "columns": [row[2] for row in cursor.fetchall()],
+                "unique": bool(unique),
+            }
+        )
+    return {
+        "columns": [
+            {"name": c[1], "type": c[2], "primary_key": bool(c[5])} for c in cols
+        ],
+        "foreign_keys": [
+            {"column": fk[3], "references_table": fk[2], "references_column": fk[4]}
+            for fk in fks
+        ],
+        "indexes": indexes,
+    }
+
+
+_PG_COLUMNS = """
+SELECT c.table_name, c.column_name, c.data_type
+FROM information_schema.columns c
+JOIN information_schema.tables t
+  ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+WHERE c.table_schema = %s AND t.table_type = 'BASE TABLE'
+ORDER BY c.table_name, c.ordinal_position
+"""
+
+_PG_PRIMARY_KEYS = """
+SELECT kcu.table_name, kcu.column_name
+FROM information_schema.table_constraints tc
+JOIN information_schema.key_column_usage kcu
+  ON kcu.constraint_schema = tc.constraint_schema
+ AND kcu.constraint_name = tc.constraint_name
+WHERE tc.table_schema = %s AND tc.constraint_type = 'PRIMARY KEY'
+"""
+
+# Pairs each referencing column with the referenced column at the same position
+_PG_FOREIGN_KEYS = """
+SELECT kcu.table_name, kcu.column_name, ref.table_name, ref.column_name
+FROM information_schema.referential_constraints rc
+JOIN information_schema.key_column_usage kcu
+  ON kcu.constraint_schema = rc.constraint_schema
+ AND kcu.constraint_name = rc.constraint_name
+JOIN information_schema.key_column_usage ref
+  ON ref.constraint_schema = rc.unique_constraint_schema
+ AND ref.constraint_name = rc.unique_constraint_name
+ AND ref.ordinal_position = kcu.position_in_unique_constraint
+WHERE kcu.table_schema = %s
+ORDER BY kcu.table_name, kcu.ordinal_position
+"""
+
+# information_schema has no view of indexes, so these come from the catalog
+_PG_INDEXES = """
+SELECT t.relname, i.relname, ix.indisunique, a.attname
+FROM pg_index ix
+JOIN pg_class i ON i.oid = ix.indexrelid
+JOIN pg_class t ON t.oid = ix.indrelid
+JOIN pg_namespace n ON n.oid = t.relnamespace
+CROSS JOIN LATERAL unnest(ix.indkey) WITH ORDINALITY AS k(attnum, position)
+JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+WHERE n.nspname = %s
+ORDER BY t.relname, i.relname, k.position
+"""
+
+
+def introspect_postgres(conn: Any, schema: str = "public") -> Dict[str, Any]:
+    """
+    Read a PostgreSQL schema into the same layout as `get_database_schema`.
+
+    Args:
+        conn: Open psycopg connection.
+        schema: Schema whose tables are introspected.
+    """
+    primary = set(conn.execute(_PG_PRIMARY_KEYS, (schema,)).fetchall())
+    tables: Dict[str, Any] = {}
+    for table, column, data_type in conn.execute(_PG_COLUMNS, (schema,)):
+        info = tables.setdefault(
+            table, {"columns": [], "foreign_keys": [], "indexes": []}
+        )
+        info["columns"].append(
+            {
+                "name": column,
+                "type": data_type,
+                "primary_key": (table, column) in primary,
+            }
+        )
+    for table, column, ref_table, ref_column in conn.execute(
+        _PG_FOREIGN_KEYS, (schema,)
+    ):
+        if table in tables:
+            tables[table]["foreign_keys"].append(
+                {
+                    "column": column,
+                    "references_table": ref_table,
+                    "references_column": ref_column,
+                }
+            )
+    indexes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for table, index_name, unique, column in conn.execute(_PG_INDEXES, (schema,)):
+        if table not in tables:
+            continue
+        index = indexes.get((table, index_name))
+        if index is None:
+            index = {"name": index_name, "columns": [], "unique": bool(unique)}
+            indexes[(table, index_name)] = index
+            tables[table]["indexes"].append(index)
+        index["columns"].append(column)
+    return tables
 
 
 def get_database_schema(db_path: str = "sample_university.db") -> Dict[str, Any]:
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    )
     tables = cursor.fetchall()
     schema: Dict[str, Any] = {}
     for (t,) in tables:
-        cursor.execute(f"PRAGMA table_info({t})")
-        cols = cursor.fetchall()
-        schema[t] = {
-            "columns": [
-                {"name": c[1], "type": c[2], "primary_key": bool(c[5])} for c in cols
-            ]
-        }
+        schema[t] = _introspect_table(cursor, t)
     conn.close()
     return schema
+
+
+def schema_fingerprint(schema_info: Dict[str, Any]) -> str:
+    """Stable hash of the schema, used to invalidate anything derived from it."""
+    payload = json.dumps(schema_info, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _table_hashes(cursor: sqlite3.Cursor) -> List[Tuple[str, str]]:
+    """Hash each table's DDL together with the DDL of its explicit indexes."""
+    # Internal tables such as sqlite_stat1, created by ANALYZE, are left out
+    cursor.execute(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master "
+        "WHERE type IN ('table', 'index') AND tbl_name NOT LIKE 'sqlite_%' "
+        "ORDER BY rowid"
+    )
+    ddl: Dict[str, List[str]] = {}
+    for kind, name, table, sql in cursor.fetchall():
+        if kind == "table":
+            ddl.setdefault(name, []).insert(0, sql or "")
+        elif sql:
+            ddl.setdefault(table, []).append(sql)
+    return [
+        (t, hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest())
+        for t, parts in ddl.items()
+    ]
+
+
+def load_database_schema(
+    db_path: str = "sample_university.db", snapshot_path: str | None = None
+) -> Dict[str, Any]:
+    """
+    Return the same schema as `get_database_schema`, using a persisted snapshot.
+
+    The DDL of every table is hashed from `sqlite_master`. When the digest of
+    all hashes matches the snapshot the schema is returned without introspecting
+    anything; otherwise only tables whose hash changed are re-introspected and
+    the snapshot is rewritten. `PRAGMA schema_version` is not enough, since a
+    replaced database file can have the same version and another schema.
+
+    Args:
+        db_path: Path to the SQLite database; opened read-only, so a wrong
+            path fails instead of creating an empty database.
+        snapshot_path: JSON file for the snapshot; defaults to `<db_path>.schema.json`.
+    """
+    snapshot_path = snapshot_path or f"{db_path}.schema.json"
+    snapshot: Dict[str, Any] = {}
+    if os.path.exists(snapshot_path):
+        try:
+            with open(snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable schema snapshot: {e}")
+
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(db_path))}?mode=ro", uri=True)
+    try:
+        cursor = conn.cursor()
+        hashes = _table_hashes(cursor)
+        digest = hashlib.sha256(
+            "\n".join(f"{t}:{h}" for t, h in sorted(hashes)).encode("utf-8")
+        ).hexdigest()
+        if snapshot.get("ddl_hash") == digest and "tables" in snapshot:
+            return {t: entry["info"] for t, entry in snapshot["tables"].items()}
+
+        previous: Dict[str, Any] = snapshot.get("tables", {})
+        tables: Dict[str, Any] = {}
+        for t, ddl_hash in hashes:
+            entry = previous.get(t)
+            if entry is None or entry.get("hash") != ddl_hash:
+                entry = {"hash": ddl_hash, "info": _introspect_table(cursor, t)}
+            tables[t] = entry
+    finally:
+        conn.close()
+
+    try:
+        with open(snapshot_path, "w", encoding="utf-8") as f:
+            json.dump({"ddl_hash": digest, "tables": tables}, f)
+    except OSError as e:
+        print(f"Could not write schema snapshot: {e}")
+    return {t: entry["info"] for t, entry in tables.items()}
@@ -1,5 +1,14 @@
+import argparse
+import glob
+import hashlib
+import os
 import sqlite3
-from typing import List, Tuple
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 def _drop_tables(cursor: sqlite3.Cursor) -> None:
@@ -251,11 +260,53 @@ def _insert_attendance(cursor: sqlite3.Cursor) -> None:
     cursor.executemany("INSERT INTO attendance VALUES (?, ?, ?, ?)", attendance)
 
 
-def create_sample_university_data(db_path: str = "sample_university.db") -> None:
+def _schema_hash(cursor: sqlite3.Cursor) -> str:
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )
+    ddl = "\n".join(f"{name}:{sql}" for name, sql in cursor.fetchall())
+    return hashlib.sha256(ddl.encode("utf-8")).hexdigest()
+
+
+def _expected_schema_hash() -> str:
+    conn = sqlite3.connect(":memory:")
+    try:
+        cursor = conn.cursor()
+        _create_tables(cursor)
+        return _schema_hash(cursor)
+    finally:
+        conn.close()
+
+
+def is_seeded(db_path: str = "sample_university.db") -> bool:
+    """True when `db_path` exists and already holds the university schema and data."""
+    if not os.path.exists(db_path):
+        return False
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        if _schema_hash(cursor) != _expected_schema_hash():
+            return False
+        # Seeding inserts attendance last, in the same transaction as everything else
+        return cursor.execute("SELECT 1 FROM attendance LIMIT 1").fetchone() is not None
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+
+
+def create_sample_university_data(
+    db_path: str = "sample_university.db", force: bool = False
+) -> None:
     """
     Creates a SQLite database at `db_path` with the university schema and seed data.
-    Drops existing tables and recreates them.
+    Does nothing when the database already matches the schema, unless `force`
+    is set, in which case existing tables are dropped and recreated.
     """
+    if not force and is_seeded(db_path):
+        return
+
     conn: sqlite3.Connection | None = None
     try:
         conn = sqlite3.connect(db_path)
@@ -283,3 +334,481 @@ def create_sample_university_data(db_path: str = "sample_university.db") -> None
     finally:
         if conn:
             conn.close()
+
+
+# Synthetic data at scale. Row counts of every table are derived from the
+# number of attendance rows, keeping the ratios of a real university.
+SESSIONS_PER_ENROLLMENT = 10
+COURSES_PER_STUDENT = 5
+STUDENTS_PER_COURSE = 40
+
+# Tables in foreign key order, with their columns
+TABLE_COLUMNS: Dict[str, List[str]] = {
+    "departments": ["id", "name", "building"],
+    "professors": ["id", "name", "email", "department_id"],
+    "students": ["id", "name", "email", "dob", "department_id"],
+    "courses": ["id", "title", "code", "credits", "department_id"],
+    "classrooms": ["id", "building", "room_number", "capacity"],
+    "schedules": [
+        "id",
+        "course_id",
+        "classroom_id",
+        "day_of_week",
+        "start_time",
+        "end_time",
+    ],
+    "course_professors": ["id", "course_id", "professor_id"],
+    "enrollments": ["id", "student_id", "course_id", "enrollment_date"],
+    "grades": ["id", "enrollment_id", "grade"],
+    "attendance": ["id", "enrollment_id", "date", "present"],
+}
+
+# Foreign key and filter columns, indexed once the data is loaded
+SCALE_INDEXES: List[Tuple[str, str]] = [
+    ("professors", "department_id"),
+    ("students", "department_id"),
+    ("courses", "department_id"),
+    ("schedules", "course_id"),
+    ("schedules", "classroom_id"),
+    ("course_professors", "course_id"),
+    ("course_professors", "professor_id"),
+    ("enrollments", "student_id"),
+    ("enrollments", "course_id"),
+    ("grades", "enrollment_id"),
+    ("attendance", "enrollment_id"),
+    ("attendance", "date"),
+]
+
+_DEPARTMENTS = [
+    "Computer Science", "Mathematics", "Physics", "Chemistry", "Biology",
+    "Economics", "History", "Philosophy", "Psychology", "Linguistics",
+    "Statistics", "Electrical Engineering", "Mechanical Engineering",
+    "Civil Engineering", "Political Science", "Sociology",
+]  # fmt: skip
+_FIRST_NAMES = [
+    "Fatima", "Mohammed", "Alice", "James", "Wei", "Priya", "Lucas", "Amara",
+    "Sofia", "Kenji", "Olga", "Diego", "Hana", "Noah", "Leila", "Tomas",
+]  # fmt: skip
+_LAST_NAMES = [
+    "Zahra", "Idris", "Kim", "Bond", "Chen", "Patel", "Silva", "Okafor",
+    "Rossi", "Tanaka", "Ivanova", "Garcia", "Sato", "Smith", "Haddad", "Novak",
+]  # fmt: skip
+_SUBJECTS = [
+    "Algorithms", "Databases", "Calculus", "Linear Algebra", "Mechanics",
+    "Thermodynamics", "Genetics", "Microeconomics", "Ethics", "Statistics",
+    "Machine Learning", "Operating Systems", "Organic Chemistry", "Optics",
+]  # fmt: skip
+_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+_GRADES = ["A", "B", "C", "D", "F"]
+_GRADE_WEIGHTS = [0.25, 0.35, 0.25, 0.1, 0.05]
+# Enrollments start on one of these days; classes then meet once a week
+_SEMESTERS = ["2023-01-09", "2023-09-04", "2024-01-08", "2024-09-02"]
+
+
+@dataclass
+class SyntheticScale:
+    """
+    Row counts of every table for a given number of attendance rows.
+
+    Each enrollment has `SESSIONS_PER_ENROLLMENT` attendance rows and one grade,
+    each student `COURSES_PER_STUDENT` enrollments, and courses have about
+    `STUDENTS_PER_COURSE` students; the smaller tables follow from courses.
+    """
+
+    attendance: int
+
+    @property
+    def enrollments(self) -> int:
+        return max(1, -(-self.attendance // SESSIONS_PER_ENROLLMENT))
+
+    @property
+    def students(self) -> int:
+        return max(1, -(-self.enrollments // COURSES_PER_STUDENT))
+
+    @property
+    def courses(self) -> int:
+        # At least 25, so a student's courses can all be distinct
+        return max(25, self.enrollments // STUDENTS_PER_COURSE)
+
+    @property
+    def departments(self) -> int:
+        return max(3, min(200, self.courses // 25))
+
+    @property
+    def professors(self) -> int:
+        return max(5, self.courses // 2)
+
+    @property
+    def classrooms(self) -> int:
+        return max(5, self.courses // 5)
+
+    def counts(self) -> Dict[str, int]:
+        """Rows per table, in foreign key order."""
+        return {
+            "departments": self.departments,
+            "professors": self.professors,
+            "students": self.students,
+            "courses": self.courses,
+            "classrooms": self.classrooms,
+            "schedules": 2 * self.courses,
+            "course_professors": self.courses,
+            "enrollments": self.enrollments,
+            "grades": self.enrollments,
+            "attendance": self.attendance,
+        }
+
+
+def _person_names(rng: "np.random.Generator", n: int) -> List[str]:
+    first = rng.integers(0, len(_FIRST_NAMES), n).tolist()
+    last = rng.integers(0, len(_LAST_NAMES), n).tolist()
+    return [f"{_FIRST_NAMES[f]} {_LAST_NAMES[g]}" for f, g in zip(first, last)]
+
+
+def _synthetic_rows(
+    table: str, scale: SyntheticScale, start: int, stop: int, seed: int
+) -> List[Tuple[Any, ...]]:
+    """
+    Rows with ids `start + 1` to `stop` of a synthetic table.
+
+    Every column is a function of the row id and `seed`, so batches can be
+    generated independently and foreign keys always point at existing rows.
+    """
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"Unknown table {table}")
+    # numpy is only needed for synthetic data, not to seed the sample database
+    import numpy as np
+
+    semesters = np.array(_SEMESTERS, dtype="datetime64[D]")
+    # One stream per table and batch; the table's position tells tables apart
+    rng = np.random.default_rng((seed, start, list(TABLE_COLUMNS).index(table)))
+    ids = np.arange(start + 1, stop + 1, dtype=np.int64)
+    n = len(ids)
+    if table == "departments":
+        names = [
+            _DEPARTMENTS[i] if i < len(_DEPARTMENTS) else f"Department {i + 1}"
+            for i in (ids - 1).tolist()
+        ]
+        buildings = [f"Building {i % 40 + 1}" for i in ids.tolist()]
+        return list(zip(ids.tolist(), names, buildings))
+    if table == "professors":
+        return list(
+            zip(
+                ids.tolist(),
+                _person_names(rng, n),
+                [f"prof{i}@univ.edu" for i in ids.tolist()],
+                rng.integers(1, scale.departments + 1, n).tolist(),
+            )
+        )
+    if table == "students":
+        dob = np.datetime64("1995-01-01") + rng.integers(0, 12 * 365, n)
+        return list(
+            zip(
+                ids.tolist(),
+                _person_names(rng, n),
+                [f"student{i}@univ.edu" for i in ids.tolist()],
+                dob.astype(str).tolist(),
+                rng.integers(1, scale.departments + 1, n).tolist(),
+            )
+        )
+    if table == "courses":
+        subjects = rng.integers(0, len(_SUBJECTS), n).tolist()
+        levels = rng.integers(1, 5, n).tolist()
+        return list(
+            zip(
+                ids.tolist(),
+                [
+                    f"{_SUBJECTS[s]} {'I' * min(lv, 3)} ({i})"
+                    for s, lv, i in zip(subjects, levels, ids.tolist())
+                ],
+                [f"C{i:06d}" for i in ids.tolist()],
+                rng.integers(1, 6, n).tolist(),
+                ((ids - 1) % scale.departments + 1).tolist(),
+            )
+        )
+    if table == "classrooms":
+        return list(
+            zip(
+                ids.tolist(),
+                [f"Building {i % 40 + 1}" for i in ids.tolist()],
+                [f"R{i:05d}" for i in ids.tolist()],
+                rng.choice([20, 30, 45, 60, 90, 120, 250], n).tolist(),
+            )
+        )
+    if table == "schedules":
+        hours = rng.integers(8, 18, n)
+        return list(
+            zip(
+                ids.tolist(),
+                ((ids - 1) // 2 + 1).tolist(),
+                rng.integers(1, scale.classrooms + 1, n).tolist(),
+                [_DAYS[d] for d in rng.integers(0, len(_DAYS), n).tolist()],
+                [f"{h:02d}:00" for h in hours.tolist()],
+                [f"{h + 2:02d}:00" for h in hours.tolist()],
+            )
+        )
+    if table == "course_professors":
+        return list(
+            zip(
+                ids.tolist(),
+                ids.tolist(),
+                rng.integers(1, scale.professors + 1, n).tolist(),
+            )
+        )
+    if table == "enrollments":
+        # The k-th enrollment of a student takes a course a fixed stride away
+        # from its first one, so a student never takes the same course twice
+        student = (ids - 1) // COURSES_PER_STUDENT
+        k = (ids - 1) % COURSES_PER_STUDENT
+        stride = scale.courses // COURSES_PER_STUDENT
+        course = (student * 7919 + k * stride) % scale.courses + 1
+        semester = semesters[student % len(semesters)]
+        return list(
+            zip(
+                ids.tolist(),
+                (student + 1).tolist(),
+                course.tolist(),
+                semester.astype(str).tolist(),
+            )
+        )
+    if table == "grades":
+        return list(
+            zip(
+                ids.tolist(),
+                ids.tolist(),
+                rng.choice(_GRADES, n, p=_GRADE_WEIGHTS).tolist(),
+            )
+        )
+    if table == "attendance":
+        enrollment = (ids - 1) // SESSIONS_PER_ENROLLMENT
+        session = (ids - 1) % SESSIONS_PER_ENROLLMENT
+        student = enrollment // COURSES_PER_STUDENT
+        date = semesters[student % len(semesters)] + 7 * session
+        return list(
+            zip(
+                ids.tolist(),
+                (enrollment + 1).tolist(),
+                date.astype(str).tolist(),
+                (rng.random(n) < 0.85).astype(np.int64).tolist(),
+            )
+        )
+    raise ValueError(f"Unknown table {table}")
+
+
+def _bulk_connect(db_path: str) -> sqlite3.Connection:
+    # Transactions are managed explicitly; with no journal and no fsync a crash
+    # mid-load corrupts the file, so loads write to a temporary file
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    for pragma in (
+        "journal_mode = OFF",
+        "synchronous = OFF",
+        "locking_mode = EXCLUSIVE",
+        "temp_store = MEMORY",
+        "cache_size = -262144",
+    ):
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
+
+
+def _insert_batches(
+    conn: sqlite3.Connection,
+    table: str,
+    batches: Iterable[List[Tuple[Any, ...]]],
+    rows_per_transaction: int = 1_000_000,
+) -> int:
+    placeholders = ", ".join("?" * len(TABLE_COLUMNS[table]))
+    sql = f"INSERT INTO {table} VALUES ({placeholders})"
+    total = pending = 0
+    conn.execute("BEGIN")
+    for batch in batches:
+        conn.executemany(sql, batch)
+        total += len(batch)
+        pending += len(batch)
+        if pending >= rows_per_transaction:
+            conn.execute("COMMIT")
+            conn.execute("BEGIN")
+            pending = 0
+    conn.execute("COMMIT")
+    return total
+
+
+def _write_parquet(
+    batches: Iterable[List[Tuple[Any, ...]]], parquet_dir: str, table: str
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """Pass batches through, writing each one as a part file of the table."""
+    import polars as pl
+
+    table_dir = os.path.join(parquet_dir, table)
+    os.makedirs(table_dir, exist_ok=True)
+    for i, batch in enumerate(batches):
+        pl.DataFrame(batch, schema=TABLE_COLUMNS[table], orient="row").write_parquet(
+            os.path.join(table_dir, f"part-{i:05d}.parquet")
+        )
+        yield batch
+
+
+def _read_parquet(
+    parquet_dir: str, table: str, batch_size: int
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """Rows of a table from `<dir>/<table>.parquet` or `<dir>/<table>/*.parquet`."""
+    import polars as pl
+
+    paths = sorted(glob.glob(os.path.join(parquet_dir, table, "*.parquet")))
+    single = os.path.join(parquet_dir, f"{table}.parquet")
+    if os.path.exists(single):
+        paths.insert(0, single)
+    for path in paths:
+        frame = pl.read_parquet(path, columns=TABLE_COLUMNS[table])
+        for chunk in frame.iter_slices(batch_size):
+            yield chunk.rows()
+
+
+def _bulk_load(
+    db_path: str, batches_of: Callable[[str], Iterable[List[Tuple[Any, ...]]]]
+) -> Dict[str, int]:
+    """
+    Build the university database at `db_path` from per-table row batches.
+
+    Tables are filled in foreign key order, then indexed and analyzed, in a
+    temporary file that replaces `db_path` only once it is complete.
+    """
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    counts: Dict[str, int] = {}
+    conn = _bulk_connect(tmp_path)
+    try:
+        _create_tables(conn.cursor())
+        for table in TABLE_COLUMNS:
+            start = time.perf_counter()
+            counts[table] = _insert_batches(conn, table, batches_of(table))
+            elapsed = time.perf_counter() - start
+            print(
+                f"{table:<18} {counts[table]:>12,} rows  "
+                f"{counts[table] / max(elapsed, 1e-9):>12,.0f} rows/s"
+            )
+        # Building each index once over the loaded table beats updating it per row
+        start = time.perf_counter()
+        for table, column in SCALE_INDEXES:
+            conn.execute(f"CREATE INDEX idx_{table}_{column} ON {table}({column})")
+        conn.execute("ANALYZE")
+        print(f"indexes and ANALYZE {time.perf_counter() - start:.1f}s")
+    finally:
+        conn.close()
+    # Stale WAL files of a previous database would be replayed into the new one
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(tmp_path, db_path)
+    return counts
+
+
+def generate_university_data(
+    db_path: str,
+    attendance_rows: int = 1_000_000,
+    seed: int = 0,
+    batch_size: int = 100_000,
+    parquet_dir: str | None = None,
+) -> Dict[str, int]:
+    """
+    Create a university database with synthetic, foreign-key-valid data at scale.
+
+    Table sizes follow from `attendance_rows` (see `SyntheticScale`), from a
+    few hundred rows up to 10^8 attendance rows. Rows are generated in batches
+    of `batch_size` and inserted with executemany in large transactions, with
+    journaling and syncing off during the load; indexes on foreign key columns
+    are built afterwards. The same `seed` always produces the same data.
+
+    Args:
+        db_path: SQLite file to create; an existing file is replaced.
+        attendance_rows: Number of attendance rows, the largest table.
+        seed: Random seed.
+        batch_size: Rows generated and inserted per executemany call.
+        parquet_dir: Also write every table as Parquet part files under
+            `<parquet_dir>/<table>/`, loadable with `load_parquet`.
+
+    Returns:
+        The number of rows per table.
+    """
+    scale = SyntheticScale(attendance_rows)
+    counts = scale.counts()
+
+    def batches_of(table: str) -> Iterable[List[Tuple[Any, ...]]]:
+        batches: Iterable[List[Tuple[Any, ...]]] = (
+            _synthetic_rows(
+                table, scale, start, min(start + batch_size, counts[table]), seed
+            )
+            for start in range(0, counts[table], batch_size)
+        )
+        if parquet_dir:
+            batches = _write_parquet(batches, parquet_dir, table)
+        return batches
+
+    return _bulk_load(db_path, batches_of)
+
+
+def load_parquet(
+    db_path: str, parquet_dir: str, batch_size: int = 100_000
+) -> Dict[str, int]:
+    """
+    Create a university database from Parquet files read with Polars.
+
+    Each table is read from `<parquet_dir>/<table>.parquet` and/or the part
+    files in `<parquet_dir>/<table>/`, with columns named as in the schema.
+    Loading uses the same bulk path as `generate_university_data`.
+
+    Returns:
+        The number of rows per table.
+    """
+    return _bulk_load(
+        db_path, lambda table: _read_parquet(parquet_dir, table, batch_size)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generate a university database at scale for load tests."
+    )
+    parser.add_argument("--db", type=str, default="university_scale.db")
+    parser.add_argument(
+        "--attendance-rows",
+        type=float,
+        default=1e6,
+        help="Rows in the attendance table; every other table scales with it.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument(
+        "--parquet",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Also write every table as Parquet part files under DIR.",
+    )
+    parser.add_argument(
+        "--from-parquet",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Load the tables from Parquet files under DIR instead of generating.",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.from_parquet:
+        counts = load_parquet(args.db, args.from_parquet, args.batch_size)
+    else:
+        counts = generate_university_data(
+            args.db,
+            int(args.attendance_rows),
+            args.seed,
+            args.batch_size,
+            args.parquet,
+        )
+    print(
+        f"Database '{args.db}' built with {sum(counts.values()):,} rows "
+        f"in {time.perf_counter() - start:.1f}s."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from .engine import Database
+
+
+@dataclass
+class ValidationResult:
+    """
+    Outcome of validating a query without running it.
+
+    Attributes:
+        error: Why the query cannot run, or None when it is valid.
+        full_scans: Large tables the plan reads in full, with estimated rows.
+        plan: The plan steps reported by the database.
+    """
+
+    error: str | None = None
+    full_scans: Dict[str, int] = field(default_factory=dict)
+    plan: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def warnings(self) -> List[str]:
+        return [
+            f"Full scan of table '{t}' (~{rows:,} rows)"
+            for t, rows in self.full_scans.items()
+        ]
+
+
+# The first keyword, past whitespace, comments and opening parentheses; the
+# atomic group keeps a keyword inside a comment from matching
+_FIRST_KEYWORD = re.compile(r"(?>(?:\s|--[^\n]*|/\*.*?\*/|\()*)([A-Za-z]+)", re.DOTALL)
+
+
+class SQLValidator:
+    """
+    Checks generated SQL against the database without reading any data.
+
+    Explaining a statement makes the database parse it and resolve every table
+    and column, so syntax errors and unknown names surface in microseconds. The
+    plan also shows which tables would be scanned in full; scans of tables
+    with at least `large_table_rows` rows are reported.
+    """
+
+    def __init__(self, database: Database, large_table_rows: int = 100_000) -> None:
+        self.database = database
+        self.large_table_rows = large_table_rows
+
+    def validate(self, sql: str) -> ValidationResult:
+        """Return the plan of `sql`, or the error that would stop it from running."""
+        statement = sql.strip().rstrip(";").strip()
+        if not statement:
+            return ValidationResult(error="Empty SQL statement.")
+        # Statement completeness is the same question in both dialects; the
+        # terminator goes on its own line so a trailing comment cannot hide it
+        if not sqlite3.complete_statement(statement + "\n;"):
+            return ValidationResult(error="Incomplete SQL statement.")
+        match = _FIRST_KEYWORD.match(statement)
+        if not match or match.group(1).upper() not in ("SELECT", "WITH"):
+            return ValidationResult(error="Only SELECT queries are allowed.")
+
+        try:
+            plan = self.database.explain(statement)
+        except self.database.errors as e:
+            return ValidationResult(error=str(e).strip())
+        return ValidationResult(
+            plan=plan.steps,
+            full_scans={
+                t: rows
+                for t, rows in plan.full_scans.items()
+                if rows >= self.large_table_rows
+            },
+        )
@@ -1,55 +1,300 @@
+import asyncio
+import hashlib
 import json
+import os
 from llama_index.core import Settings
-from llama_index.core.schema import TextNode, BaseNode
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
 from llama_index.core.vector_stores.types import VectorStore
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Set, TextIO, Tuple
 
 
-def initialize_embeddings(
+def _iter_json_array(f: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the items of a top-level JSON array without reading it all at once."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # Skip whitespace, the opening bracket and item separators
+        while pos < len(buffer) and (
+            buffer[pos].isspace()
+            or buffer[pos] == ","
+            or (not started and buffer[pos] == "[")
+        ):
+            started = started or buffer[pos] == "["
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        if pos < len(buffer):
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+                yield item
+                continue
+            except json.JSONDecodeError:
+                # The item is cut off at the end of the buffer, read more of it
+                if eof:
+                    raise
+        elif eof:
+            return
+        chunk = f.read(chunk_size)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+
+def iter_samples(sample_queries_path: str) -> Iterator[Dict[str, str]]:
+    """Stream sample queries from a JSON array or a JSONL file."""
+    with open(sample_queries_path, "r", encoding="utf-8") as f:
+        if sample_queries_path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(f)
+
+
+def sample_text(sample: Dict[str, str]) -> str:
+    natural = sample.get("natural_language", "").strip()
+    sql = sample.get("sql", "").strip()
+    desc = sample.get("description", "").strip()
+    return f"Query: {natural}\nSQL: {sql}\nDescription: {desc}"
+
+
+def sample_node_id(text: str) -> str:
+    """Content-derived node id, so unchanged samples keep their id across runs."""
+    return f"sample_{hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]}"
+
+
+# Attributes that tell apart stores of one type, e.g. two local directories
+_STORE_ATTRIBUTES = (
+    "persist_dir",
+    "url",
+    "database",
+    "index_name",
+    "node_label",
+    "table_name",
+    "collection_name",
+)
+
+
+def store_identity(vector_store: VectorStore) -> str:
+    """Identify where a vector store keeps its nodes, for the embedding manifest."""
+    parts = [type(vector_store).__name__]
+    for name in _STORE_ATTRIBUTES:
+        value = getattr(vector_store, name, None)
+        if isinstance(value, str) and value:
+            if name == "persist_dir":
+                value = os.path.abspath(value)
+            parts.append(f"{name}={value}")
+    return ";".join(parts)
+
+
+def _load_manifest(manifest_path: str) -> Dict[str, Any]:
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest: Dict[str, Any] = json.load(f)
+        return manifest
+    except Exception as e:
+        print(f"Ignoring unreadable embedding manifest: {e}")
+        return {}
+
+
+def _save_manifest(
+    manifest_path: str, store: str, embedding_model: str, node_ids: Set[str]
+) -> None:
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "store": store,
+                "embedding_model": embedding_model,
+                "node_ids": sorted(node_ids),
+            },
+            f,
+        )
+
+
+async def _delete_samples(vector_store: VectorStore, node_ids: Set[str]) -> Set[str]:
+    """Delete samples from the store in one call if it can; returns the ids left."""
+    if not node_ids:
+        return set()
+    try:
+        await asyncio.to_thread(vector_store.delete_nodes, sorted(node_ids))
+        return set()
+    except NotImplementedError:
+        pass
+    except Exception as e:
+        print(f"Error deleting {len(node_ids)} samples: {e}")
+        return set(node_ids)
+    # Sample nodes are their own source, so ref_doc_id deletes work everywhere
+    undeleted: Set[str] = set()
+    for node_id in node_ids:
+        try:
+            await asyncio.to_thread(vector_store.delete, node_id)
+        except Exception as e:
+            print(f"Error deleting sample {node_id}: {e}")
+            undeleted.add(node_id)
+    return undeleted
+
+
+async def _delete_legacy_samples(vector_store: VectorStore, count: int) -> None:
+    """Delete samples stored as `sample_query_<position>` before the manifest."""
+    # Positions past the current length of the file cannot be known
+    legacy = [f"sample_query_{i}" for i in range(1, count + 1)]
+    try:
+        await asyncio.to_thread(vector_store.delete_nodes, legacy)
+    except NotImplementedError:
+        # Legacy nodes have no source id, so per-id deletes cannot reach them
+        print(
+            "Vector store cannot delete nodes by id; rebuild it if it holds "
+            "samples ingested before the embedding manifest"
+        )
+    except Exception as e:
+        print(f"Error deleting legacy samples: {e}")
+
+
+async def ainitialize_embeddings(
     vector_store: VectorStore,
     schema_info: Dict[str, Any],
     sample_queries_path: str = "examples/sample_queries.json",
+    batch_size: int = 100,
+    max_concurrency: int = 4,
+    manifest_path: str | None = None,
 ) -> None:
     """
-    Load sample SQL queries from JSON, embed them using the globally configured
-    embedding model, and add them to the provided vector_store.
+    Sync the vector store with the sample SQL queries in a JSON or JSONL file.
+
+    Samples are streamed from disk and identified by a hash of their text. A
+    manifest of the ids already in the store is kept next to the samples, so only
+    new samples are embedded, in batches of `batch_size` with at most
+    `max_concurrency` batches in flight, and samples that disappeared from the
+    file are deleted from the store. The manifest records the store and the
+    embedding model name and dimension; if either changed, every sample is
+    embedded again. Without a manifest, samples stored under the positional ids
+    used before it (`sample_query_1`, ...) are deleted first; stores that cannot
+    delete by node id must be rebuilt instead.
 
     Args:
         vector_store: An instance of a LlamaIndex vector store (e.g., Neo4jVectorStore).
         schema_info: Schema metadata (unused here but kept for interface consistency).
-        sample_queries_path: Path to the JSON file with sample queries.
+        sample_queries_path: Path to the JSON or JSONL file with sample queries.
+        batch_size: Number of samples sent per embedding request.
+        max_concurrency: Maximum number of embedding requests in flight.
+        manifest_path: Where to record ingested ids; defaults to
+            `<sample_queries_path>.manifest.json`.
     """
     # Use the globally configured embedding model
     embed_model = Settings.embed_model
+    manifest_path = manifest_path or f"{sample_queries_path}.manifest.json"
+    manifest = _load_manifest(manifest_path)
+    store = store_identity(vector_store)
+    probe = await embed_model.aget_text_embedding("dimension probe")
+    model = f"{embed_model.model_name}:{len(probe)}"
+
+    stored: Set[str] = set(manifest.get("node_ids", []))
+    previous = stored
+    if manifest and manifest.get("store") != store:
+        # The ids describe another store, whose nodes are not ours to delete
+        print("Embedding manifest is for another vector store, embedding all samples")
+        stored = previous = set()
+    elif manifest and manifest.get("embedding_model") != model:
+        # Vectors of another model, possibly of another dimension, cannot share
+        # the store with new ones
+        print("Embedding manifest is for another model, embedding all samples")
+        await _delete_samples(vector_store, previous)
+        stored = previous = set()
+
+    seen: Set[str] = set()
+    added: Set[str] = set()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks: Set[asyncio.Task[None]] = set()
+
+    async def embed_batch(batch: List[Tuple[str, str]]) -> None:
+        try:
+            embeddings = await embed_model.aget_text_embedding_batch(
+                [text for _, text in batch]
+            )
+            nodes = [
+                TextNode(
+                    text=text,
+                    embedding=embedding,
+                    id_=node_id,
+                    # The source id lets stores delete the node by ref_doc_id
+                    relationships={
+                        NodeRelationship.SOURCE: RelatedNodeInfo(node_id=node_id)
+                    },
+                )
+                for (node_id, text), embedding in zip(batch, embeddings)
+            ]
+            await asyncio.to_thread(vector_store.add, nodes)
+            added.update(node_id for node_id, _ in batch)
+        except Exception as e:
+            print(f"Error embedding batch of {len(batch)} samples: {e}")
+        finally:
+            semaphore.release()
 
-    # Load sample queries
+    async def submit(batch: List[Tuple[str, str]]) -> None:
+        await semaphore.acquire()
+        task = asyncio.create_task(embed_batch(batch))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    batch: List[Tuple[str, str]] = []
+    read = 0
     try:
-        with open(sample_queries_path, "r", encoding="utf-8") as f:
-            samples: List[Dict[str, str]] = json.load(f)
+        for sample in iter_samples(sample_queries_path):
+            read += 1
+            text = sample_text(sample)
+            node_id = sample_node_id(text)
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+            if node_id in stored:
+                continue
+            batch.append((node_id, text))
+            if len(batch) >= batch_size:
+                await submit(batch)
+                batch = []
+        if batch:
+            await submit(batch)
     except Exception as e:
+        # Keep what was ingested, but never delete based on a partial read
         print(f"Error loading sample queries: {e}")
+        await asyncio.gather(*tasks)
+        _save_manifest(manifest_path, store, model, stored | added)
         return
+    await asyncio.gather(*tasks)
 
-    nodes: List[BaseNode] = []
-    # Embed each sample query as a TextNode
-    for idx, sample in enumerate(samples):
-        natural = sample.get("natural_language", "").strip()
-        sql = sample.get("sql", "").strip()
-        desc = sample.get("description", "").strip()
-        # Construct the text for embedding
-        text = f"Query: {natural}\nSQL: {sql}\nDescription: {desc}"
-        try:
-            embedding = embed_model.get_text_embedding(text)
-            node = TextNode(
-                text=text, embedding=embedding, id_=f"sample_query_{idx + 1}"
-            )
-            nodes.append(node)
-        except Exception as e:
-            print(f"Error embedding sample #{idx + 1}: {e}")
-
-    # Push nodes into the vector store
-    if nodes:
-        vector_store.add(nodes)
-        print(f"Embedded and added {len(nodes)} samples to vector store.")
-    else:
-        print("No nodes were created for embedding.")
+    if not manifest:
+        await _delete_legacy_samples(vector_store, read)
+    removed = previous - seen
+    undeleted = await _delete_samples(vector_store, removed)
+
+    _save_manifest(manifest_path, store, model, (stored & seen) | added | undeleted)
+    print(
+        f"Embedded and added {len(added)} samples, skipped "
+        f"{len(seen & stored)} unchanged, removed {len(removed)} from vector store."
+    )
+
+
+def initialize_embeddings(
+    vector_store: VectorStore,
+    schema_info: Dict[str, Any],
+    sample_queries_path: str = "examples/sample_queries.json",
+    batch_size: int = 100,
+    max_concurrency: int = 4,
+    manifest_path: str | None = None,
+) -> None:
+    """Synchronous wrapper around `ainitialize_embeddings`."""
+    asyncio.run(
+        ainitialize_embeddings(
+            vector_store,
+            schema_info,
+            sample_queries_path,
+            batch_size,
+            max_concurrency,
+            manifest_path,
+        )
+    )
@@ -0,0 +1,381 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.indices.vector_store.retrievers import VectorIndexRetriever
+from llama_index.core.schema import (
+    BaseNode,
+    MetadataMode,
+    NodeRelationship,
+    NodeWithScore,
+    QueryBundle,
+    RelatedNodeInfo,
+    TextNode,
+)
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from typing import Any, Callable, Dict, List, Literal, Sequence, Tuple
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 keyword index over a fixed list of documents."""
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc, text in enumerate(texts):
+            counts = Counter(_tokenize(text))
+            lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if self.size else 0.0
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (
+                np.array([d for d, _ in entries], dtype=np.int64),
+                np.array([tf for _, tf in entries], dtype=np.float32),
+            )
+            for term, entries in postings.items()
+        }
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        if not self.size:
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / (self.avg_length or 1.0))
+        for term in set(_tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tfs = self.postings[term]
+            idf = math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+        return scores
+
+
+class LocalVectorStore(BasePydanticVectorStore):
+    """
+    In-process vector store persisted as a memory-mapped float32 matrix.
+
+    Embeddings are kept L2-normalised in a raw row-major float32 file that is
+    opened with `np.memmap`, so loading does not copy the matrix. Adding nodes
+    appends to the files; `meta.json` is rewritten last and records how many
+    rows are committed. Search is a brute-force matrix-vector product, or an IVF
+    index (spherical k-means lists, probing the `ivf_probes` closest lists) that
+    is retrained lazily after the store changes. With `hybrid_search` the dense
+    scores are fused with BM25 keyword scores, matching the hybrid behaviour of
+    the Neo4j backend.
+    """
+
+    stores_text: bool = True
+    persist_dir: str
+    index_type: Literal["flat", "ivf"] = "flat"
+    ivf_lists: int = 0
+    ivf_probes: int = 8
+    hybrid_search: bool = True
+    alpha: float = 0.5
+
+    _matrix: np.ndarray = PrivateAttr()
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[str] = PrivateAttr(default_factory=list)
+    _texts: List[str] = PrivateAttr(default_factory=list)
+    _metadata: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+    _bm25: BM25Index | None = PrivateAttr(default=None)
+    _centroids: np.ndarray | None = PrivateAttr(default=None)
+    _assignments: np.ndarray | None = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, persist_dir: str, **kwargs: Any) -> None:
+        super().__init__(persist_dir=persist_dir, **kwargs)
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._load()
+
+    @property
+    def client(self) -> None:
+        return None
+
+    # Not __len__: llama-index tests stores for truthiness and would replace an
+    # empty one with its default in-memory store
+    @property
+    def node_count(self) -> int:
+        return len(self._ids)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.persist_dir, name)
+
+    def _map(self, count: int, dim: int) -> None:
+        self._matrix = (
+            np.memmap(
+                self._path("embeddings.f32"),
+                dtype=np.float32,
+                mode="r",
+                shape=(count, dim),
+            )
+            if count
+            else np.zeros((0, dim), dtype=np.float32)
+        )
+
+    def _load(self) -> None:
+        if not os.path.exists(self._path("meta.json")):
+            return
+        with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        count, dim = meta["count"], meta["dim"]
+        with open(self._path("nodes.jsonl"), "rb+") as f:
+            for _ in range(count):
+                record = json.loads(f.readline())
+                self._ids.append(record["id"])
+                self._ref_doc_ids.append(record["ref_doc_id"])
+                self._texts.append(record["text"])
+                self._metadata.append(record["metadata"])
+            # Drop rows left behind by an append that never committed
+            f.truncate(f.tell())
+        os.truncate(self._path("embeddings.f32"), count * dim * 4)
+        self._map(count, dim)
+        if os.path.exists(self._path("ivf.npz")):
+            with np.load(self._path("ivf.npz")) as ivf:
+                if int(ivf["count"]) == count:
+                    self._centroids = ivf["centroids"]
+                    self._assignments = ivf["assignments"]
+
+    @staticmethod
+    def _record(node_id: str, ref_doc_id: str, text: str, metadata: Any) -> str:
+        return (
+            json.dumps(
+                {
+                    "id": node_id,
+                    "ref_doc_id": ref_doc_id,
+                    "text": text,
+                    "metadata": metadata,
+                }
+            )
+            + "\n"
+        )
+
+    def _commit(self, dim: int) -> None:
+        tmp = self._path("meta.tmp.json")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"count": len(self._ids), "dim": dim}, f)
+        os.replace(tmp, self._path("meta.json"))
+        self._map(len(self._ids), dim)
+        # Derived indexes are rebuilt on the next query
+        self._bm25 = None
+        self._centroids = self._assignments = None
+
+    def _rewrite(self, matrix: np.ndarray) -> None:
+        os.makedirs(self.persist_dir, exist_ok=True)
+        # Write beside the live files and swap them in, so readers that still
+        # map the old matrix keep a valid file
+        tmp = self._path("embeddings.tmp.f32")
+        np.ascontiguousarray(matrix, dtype=np.float32).tofile(tmp)
+        os.replace(tmp, self._path("embeddings.f32"))
+        tmp = self._path("nodes.tmp.jsonl")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in zip(
+                self._ids, self._ref_doc_ids, self._texts, self._metadata
+            ):
+                f.write(self._record(*record))
+        os.replace(tmp, self._path("nodes.jsonl"))
+        self._commit(matrix.shape[1])
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        vectors = np.asarray([n.get_embedding() for n in nodes], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+        ids = [n.node_id for n in nodes]
+        refs = [n.ref_doc_id or n.node_id for n in nodes]
+        texts = [n.get_content(metadata_mode=MetadataMode.NONE) for n in nodes]
+        metadata = [dict(n.metadata) for n in nodes]
+
+        with self._lock:
+            if self._ids and vectors.shape[1] != self._matrix.shape[1]:
+                raise ValueError(
+                    f"Embeddings have {vectors.shape[1]} dimensions, the store "
+                    f"holds {self._matrix.shape[1]}; delete its nodes first"
+                )
+            incoming = set(ids)
+            if incoming.isdisjoint(self._ids):
+                # Common case: append the new rows to the end of both files
+                os.makedirs(self.persist_dir, exist_ok=True)
+                with open(self._path("embeddings.f32"), "ab") as f:
+                    f.write(vectors.tobytes())
+                with open(self._path("nodes.jsonl"), "a", encoding="utf-8") as f:
+                    for record in zip(ids, refs, texts, metadata):
+                        f.write(self._record(*record))
+                self._ids += ids
+                self._ref_doc_ids += refs
+                self._texts += texts
+                self._metadata += metadata
+                self._commit(vectors.shape[1])
+                return ids
+
+            # Re-adding an id replaces the previous node with that id
+            keep = [i for i, node_id in enumerate(self._ids) if node_id not in incoming]
+            matrix = np.concatenate([np.asarray(self._matrix)[keep], vectors])
+            self._ids = [self._ids[i] for i in keep] + ids
+            self._ref_doc_ids = [self._ref_doc_ids[i] for i in keep] + refs
+            self._texts = [self._texts[i] for i in keep] + texts
+            self._metadata = [self._metadata[i] for i in keep] + metadata
+            self._rewrite(matrix)
+        return ids
+
+    def _drop(self, removed: Callable[[int], bool]) -> None:
+        with self._lock:
+            keep = [i for i in range(len(self._ids)) if not removed(i)]
+            if len(keep) == len(self._ids):
+                return
+            matrix = np.asarray(self._matrix)[keep]
+            self._ids = [self._ids[i] for i in keep]
+            self._ref_doc_ids = [self._ref_doc_ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadata = [self._metadata[i] for i in keep]
+            self._rewrite(matrix)
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._drop(lambda i: self._ref_doc_ids[i] == ref_doc_id)
+
+    def delete_nodes(
+        self,
+        node_ids: List[str] | None = None,
+        filters: MetadataFilters | None = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        """Delete nodes by id, rewriting the store once for the whole batch."""
+        if filters is not None:
+            raise NotImplementedError("LocalVectorStore cannot delete by filters")
+        removed = set(node_ids or [])
+        if removed:
+            self._drop(lambda i: self._ids[i] in removed)
+
+    def _train_ivf(self) -> None:
+        n = len(self._ids)
+        lists = self.ivf_lists or int(math.sqrt(n))
+        if lists < 2 or n < lists * 4:
+            return
+        rng = np.random.default_rng(0)
+        sample = np.asarray(
+            self._matrix[np.sort(rng.choice(n, size=min(n, lists * 64), replace=False))]
+        )
+        centroids = sample[rng.choice(len(sample), size=lists, replace=False)].copy()
+        for _ in range(10):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for i in range(lists):
+                members = sample[labels == i]
+                if len(members):
+                    centroids[i] = members.mean(axis=0)
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True).clip(
+                min=1e-12
+            )
+        self._centroids = centroids.astype(np.float32)
+        self._assignments = np.argmax(self._matrix @ centroids.T, axis=1).astype(
+            np.int32
+        )
+        np.savez(
+            self._path("ivf.npz"),
+            count=n,
+            centroids=self._centroids,
+            assignments=self._assignments,
+        )
+
+    def _dense(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self.index_type == "ivf" and self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    self._train_ivf()
+        rows = np.array([], dtype=np.int64)
+        if self._centroids is not None and self._assignments is not None:
+            probes = np.argsort(-(self._centroids @ query))[: self.ivf_probes]
+            rows = np.flatnonzero(np.isin(self._assignments, probes))
+            scores = self._matrix[rows] @ query
+        if not len(rows):
+            # Flat search, or probed lists that are all empty
+            rows = np.arange(len(self._ids))
+            scores = self._matrix @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k] if k else np.array([], dtype=int)
+        return rows[top], scores[top]
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if not self._ids or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+        k = query.similarity_top_k
+        vector = np.asarray(query.query_embedding, dtype=np.float32)
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+
+        if not (self.hybrid_search and query.query_str):
+            rows, scores = self._dense(vector, k)
+        else:
+            # Fuse max-normalised dense and keyword scores over both candidate sets
+            dense_rows, _ = self._dense(vector, k * 4)
+            if self._bm25 is None:
+                self._bm25 = BM25Index(self._texts)
+            keyword = self._bm25.scores(query.query_str)
+            keyword_rows = np.argsort(-keyword)[: k * 4]
+            rows = np.union1d(dense_rows, keyword_rows)
+            dense = self._matrix[rows] @ vector
+            dense_max = max(float(dense.max()), 1e-12)
+            keyword_max = max(float(keyword.max()), 1e-12)
+            alpha = query.alpha if query.alpha is not None else self.alpha
+            scores = (
+                alpha * dense / dense_max + (1 - alpha) * keyword[rows] / keyword_max
+            )
+
+        order = np.argsort(-scores)[:k]
+        nodes = [
+            TextNode(
+                id_=self._ids[i],
+                text=self._texts[i],
+                metadata=self._metadata[i],
+                relationships={
+                    NodeRelationship.SOURCE: RelatedNodeInfo(
+                        node_id=self._ref_doc_ids[i]
+                    )
+                },
+            )
+            for i in rows[order]
+        ]
+        return VectorStoreQueryResult(
+            nodes=nodes,
+            similarities=[float(s) for s in scores[order]],
+            ids=[n.node_id for n in nodes],
+        )
+
+
+class LocalVectorRetriever(VectorIndexRetriever):
+    """
+    Retriever over a `LocalVectorStore` that answers an empty store with no nodes.
+
+    LlamaIndex rejects a query result without nodes or ids, which is exactly
+    what an empty store returns, so such queries never reach the store.
+    """
+
+    def _get_nodes_with_embeddings(
+        self, query_bundle_with_embeddings: QueryBundle
+    ) -> List[NodeWithScore]:
+        if not self._vector_store.node_count:
+            return []
+        return super()._get_nodes_with_embeddings(query_bundle_with_embeddings)
+
+    async def _aget_nodes_with_embeddings(
+        self, query_bundle_with_embeddings: QueryBundle
+    ) -> List[NodeWithScore]:
+        if not self._vector_store.node_count:
+            return []
+        return await super()._aget_nodes_with_embeddings(query_bundle_with_embeddings)
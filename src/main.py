@@ -1,9 +1,47 @@
-from .querygpt import QueryGPT
+from .cli import add_pipeline_arguments, pipeline_from_args
+from .utils import serialize_result
 import argparse
+import asyncio
+import contextlib
 import json
 import logging
 import sys
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, TextIO
+
+if TYPE_CHECKING:
+    from .querygpt import QueryGPT
+
+
+def read_questions(path: str) -> Iterator[str]:
+    """Stream questions from a JSONL file, or from stdin when `path` is '-'."""
+    with (
+        contextlib.nullcontext(sys.stdin)
+        if path == "-"
+        else open(path, "r", encoding="utf-8")
+    ) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            yield item if isinstance(item, str) else item["question"]
+
+
+async def write_batch(
+    pipeline: "QueryGPT", questions: Iterable[str], concurrency: int, out: TextIO
+) -> None:
+    # Questions are read as the batch goes; keep each one until its result is out
+    pending: Dict[int, str] = {}
+
+    def track() -> Iterator[str]:
+        for i, question in enumerate(questions):
+            pending[i] = question
+            yield question
+
+    async for i, result in pipeline.agenerate_queries(track(), concurrency):
+        record = {"index": i, "question": pending.pop(i), **serialize_result(result)}
+        out.write(json.dumps(record, default=str))
+        out.write("\n")
+        out.flush()
 
 
 def main() -> None:
@@ -20,12 +58,62 @@ def main() -> None:
 
     parser = argparse.ArgumentParser(description="Run the NL-to-SQL pipeline.")
     parser.add_argument(
-        "query", type=str, help="Natural language query to convert to SQL."
+        "query", type=str, nargs="?", help="Natural language query to convert to SQL."
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help=(
+            "Read questions from a JSONL file ('-' for stdin), one JSON string or "
+            '{"question": ...} object per line, and write JSONL results to stdout '
+            "in completion order."
+        ),
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of questions in flight in batch mode.",
+    )
+    parser.add_argument(
+        "--export",
+        type=str,
+        default=None,
+        metavar="CSV",
+        help="Stream the full result of the generated query to a CSV file.",
+    )
+    add_pipeline_arguments(parser)
     args = parser.parse_args()
-    pipeline = QueryGPT()
-    result: Dict[str, Any] = pipeline.generate_query(args.query)
+    if (args.query is None) == (args.batch is None):
+        parser.error("pass either a query or --batch FILE")
+    if args.export and args.batch is not None:
+        parser.error("--export only applies to a single query")
+    if args.batch is not None:
+        # Keep stdout for the JSONL results
+        handler.setStream(sys.stderr)
+
+    pipeline = pipeline_from_args(args)
+    if args.batch is not None:
+        questions = read_questions(args.batch)
+        out = sys.stdout
+        # Progress and error messages are printed, keep them out of the results
+        with contextlib.redirect_stdout(sys.stderr):
+            asyncio.run(write_batch(pipeline, questions, args.concurrency, out))
+    else:
+        result = asyncio.run(pipeline.agenerate_query(args.query))
+        print_result(result)
+        if args.export and "error" not in result:
+            rows = pipeline.export_result(result["sql_result"].sql, args.export)
+            print(f"\nExported {rows} rows to {args.export}")
+
+    intent_stats = pipeline.intent_classifier_stats()
+    if intent_stats is not None:
+        logging.info("Intent fast path: %s", intent_stats)
+
 
+def print_result(result: Dict[str, Any]) -> None:
     if "error" in result:
         print(f"An error occurred: {result['error']}")
     else:
@@ -35,6 +123,43 @@ def main() -> None:
         print(result["sql_result"].explanation)
         print("\n--- Result Preview ---")
         print(json.dumps(result["query_result"], indent=2))
+        validation = result.get("validation") or {}
+        if validation.get("repairs"):
+            print(f"\n(Repaired {validation['repairs']} time(s) after validation)")
+        for warning in validation.get("warnings", []):
+            print(f"Warning: {warning}")
+        route = result.get("route")
+        if route:
+            fallback = " after falling back from fast" if route["fallback"] else ""
+            print(
+                f"\n(Answered by the {route['path']} path{fallback}: {route['reason']})"
+            )
+        speculation = result.get("speculation")
+        if speculation:
+            outcome = (
+                f"accepted ({speculation['reason']})"
+                if speculation["accepted"]
+                else "rejected"
+            )
+            print(
+                f"(Speculative draft {outcome}, saved {speculation['saved_ms']:.0f} ms)"
+            )
+        voting = result.get("voting")
+        if voting:
+            deadline = ", deadline reached" if voting["deadline_hit"] else ""
+            print(
+                f"(Candidate {voting['winner']} won with {voting['votes']} of "
+                f"{voting['candidates']} votes{deadline})"
+            )
+    telemetry = result.get("telemetry")
+    if telemetry:
+        print(
+            f"\n--- Timing: {telemetry['total_ms']:.0f} ms, "
+            f"{telemetry['prompt_tokens']} + {telemetry['completion_tokens']} tokens, "
+            f"${telemetry['cost_usd']:.5f} ---"
+        )
+        for name, stage in telemetry["stages"].items():
+            print(f"{name:<16} {stage['ms']:>9.1f} ms")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Set, Tuple
+
+import numpy as np
+
+from .config import PromptBudgetConfig
+from .utils import terms
+
+if TYPE_CHECKING:
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+
+
+def key_columns(schema_info: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """Primary and foreign key columns of every table, kept when trimming."""
+    keys: Dict[str, Set[str]] = {}
+    for table, info in schema_info.items():
+        keys[table] = {c["name"] for c in info["columns"] if c.get("primary_key")}
+        keys[table].update(fk["column"] for fk in info.get("foreign_keys", []))
+    return keys
+
+
+class PromptBudget:
+    """
+    Token budgets for the schema and few-shot context of every agent prompt.
+
+    Tokens are counted locally with the LlamaIndex tokenizer. Schema text is cut
+    to a stage budget by ranking tables and columns by their term overlap with
+    the question, keeping key columns so joins stay possible. Few-shot samples
+    are picked with maximal marginal relevance (MMR) over their embeddings, so
+    near-identical samples do not crowd out different ones, then packed until
+    the budget runs out. Sample embeddings are cached, as retrieval keeps
+    returning samples from the same corpus.
+    """
+
+    def __init__(
+        self,
+        config: PromptBudgetConfig | None = None,
+        embed_model: "BaseEmbedding | None" = None,
+        tokenizer: Callable[[str], List[Any]] | None = None,
+    ) -> None:
+        if tokenizer is None:
+            from llama_index.core.utils import get_tokenizer
+
+            tokenizer = get_tokenizer()
+        self.config = config or PromptBudgetConfig()
+        self.embed_model = embed_model
+        self.tokenizer = tokenizer
+        self._vectors: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._line_costs: OrderedDict[Tuple[str, Tuple[str, ...]], int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer(text))
+
+    def _line_cost(self, table: str, columns: List[str]) -> int:
+        # Full table lines recur on every call over the same schema
+        key = (table, tuple(columns))
+        with self._lock:
+            cost = self._line_costs.get(key)
+        if cost is None:
+            cost = self.count(self.schema_text({table: columns})) + 1
+            with self._lock:
+                self._line_costs[key] = cost
+                while len(self._line_costs) > self.config.max_cached_lines:
+                    self._line_costs.popitem(last=False)
+        return cost
+
+    def limit(self, stage: str) -> int:
+        """Token budget of `stage`: table_selection, column_pruning or sql_generation."""
+        limit: int = getattr(self.config, stage)
+        return limit
+
+    def fit_schema(
+        self,
+        query: str,
+        columns: Dict[str, List[str]],
+        budget: int,
+        key_columns: Dict[str, Set[str]] | None = None,
+        drop_tables: bool = True,
+    ) -> Dict[str, List[str]]:
+        """
+        Trim `columns` (table -> column names) so its schema text fits `budget`.
+
+        Every table is first reduced to its key columns and the columns sharing
+        a term with the query, then tables are restored in full in order of
+        relevance while the budget allows. With `drop_tables`, the least
+        relevant tables are left out when even their reduced form does not fit;
+        otherwise every table is kept in reduced form.
+
+        Returns the trimmed mapping in the original table and column order.
+        """
+        full = {t: self._line_cost(t, cols) for t, cols in columns.items()}
+        if sum(full.values()) <= budget:
+            return columns
+
+        words = terms(query)
+        key_columns = key_columns or {}
+        # Column names repeat across tables, so each is matched only once
+        names = {c for cols in columns.values() for c in cols}
+        relevant = {c for c in names if not terms(c).isdisjoint(words)}
+
+        def score(position: int, table: str) -> tuple[int, int, int]:
+            matched = sum(c in relevant for c in columns[table])
+            # Earlier tables win ties; linked slices arrive sorted by similarity
+            return (len(terms(table) & words), matched, -position)
+
+        ranked = [
+            t
+            for _, t in sorted(
+                ((score(i, t), t) for i, t in enumerate(columns)), reverse=True
+            )
+        ]
+        reduced = {
+            t: [c for c in columns[t] if c in relevant or c in key_columns.get(t, ())]
+            or columns[t][:1]
+            for t in ranked
+        }
+
+        kept: Dict[str, List[str]] = {}
+        remaining = budget
+        for table in ranked:
+            cost = self._line_cost(table, reduced[table])
+            if cost > remaining and drop_tables:
+                continue
+            kept[table] = reduced[table]
+            remaining -= cost
+        for table in ranked:
+            if table not in kept or kept[table] == columns[table]:
+                continue
+            extra = full[table] - self._line_cost(table, kept[table])
+            if extra <= remaining:
+                kept[table] = columns[table]
+                remaining -= extra
+        return {t: kept[t] for t in columns if t in kept}
+
+    @staticmethod
+    def schema_text(columns: Dict[str, List[str]]) -> str:
+        return "\n".join(
+            f"Table '{t}': {', '.join(cols)}" for t, cols in columns.items()
+        )
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        assert self.embed_model is not None
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for text in texts:
+                if text in self._vectors:
+                    self._vectors.move_to_end(text)
+                    found[text] = self._vectors[text]
+        missing = [t for t in dict.fromkeys(texts) if t not in found]
+        if missing:
+            vectors = np.asarray(
+                self.embed_model.get_text_embedding_batch(missing), dtype=np.float32
+            )
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+            found.update(zip(missing, vectors))
+            with self._lock:
+                self._vectors.update(zip(missing, vectors))
+                while len(self._vectors) > self.config.max_cached_embeddings:
+                    self._vectors.popitem(last=False)
+        return np.stack([found[t] for t in texts])
+
+    def select_samples(self, samples: List[str], budget: int) -> List[str]:
+        """
+        Pick few-shot samples that fit `budget` tokens, most relevant first.
+
+        `samples` arrive in retrieval order, which stands in for their relevance
+        to the question. MMR then trades that relevance against similarity to
+        the samples already picked, and samples at least
+        `duplicate_threshold` similar to a picked one are dropped outright.
+        """
+        samples = [s.strip() for s in samples if s.strip()]
+        if not samples or budget <= 0:
+            return []
+        order = list(range(len(samples)))
+        if self.embed_model is not None and len(samples) > 1:
+            try:
+                order = self._mmr(self._embed(samples))
+            except Exception as e:
+                # Ranking is an optimization; fall back to retrieval order
+                print(f"Error embedding samples for the prompt budget: {e}")
+
+        picked: List[int] = []
+        remaining = budget
+        for i in order:
+            cost = self.count(samples[i] + "\n\n")
+            if cost <= remaining:
+                picked.append(i)
+                remaining -= cost
+        return [samples[i] for i in sorted(picked)]
+
+    def _mmr(self, vectors: np.ndarray) -> List[int]:
+        n = len(vectors)
+        relevance = 1.0 - np.arange(n, dtype=np.float32) / n
+        similarity = vectors @ vectors.T
+        weight = self.config.mmr_lambda
+        order: List[int] = [0]
+        redundancy = similarity[0].copy()
+        candidates = set(range(1, n))
+        while candidates:
+            best = max(
+                candidates,
+                key=lambda i: weight * relevance[i] - (1 - weight) * redundancy[i],
+            )
+            candidates.discard(best)
+            if redundancy[best] >= self.config.duplicate_threshold:
+                continue
+            order.append(best)
+            redundancy = np.maximum(redundancy, similarity[best])
+        return order
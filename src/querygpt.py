@@ -1,80 +1,1142 @@
-import sqlite3
-import polars as pl
-from llama_index.core import Settings
-from llama_index.llms.openai import OpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.core.schema import TextNode
+import asyncio
+import re
+import threading
+import time
 from .agents.intent_agent import IntentAgent
+from .agents.intent_classifier import EmbeddingIntentClassifier
 from .agents.table_agent import TableAgent
 from .agents.column_prune_agent import ColumnPruneAgent
-from .agents.sql_generator import SQLGenerator
-from .config import LlamaIndexConfig, VectorStoreConfig
-from .db.schema import get_database_schema
+from .agents.sql_generator import SQLGenerator, SQLGeneration
+from .agents.column_prune_agent import PrunedSchemaSelection
+from .agents.intent_agent import WorkspaceClassification
+from .agents.table_agent import TableSelection
+from .cache.response_cache import CacheHit, ResponseCache
+from .cache.result_cache import ResultCache
+from .cache.stage_memo import StageMemo
+from .config import (
+    DatabaseConfig,
+    IntentClassifierConfig,
+    LlamaIndexConfig,
+    PromptBudgetConfig,
+    ResponseCacheConfig,
+    ResultCacheConfig,
+    RetrievalCacheConfig,
+    RoutingConfig,
+    SchemaIndexConfig,
+    SpeculationConfig,
+    StageMemoConfig,
+    TelemetryConfig,
+    ValidationConfig,
+    VectorStoreConfig,
+    VotingConfig,
+)
+from .db.engine import create_database
+from .db.executor import BATCH_ROWS, PREVIEW_ROWS, export_csv, iter_batches, preview
+from .db.join_graph import JoinGraph
+from .db.schema import schema_fingerprint
 from .db.seed import create_sample_university_data
-from .vector_store import setup_vector_store
-from typing import Any, Dict, cast
+from .db.validator import SQLValidator, ValidationResult
+from .prompt_budget import PromptBudget
+from .router import QueryRouter, Route
+from .schema_index import SchemaIndex, SchemaSlice
+from .telemetry import Trace, TraceExporter, annotate, span
+from .utils import normalize_query
+from .voting import CandidateVoter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+if TYPE_CHECKING:
+    import polars as pl
+    from llama_index.core.base.base_retriever import BaseRetriever
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+    from llama_index.core.schema import NodeWithScore, TextNode
+    from llama_index.core.vector_stores.types import VectorStore
+    from pydantic_ai.models import Model
+
+
+DB_PATH = "sample_university.db"
+
+T = TypeVar("T")
 
 
 def configure_llama_index(config: LlamaIndexConfig) -> None:
+    from llama_index.core import Settings
+    from llama_index.embeddings.openai import OpenAIEmbedding
+    from llama_index.llms.openai import OpenAI
+
     Settings.llm = OpenAI(model=config.llm_model)
-    Settings.embed_model = OpenAIEmbedding(model=config.embedding_model)
+    Settings.embed_model = config.embed_model or OpenAIEmbedding(
+        model=config.embedding_model
+    )
 
 
 class QueryGPT:
+    """
+    The NL-to-SQL pipeline.
+
+    Only the database, schema and caches are set up on construction. The
+    embedding model, vector store, prompt budget and agents are built the first
+    time a stage needs them, so LlamaIndex, the OpenAI client and pydantic-ai
+    are not imported until then and questions answered from the response
+    cache never load them.
+    """
+
     def __init__(
         self,
         llama_config: LlamaIndexConfig | None = None,
         vector_store_config: VectorStoreConfig | None = None,
+        agent_model: "Model | str" = "gpt-4o-mini",
+        response_cache_config: ResponseCacheConfig | None = None,
+        stage_memo_config: StageMemoConfig | None = None,
+        intent_classifier_config: IntentClassifierConfig | None = None,
+        schema_index_config: SchemaIndexConfig | None = None,
+        validation_config: ValidationConfig | None = None,
+        database_config: DatabaseConfig | None = None,
+        telemetry_config: TelemetryConfig | None = None,
+        prompt_budget_config: PromptBudgetConfig | None = None,
+        routing_config: RoutingConfig | None = None,
+        retrieval_cache_config: RetrievalCacheConfig | None = None,
+        speculation_config: SpeculationConfig | None = None,
+        voting_config: VotingConfig | None = None,
+        result_cache_config: ResultCacheConfig | None = None,
     ) -> None:
-        # Setup DB
-        create_sample_university_data()
-        self.schema_info = get_database_schema()
+        # Setup DB; seeding and schema loading are no-ops when nothing changed
+        resolved_database_config = database_config or DatabaseConfig.from_env()
+        if resolved_database_config.sqlite_path == DB_PATH:
+            create_sample_university_data(DB_PATH)
+        self.database = create_database(resolved_database_config)
+        self.schema_info = self.database.load_schema()
+        self.join_graph = JoinGraph(self.schema_info)
+
+        # Settings for the components built on first use, see `_lazy`
+        self.llama_config = llama_config or LlamaIndexConfig()
+        self.vector_store_config = vector_store_config
+        self.agent_model = agent_model
+        self.intent_classifier_config = intent_classifier_config
+        self.prompt_budget_config = prompt_budget_config
+        self.retrieval_cache_config = retrieval_cache_config
+        # Schema linking only pays off once the schema is too large to send whole
+        self.schema_index_config = (
+            schema_index_config
+            if schema_index_config
+            and len(self.schema_info) >= schema_index_config.min_tables
+            else None
+        )
+        self._lazy_lock = threading.RLock()
+
+        # Optional canonical SQL -> result cache, invalidated by table versions
+        self.result_cache = (
+            ResultCache(result_cache_config, self.database, set(self.schema_info))
+            if result_cache_config
+            else None
+        )
+
+        # Optional question -> SQL cache, keyed on the current schema; exact
+        # hits never need the embedding model
+        self.response_cache = (
+            ResponseCache(
+                response_cache_config,
+                schema_fingerprint(self.schema_info),
+                lambda: self.embed_model,
+            )
+            if response_cache_config
+            else None
+        )
+
+        # Optional memos for the intermediate stages; a hit on all three leaves
+        # only the final SQL generation call
+        self.intent_memo: StageMemo[WorkspaceClassification] | None = None
+        self.table_memo: StageMemo[TableSelection] | None = None
+        self.column_memo: StageMemo[PrunedSchemaSelection] | None = None
+        if stage_memo_config:
+            self.intent_memo = StageMemo(
+                stage_memo_config.max_entries, stage_memo_config.ttl_seconds
+            )
+            self.table_memo = StageMemo(
+                stage_memo_config.max_entries, stage_memo_config.ttl_seconds
+            )
+            self.column_memo = StageMemo(
+                stage_memo_config.max_entries, stage_memo_config.ttl_seconds
+            )
+
+        # Simple questions may skip the agent chain for a single generation call
+        self.router = QueryRouter(
+            self.schema_info, routing_config or RoutingConfig.from_env()
+        )
+
+        # Optional draft SQL generated while columns are pruned
+        self.speculation_config = speculation_config
+
+        # Optional vote among concurrently generated SQL candidates
+        self.voter = (
+            CandidateVoter(
+                self.database,
+                self.schema_info,
+                voting_config,
+                resolved_database_config.sqlite_path,
+            )
+            if voting_config
+            else None
+        )
+
+        # Generated SQL is checked with EXPLAIN before it touches any data
+        self.validation_config = validation_config or ValidationConfig()
+        self.validator = SQLValidator(
+            self.database, self.validation_config.large_table_rows
+        )
+
+        # Every run is traced; finished traces are optionally exported as OTLP
+        self.telemetry_config = telemetry_config or TelemetryConfig.from_env()
+        self.trace_exporter = (
+            TraceExporter(self.telemetry_config.trace_path)
+            if self.telemetry_config.trace_path
+            else None
+        )
+
+    def _lazy(self, name: str, build: Callable[[], T]) -> T:
+        """The attribute `name`, built by `build` the first time it is read."""
+        if name not in self.__dict__:
+            # Stages run in worker threads, so two of them may race to build it
+            with self._lazy_lock:
+                if name not in self.__dict__:
+                    self.__dict__[name] = build()
+        return cast(T, self.__dict__[name])
+
+    @property
+    def embed_model(self) -> "BaseEmbedding":
+        """Embedding model shared by every stage that embeds text."""
+        return self._lazy("_embed_model", self._build_embed_model)
+
+    def _build_embed_model(self) -> "BaseEmbedding":
+        from llama_index.core import Settings
 
         # Setup LLM and Embeddings globally for all LlamaIndex components
-        resolved_llama_config = llama_config or LlamaIndexConfig()
-        configure_llama_index(resolved_llama_config)
+        configure_llama_index(self.llama_config)
+        if self.retrieval_cache_config:
+            from .cache.retrieval_cache import QueryEmbeddingCache
+
+            # Installed as the embedding model so every stage that embeds the
+            # question shares one vector
+            Settings.embed_model = QueryEmbeddingCache(
+                Settings.embed_model, self.retrieval_cache_config
+            )
+        return Settings.embed_model
+
+    @property
+    def schema_index(self) -> SchemaIndex | None:
+        return self._lazy(
+            "_schema_index",
+            lambda: (
+                SchemaIndex(
+                    self.schema_info, self.embed_model, self.schema_index_config
+                )
+                if self.schema_index_config
+                else None
+            ),
+        )
+
+    @property
+    def vector_store(self) -> "VectorStore":
+        return self._lazy("_retrieval", self._build_retriever)[0]
+
+    @property
+    def retriever(self) -> "BaseRetriever":
+        return self._lazy("_retrieval", self._build_retriever)[1]
+
+    def _build_retriever(self) -> "Tuple[VectorStore, BaseRetriever]":
+        from .vector_store import setup_vector_store
+
+        # The index picks up the configured embedding model from Settings
+        embed_model = self.embed_model
+        store, retriever = setup_vector_store(
+            self.schema_info, self.vector_store_config or VectorStoreConfig.from_env()
+        )
+        if self.retrieval_cache_config:
+            from .cache.retrieval_cache import CachedRetriever
 
-        # Vector Store
-        resolved_vector_config = vector_store_config or VectorStoreConfig.from_env()
-        self.vector_store, self.retriever = setup_vector_store(
-            self.schema_info, resolved_vector_config
+            retriever = CachedRetriever(
+                retriever, embed_model, self.retrieval_cache_config
+            )
+        return store, retriever
+
+    @property
+    def prompt_budget(self) -> PromptBudget | None:
+        """Optional token budgets shared by every agent prompt."""
+        return self._lazy(
+            "_prompt_budget",
+            lambda: (
+                PromptBudget(self.prompt_budget_config, self.embed_model)
+                if self.prompt_budget_config
+                else None
+            ),
+        )
+
+    # Agents are built once, on first use, and reused for every question
+
+    @property
+    def intent_agent(self) -> IntentAgent:
+        def build() -> IntentAgent:
+            agent = IntentAgent(self.agent_model)
+            if self.intent_classifier_config:
+                # Local closed-set classifier tried before the intent LLM call
+                agent.classifier = EmbeddingIntentClassifier(
+                    agent.workspaces, self.embed_model, self.intent_classifier_config
+                )
+            return agent
+
+        return self._lazy("_intent_agent", build)
+
+    @property
+    def table_agent(self) -> TableAgent:
+        return self._lazy(
+            "_table_agent",
+            lambda: TableAgent(
+                self.schema_info,
+                self.agent_model,
+                linked_schema=self.schema_index_config is not None,
+                budget=self.prompt_budget,
+            ),
+        )
+
+    @property
+    def column_prune_agent(self) -> ColumnPruneAgent:
+        return self._lazy(
+            "_column_prune_agent",
+            lambda: ColumnPruneAgent(
+                self.schema_info, self.agent_model, budget=self.prompt_budget
+            ),
+        )
+
+    @property
+    def sql_generator(self) -> SQLGenerator:
+        return self._lazy(
+            "_sql_generator",
+            lambda: SQLGenerator(
+                self.schema_info,
+                self.retriever,
+                self.agent_model,
+                dialect=self.database.dialect,
+                budget=self.prompt_budget,
+            ),
         )
 
-        # Agents
-        self.intent_agent = IntentAgent()
-        self.table_agent = TableAgent(self.schema_info)
-        self.column_prune_agent = ColumnPruneAgent(self.schema_info)
-        self.sql_generator = SQLGenerator(self.schema_info, self.retriever)
+    def warm_up(self) -> None:
+        """Build every component now instead of on first use, e.g. to serve."""
+        for name in (
+            "schema_index",
+            "intent_agent",
+            "table_agent",
+            "column_prune_agent",
+            "sql_generator",
+        ):
+            getattr(self, name)
+
+    def generate_query(
+        self, user_query: str, mode: str | None = None
+    ) -> Dict[str, Any]:
+        """
+        Convert a question to SQL and execute it.
+
+        Args:
+            user_query: Natural language question to convert to SQL.
+            mode: Routing mode, "auto", "fast" or "full"; defaults to
+                `RoutingConfig.mode`.
+        """
+        with Trace().activate() as trace:
+            result = self._generate(user_query, mode)
+        return self._finish_trace(trace, result)
 
-    def generate_query(self, user_query: str) -> Dict[str, Any]:
+    def _generate(self, user_query: str, mode: str | None = None) -> Dict[str, Any]:
         try:
-            intent = self.intent_agent.determine_intent(user_query)
-            tables = self.table_agent.determine_tables(user_query, intent.workspaces)
-            pruned = self.column_prune_agent.prune_columns(user_query, tables.tables)
+            hit = self._cache_lookup(user_query)
+            if hit is not None:
+                return self._execute(hit.result, cache=hit.level)
 
+            linked = self._link(user_query)
+            route = self._route(user_query, linked, mode)
             # Retrieve similar samples directly using the retriever
-            results = self.retriever.retrieve(user_query)
-            samples = [
-                cast(TextNode, r.node).text
-                for r in results
-                if r.node and hasattr(r.node, "text")
-            ]
-
-            sql_out = self.sql_generator.generate_sql(
-                user_query,
-                intent.workspaces,
-                tables.tables,
-                pruned.pruned_schema,
-                samples,
-            )
-
-            # Execute for validation
-            with sqlite3.connect("sample_university.db") as conn:
-                df = pl.read_database(sql_out.sql, conn)
-            return {
-                "sql_result": sql_out,
-                "query_result": df.head().to_dict(as_series=False),
-            }
+            samples = self._extract_samples(self._retrieve(user_query))
+            if route.path == "fast":
+                result = self._generate_fast(user_query, route, linked, samples)
+                if result is not None:
+                    return result
+
+            intent = self._determine_intent(user_query)
+            candidates = linked.columns if linked else None
+            tables = self._determine_tables(user_query, intent.workspaces, candidates)
+            pruned = self._prune_columns(user_query, tables.tables, candidates)
+
+            plan_tables, plan_schema, joins = self._plan_joins(
+                tables.tables, pruned.pruned_schema
+            )
+            voting: Dict[str, Any] | None = None
+            if self.voter is not None:
+                # Candidates are generated concurrently on the sync path too
+                sql_out, voting = asyncio.run(
+                    self._avote(
+                        user_query,
+                        intent.workspaces,
+                        plan_tables,
+                        plan_schema,
+                        samples,
+                        joins,
+                    )
+                )
+            else:
+                with span("sql_generation"):
+                    sql_out = self.sql_generator.generate_sql(
+                        user_query,
+                        intent.workspaces,
+                        plan_tables,
+                        plan_schema,
+                        samples,
+                        joins,
+                    )
+            sql_out, validation = self._validate(
+                user_query, sql_out, plan_tables, plan_schema, joins
+            )
+
+            result = self._execute(sql_out, validation=validation)
+            self._remember(user_query, sql_out)
+            return {**result, "route": route.summary(), "voting": voting}
         except Exception as e:
             print(f"An error occurred during query generation: {e}")
             return {"error": str(e)}
+
+    async def agenerate_query(
+        self, user_query: str, overlap_intent: bool = True, mode: str | None = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of `generate_query` that runs independent stages concurrently.
+
+        Few-shot retrieval only depends on the user query, so it starts straight
+        away and runs alongside the agent calls, as does schema linking. The table
+        agent sees either the full schema or the query's linked slice, where
+        workspaces are only a hint, so with `overlap_intent` table selection runs
+        alongside intent classification with every workspace in scope instead of
+        waiting for it.
+
+        Args:
+            user_query: Natural language question to convert to SQL.
+            overlap_intent: Run table selection concurrently with intent
+                classification rather than after it.
+            mode: Routing mode, "auto", "fast" or "full"; defaults to
+                `RoutingConfig.mode`.
+        """
+        with Trace().activate() as trace:
+            try:
+                hit = await self._acache_lookup(user_query)
+                result = (
+                    hit
+                    if hit is not None
+                    else await self._agenerate(user_query, None, overlap_intent, mode)
+                )
+            except Exception as e:
+                print(f"An error occurred during query generation: {e}")
+                result = {"error": str(e)}
+        return self._finish_trace(trace, result)
+
+    async def agenerate_queries(
+        self, questions: Iterable[str], concurrency: int = 8, mode: str | None = None
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Run many questions through the pipeline, yielding results as they finish.
+
+        `questions` is consumed lazily, off the event loop, and only as fast as
+        slots free up, so a large file or a pipe is never read ahead of the
+        work. Each question runs the whole `agenerate_query` pipeline as soon as
+        it is admitted, cache lookup and intent classification included, without
+        waiting on other questions. Questions that are identical after
+        normalization are generated once and their result is yielded for every
+        position. At most `concurrency` questions are in flight at any time.
+
+        Args:
+            questions: Natural language questions to convert to SQL.
+            concurrency: Maximum number of questions processed concurrently.
+            mode: Routing mode, "auto", "fast" or "full"; defaults to
+                `RoutingConfig.mode`.
+
+        Yields:
+            `(index, result)` pairs in completion order, where `index` is the
+            position of the question in `questions`.
+        """
+        iterator = iter(questions)
+        # Positions waiting on a running question, and results of finished ones
+        positions: Dict[str, List[int]] = {}
+        finished: Dict[str, Dict[str, Any]] = {}
+        running: Dict[asyncio.Future[Dict[str, Any]], str] = {}
+        index = 0
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(running) < concurrency:
+                    question = await asyncio.to_thread(next, iterator, None)
+                    if question is None:
+                        exhausted = True
+                        break
+                    key = normalize_query(question)
+                    if key in finished:
+                        yield index, finished[key]
+                    elif key in positions:
+                        positions[key].append(index)
+                    else:
+                        positions[key] = [index]
+                        task = asyncio.ensure_future(
+                            self.agenerate_query(question, mode=mode)
+                        )
+                        running[task] = key
+                    index += 1
+                if not running:
+                    return
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    key = running.pop(task)
+                    finished[key] = task.result()
+                    for i in positions.pop(key):
+                        yield i, finished[key]
+        finally:
+            for task in running:
+                task.cancel()
+
+    def generate_queries(
+        self, questions: Iterable[str], concurrency: int = 8, mode: str | None = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Synchronous wrapper around `agenerate_queries`.
+
+        Returns:
+            One result per question, in the order of `questions`.
+        """
+        questions = list(questions)
+
+        async def collect() -> List[Dict[str, Any]]:
+            results: List[Dict[str, Any]] = [{} for _ in questions]
+            async for i, result in self.agenerate_queries(questions, concurrency, mode):
+                results[i] = result
+            return results
+
+        return asyncio.run(collect())
+
+    def _finish_trace(self, trace: Trace, result: Dict[str, Any]) -> Dict[str, Any]:
+        if result.get("route"):
+            # Run latency is aggregated per path as well as overall
+            trace.root.attributes["route"] = result["route"]["path"]
+        trace.finish()
+        if self.trace_exporter is not None:
+            try:
+                self.trace_exporter.export(trace)
+            except OSError as e:
+                print(f"Error exporting trace: {e}")
+        return {**result, "telemetry": trace.summary()}
+
+    def _cache_lookup(self, user_query: str) -> CacheHit | None:
+        if not self.response_cache:
+            return None
+        with span("cache_lookup"):
+            hit = self.response_cache.get(user_query)
+            annotate(cache_hit=hit.level if hit is not None else False)
+            return hit
+
+    async def _acache_lookup(self, user_query: str) -> Dict[str, Any] | None:
+        if not self.response_cache:
+            return None
+        hit = await asyncio.to_thread(self._cache_lookup, user_query)
+        if hit is None:
+            return None
+        return await asyncio.to_thread(self._execute, hit.result, hit.level)
+
+    async def _agenerate(
+        self,
+        user_query: str,
+        intent: WorkspaceClassification | None,
+        overlap_intent: bool = True,
+        mode: str | None = None,
+        route: Route | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate and execute SQL for an uncached question; see `agenerate_query`.
+
+        A `route` decided beforehand replaces routing the question under `mode`.
+        """
+        # Retrieval is blocking in the vector store clients, keep it off the loop
+        retrieval = asyncio.create_task(asyncio.to_thread(self._retrieve, user_query))
+        linking = asyncio.create_task(asyncio.to_thread(self._link, user_query))
+
+        async def select_tables(workspaces: List[str]) -> TableSelection:
+            linked = await linking
+            return await self._adetermine_tables(
+                user_query, workspaces, linked.columns if linked else None
+            )
+
+        try:
+            if route is None:
+                route = self._route(user_query, await linking, mode)
+            if route.path == "fast":
+                result = await self._agenerate_fast(
+                    user_query,
+                    route,
+                    await linking,
+                    self._extract_samples(await retrieval),
+                )
+                if result is not None:
+                    return result
+            if intent is not None:
+                tables = await select_tables(intent.workspaces)
+            elif overlap_intent:
+                intent, tables = await asyncio.gather(
+                    self._adetermine_intent(user_query),
+                    select_tables(self.intent_agent.workspaces),
+                )
+            else:
+                intent = await self._adetermine_intent(user_query)
+                tables = await select_tables(intent.workspaces)
+            linked = await linking
+            candidates = linked.columns if linked else None
+            draft: SQLGeneration | None = None
+            speculation: Dict[str, Any] | None = None
+            if self._should_speculate(tables.tables, candidates):
+                samples = self._extract_samples(await retrieval)
+                pruned, draft, speculation = await self._aspeculate(
+                    user_query, intent.workspaces, tables.tables, candidates, samples
+                )
+            else:
+                pruned = await self._aprune_columns(
+                    user_query, tables.tables, candidates
+                )
+                samples = self._extract_samples(await retrieval)
+        finally:
+            retrieval.cancel()
+            linking.cancel()
+
+        plan_tables, plan_schema, joins = self._plan_joins(
+            tables.tables, pruned.pruned_schema
+        )
+        voting: Dict[str, Any] | None = None
+        if draft is not None:
+            sql_out = draft
+        elif self.voter is not None:
+            sql_out, voting = await self._avote(
+                user_query, intent.workspaces, plan_tables, plan_schema, samples, joins
+            )
+        else:
+            with span("sql_generation"):
+                sql_out = await self.sql_generator.agenerate_sql(
+                    user_query,
+                    intent.workspaces,
+                    plan_tables,
+                    plan_schema,
+                    samples,
+                    joins,
+                )
+        sql_out, validation = await self._avalidate(
+            user_query, sql_out, plan_tables, plan_schema, joins
+        )
+
+        result = await asyncio.to_thread(self._execute, sql_out, None, validation)
+        await asyncio.to_thread(self._remember, user_query, sql_out)
+        return {
+            **result,
+            "route": route.summary(),
+            "speculation": speculation,
+            "voting": voting,
+        }
+
+    def iter_result(
+        self, sql: str, batch_size: int = BATCH_ROWS
+    ) -> "Iterator[pl.DataFrame]":
+        """Stream the full result of `sql` as Polars DataFrames of `batch_size` rows."""
+        cached = self.result_cache.get(sql) if self.result_cache else None
+        if cached is not None:
+            yield from cached.iter_slices(batch_size)
+            return
+        yield from iter_batches(self.database, sql, batch_size)
+
+    def export_result(self, sql: str, path: str) -> int:
+        """Write the full result of `sql` to a CSV file; returns the row count."""
+        cached = self.result_cache.get(sql) if self.result_cache else None
+        if cached is not None:
+            cached.write_csv(path)
+            return cached.height
+        return export_csv(self.database, sql, path)
+
+    def intent_classifier_stats(self) -> Dict[str, Any] | None:
+        """Fast path counters of the intent classifier, if it was used."""
+        agent: IntentAgent | None = self.__dict__.get("_intent_agent")
+        if agent is None or agent.classifier is None:
+            return None
+        return agent.classifier.stats()
+
+    def stage_memo_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counters of each enabled stage memo."""
+        memos = {
+            "intent": self.intent_memo,
+            "tables": self.table_memo,
+            "columns": self.column_memo,
+        }
+        return {name: memo.stats() for name, memo in memos.items() if memo}
+
+    def _determine_intent(self, user_query: str) -> WorkspaceClassification:
+        with span("intent"):
+            if self.intent_memo is None:
+                return self.intent_agent.determine_intent(user_query)
+            return self.intent_memo.get_or_compute(
+                normalize_query(user_query),
+                lambda: self.intent_agent.determine_intent(user_query),
+            )
+
+    async def _adetermine_intent(self, user_query: str) -> WorkspaceClassification:
+        with span("intent"):
+            if self.intent_memo is None:
+                return await self.intent_agent.adetermine_intent(user_query)
+            return await self.intent_memo.aget_or_compute(
+                normalize_query(user_query),
+                lambda: self.intent_agent.adetermine_intent(user_query),
+            )
+
+    def _link(self, user_query: str) -> SchemaSlice | None:
+        if not self.schema_index:
+            return None
+        # Linking only narrows the prompt; without it the full schema is sent
+        with span("schema_linking"):
+            try:
+                return self.schema_index.link(user_query)
+            except Exception as e:
+                print(f"Error linking schema: {e}")
+                annotate(error=type(e).__name__)
+                return None
+
+    # The linked slice is a pure function of the query, so memo keys leave it out
+
+    def _determine_tables(
+        self,
+        user_query: str,
+        workspaces: List[str],
+        candidates: Dict[str, List[str]] | None = None,
+    ) -> TableSelection:
+        def compute() -> TableSelection:
+            return self.table_agent.determine_tables(user_query, workspaces, candidates)
+
+        with span("table_selection"):
+            if self.table_memo is None:
+                return compute()
+            return self.table_memo.get_or_compute(
+                (normalize_query(user_query), tuple(sorted(workspaces))), compute
+            )
+
+    async def _adetermine_tables(
+        self,
+        user_query: str,
+        workspaces: List[str],
+        candidates: Dict[str, List[str]] | None = None,
+    ) -> TableSelection:
+        def compute() -> Awaitable[TableSelection]:
+            return self.table_agent.adetermine_tables(
+                user_query, workspaces, candidates
+            )
+
+        with span("table_selection"):
+            if self.table_memo is None:
+                return await compute()
+            return await self.table_memo.aget_or_compute(
+                (normalize_query(user_query), tuple(sorted(workspaces))), compute
+            )
+
+    def _prune_columns(
+        self,
+        user_query: str,
+        tables: List[str],
+        candidates: Dict[str, List[str]] | None = None,
+    ) -> PrunedSchemaSelection:
+        def compute() -> PrunedSchemaSelection:
+            return self.column_prune_agent.prune_columns(user_query, tables, candidates)
+
+        with span("column_pruning"):
+            if self.column_memo is None:
+                return compute()
+            return self.column_memo.get_or_compute(
+                (normalize_query(user_query), tuple(sorted(tables))), compute
+            )
+
+    async def _aprune_columns(
+        self,
+        user_query: str,
+        tables: List[str],
+        candidates: Dict[str, List[str]] | None = None,
+    ) -> PrunedSchemaSelection:
+        def compute() -> Awaitable[PrunedSchemaSelection]:
+            return self.column_prune_agent.aprune_columns(
+                user_query, tables, candidates
+            )
+
+        with span("column_pruning"):
+            if self.column_memo is None:
+                return await compute()
+            return await self.column_memo.aget_or_compute(
+                (normalize_query(user_query), tuple(sorted(tables))), compute
+            )
+
+    def _table_columns(
+        self, tables: List[str], candidates: Dict[str, List[str]] | None
+    ) -> Dict[str, List[str]]:
+        """Linked candidate columns of each table, or all of its columns."""
+        return {
+            t: (candidates.get(t) if candidates else None)
+            or [c["name"] for c in self.schema_info[t]["columns"]]
+            for t in tables
+        }
+
+    def _should_speculate(
+        self, tables: List[str], candidates: Dict[str, List[str]] | None
+    ) -> bool:
+        if self.speculation_config is None or not tables:
+            return False
+        columns = self._table_columns(tables, candidates)
+        width = sum(len(cols) for cols in columns.values())
+        return width <= self.speculation_config.max_columns
+
+    async def _aspeculate(
+        self,
+        user_query: str,
+        workspaces: List[str],
+        tables: List[str],
+        candidates: Dict[str, List[str]] | None,
+        samples: List[str],
+    ) -> Tuple[PrunedSchemaSelection, SQLGeneration | None, Dict[str, Any]]:
+        """
+        Draft SQL from every column of `tables` while the columns are pruned.
+
+        Returns the pruned schema, the draft when it is accepted (None when
+        SQL must be generated again from the pruned schema) and a report of
+        the outcome. `saved_ms` compares the overlapped wall time with running
+        pruning and generation one after the other; it is negative when a
+        rejected draft made the question wait longer than pruning alone.
+        """
+        full = self._table_columns(tables, candidates)
+        with span("speculation") as current:
+            draft_tables, draft_schema, draft_joins = self._plan_joins(tables, full)
+
+            async def draft() -> Tuple[SQLGeneration | None, float]:
+                start = time.perf_counter()
+                try:
+                    with span("draft_generation"):
+                        out = await self.sql_generator.agenerate_sql(
+                            user_query,
+                            workspaces,
+                            draft_tables,
+                            draft_schema,
+                            samples,
+                            draft_joins,
+                        )
+                except Exception as e:
+                    # A failed draft only costs the speculation
+                    print(f"Error generating draft SQL: {e}")
+                    out = None
+                return out, (time.perf_counter() - start) * 1000
+
+            async def prune() -> Tuple[PrunedSchemaSelection, float]:
+                start = time.perf_counter()
+                out = await self._aprune_columns(user_query, tables, candidates)
+                return out, (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            (draft_out, draft_ms), (pruned, prune_ms) = await asyncio.gather(
+                draft(), prune()
+            )
+            wall_ms = (time.perf_counter() - start) * 1000
+
+            reason = (
+                await asyncio.to_thread(
+                    self._accept_draft, draft_out.sql, full, pruned.pruned_schema
+                )
+                if draft_out is not None
+                else None
+            )
+            accepted = reason is not None
+            saved_ms = round(prune_ms + (draft_ms if accepted else 0.0) - wall_ms, 3)
+            report = {
+                "accepted": accepted,
+                "reason": reason or "rejected",
+                "saved_ms": saved_ms,
+            }
+            current.attributes.update(report)
+        return pruned, draft_out if accepted else None, report
+
+    def _accept_draft(
+        self, sql: str, full: Dict[str, List[str]], pruned: Dict[str, List[str]]
+    ) -> str | None:
+        """Why a draft may stand in for SQL generated from `pruned`, or None."""
+        # Names are matched without qualifiers, so a column counts as used when
+        # any table has one by that name; key columns are always kept for joins
+        kept = {c.lower() for cols in pruned.values() for c in cols}
+        for table in full:
+            kept.update(c.lower() for c in self.column_prune_agent.key_columns[table])
+        dropped = {
+            c.lower() for cols in full.values() for c in cols if c.lower() not in kept
+        }
+        if dropped.isdisjoint(re.findall(r"\w+", sql.lower())):
+            return "columns"
+        if self._check(sql).ok:
+            return "validation"
+        return None
+
+    async def _avote(
+        self,
+        user_query: str,
+        workspaces: List[str],
+        tables: List[str],
+        schema: Dict[str, List[str]],
+        samples: List[str],
+        joins: List[str],
+    ) -> Tuple[SQLGeneration, Dict[str, Any]]:
+        """Generate SQL candidates concurrently and keep the one most agree with."""
+        voter = cast(CandidateVoter, self.voter)
+
+        def generate(index: int) -> Awaitable[SQLGeneration]:
+            # Later candidates also leave out one few-shot sample each
+            subset = samples
+            if index and len(samples) > 1:
+                skip = (index - 1) % len(samples)
+                subset = samples[:skip] + samples[skip + 1 :]
+            return self.sql_generator.agenerate_sql(
+                user_query,
+                workspaces,
+                tables,
+                schema,
+                subset,
+                joins,
+                temperature=voter.temperature(index),
+            )
+
+        return await voter.vote(generate)
+
+    def _plan_joins(
+        self, tables: List[str], pruned: Dict[str, List[str]]
+    ) -> Tuple[List[str], Dict[str, List[str]], List[str]]:
+        """
+        Connect the selected tables through the foreign key graph.
+
+        Returns the tables extended with any bridge tables, the pruned schema
+        extended with the columns each join needs, and the join conditions.
+        """
+        with span("join_planning"):
+            plan = self.join_graph.plan(tables)
+        schema = {t: list(cols) for t, cols in pruned.items()}
+        for table, columns in plan.join_columns.items():
+            kept = schema.setdefault(table, [])
+            kept.extend(sorted(c for c in columns if c not in kept))
+        return plan.tables, schema, plan.conditions
+
+    def _route(
+        self, user_query: str, linked: SchemaSlice | None, mode: str | None
+    ) -> Route:
+        with span("routing") as current:
+            route = self.router.route(user_query, linked, mode)
+            current.attributes.update(path=route.path, reason=route.reason)
+            return route
+
+    def _fast_schema(
+        self, route: Route, linked: SchemaSlice | None
+    ) -> Tuple[List[str], Dict[str, List[str]], List[str]]:
+        """The tables named by the question, with their linked or full columns."""
+        columns = self._table_columns(route.tables, linked.columns if linked else None)
+        return self._plan_joins(route.tables, columns)
+
+    def _fast_fallback(self, route: Route, check: ValidationResult) -> None:
+        # Invalid fast-path SQL is not repaired; the full chain gets a fresh start
+        route.fallback = True
+        annotate(fallback=True, validation_error=check.error)
+
+    def _generate_fast(
+        self,
+        user_query: str,
+        route: Route,
+        linked: SchemaSlice | None,
+        samples: List[str],
+    ) -> Dict[str, Any] | None:
+        """
+        Generate SQL with a single call over the tables the question names.
+
+        Returns None when the SQL fails validation, for the full chain to retry.
+        """
+        with span("fast_path"):
+            tables, schema, joins = self._fast_schema(route, linked)
+            with span("sql_generation"):
+                sql_out = self.sql_generator.generate_sql(
+                    user_query, [], tables, schema, samples, joins
+                )
+            check = self._check(sql_out.sql)
+            if not check.ok:
+                self._fast_fallback(route, check)
+                return None
+        result = self._execute(
+            sql_out, validation={"repairs": 0, "warnings": check.warnings}
+        )
+        self._remember(user_query, sql_out)
+        return {**result, "route": route.summary()}
+
+    async def _agenerate_fast(
+        self,
+        user_query: str,
+        route: Route,
+        linked: SchemaSlice | None,
+        samples: List[str],
+    ) -> Dict[str, Any] | None:
+        with span("fast_path"):
+            tables, schema, joins = self._fast_schema(route, linked)
+            with span("sql_generation"):
+                sql_out = await self.sql_generator.agenerate_sql(
+                    user_query, [], tables, schema, samples, joins
+                )
+            check = await asyncio.to_thread(self._check, sql_out.sql)
+            if not check.ok:
+                self._fast_fallback(route, check)
+                return None
+        result = await asyncio.to_thread(
+            self._execute,
+            sql_out,
+            None,
+            {"repairs": 0, "warnings": check.warnings},
+        )
+        await asyncio.to_thread(self._remember, user_query, sql_out)
+        return {**result, "route": route.summary()}
+
+    def _retrieve(self, user_query: str) -> "List[NodeWithScore]":
+        # Few-shot samples only improve the prompt; an empty or unreachable store
+        # (e.g. a fresh local store) should not fail the question
+        with span("retrieval") as current:
+            try:
+                results = self.retriever.retrieve(user_query)
+            except Exception as e:
+                print(f"Error retrieving sample queries: {e}")
+                current.attributes["error"] = type(e).__name__
+                return []
+            current.attributes["samples"] = len(results)
+            return results
+
+    @staticmethod
+    def _extract_samples(results: "List[NodeWithScore]") -> List[str]:
+        return [
+            cast("TextNode", r.node).text
+            for r in results
+            if r.node and hasattr(r.node, "text")
+        ]
+
+    def _check(self, sql: str) -> ValidationResult:
+        with span("validation") as current:
+            check = self.validator.validate(sql)
+            current.attributes["valid"] = check.ok
+        if check.ok and check.full_scans and self.validation_config.reject_full_scans:
+            check.error = (
+                "; ".join(check.warnings)
+                + ". Filter these tables on an indexed column or drop them."
+            )
+        return check
+
+    def _validate(
+        self,
+        user_query: str,
+        sql_out: SQLGeneration,
+        tables: List[str],
+        schema: Dict[str, List[str]],
+        joins: List[str],
+    ) -> Tuple[SQLGeneration, Dict[str, Any]]:
+        """
+        Check generated SQL with EXPLAIN and send it back for repair while invalid.
+
+        Returns the SQL to execute and a summary of the repairs and plan
+        warnings; raises ValueError when the SQL is still invalid after
+        `max_repairs` attempts.
+        """
+        check = self._check(sql_out.sql)
+        repairs = 0
+        while not check.ok and repairs < self.validation_config.max_repairs:
+            with span("repair"):
+                sql_out = self.sql_generator.repair_sql(
+                    user_query,
+                    tables,
+                    schema,
+                    sql_out.sql,
+                    cast(str, check.error),
+                    joins,
+                )
+            repairs += 1
+            check = self._check(sql_out.sql)
+        if not check.ok:
+            raise ValueError(f"Generated SQL failed validation: {check.error}")
+        return sql_out, {"repairs": repairs, "warnings": check.warnings}
+
+    async def _avalidate(
+        self,
+        user_query: str,
+        sql_out: SQLGeneration,
+        tables: List[str],
+        schema: Dict[str, List[str]],
+        joins: List[str],
+    ) -> Tuple[SQLGeneration, Dict[str, Any]]:
+        # EXPLAIN is quick, but still a blocking database round-trip
+        check = await asyncio.to_thread(self._check, sql_out.sql)
+        repairs = 0
+        while not check.ok and repairs < self.validation_config.max_repairs:
+            with span("repair"):
+                sql_out = await self.sql_generator.arepair_sql(
+                    user_query,
+                    tables,
+                    schema,
+                    sql_out.sql,
+                    cast(str, check.error),
+                    joins,
+                )
+            repairs += 1
+            check = await asyncio.to_thread(self._check, sql_out.sql)
+        if not check.ok:
+            raise ValueError(f"Generated SQL failed validation: {check.error}")
+        return sql_out, {"repairs": repairs, "warnings": check.warnings}
+
+    def _execute(
+        self,
+        sql_out: SQLGeneration,
+        cache: str | None = None,
+        validation: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        # Execute for validation, fetching only the preview rows
+        with span("execution") as current:
+            df = self._preview(sql_out.sql)
+            current.attributes["rows"] = df.height
+        return {
+            "sql_result": sql_out,
+            "query_result": df.to_dict(as_series=False),
+            "cache": cache,
+            "validation": validation,
+        }
+
+    def _preview(self, sql: str) -> "pl.DataFrame":
+        if self.result_cache is None:
+            return preview(self.database, sql)
+        df = self.result_cache.get(sql)
+        if df is None:
+            versions = self.result_cache.versions(sql)
+            if versions is None:
+                return preview(self.database, sql)
+            # Fetch enough rows to cache the whole result when it is small
+            df = preview(self.database, sql, self.result_cache.config.max_rows + 1)
+            self.result_cache.put(sql, df, versions)
+        return df.head(PREVIEW_ROWS)
+
+    def _remember(self, user_query: str, sql_out: SQLGeneration) -> None:
+        # Only SQL that executed successfully is worth serving again
+        if self.response_cache:
+            self.response_cache.put(user_query, sql_out)
@@ -0,0 +1,80 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Literal
+
+from .config import RoutingConfig
+from .utils import terms
+
+if TYPE_CHECKING:
+    from .schema_index import SchemaSlice
+
+ROUTING_MODES = ("auto", "fast", "full")
+
+
+@dataclass
+class Route:
+    """
+    Path chosen for a question.
+
+    Attributes:
+        mode: Routing mode the question was run with.
+        path: "fast" for a single SQL generation call, "full" for the agent chain.
+        reason: Why the path was chosen.
+        tables: Tables named by the question, the schema slice of the fast path.
+        fallback: The fast path was tried but its SQL failed validation.
+    """
+
+    mode: str
+    path: Literal["fast", "full"]
+    reason: str
+    tables: List[str] = field(default_factory=list)
+    fallback: bool = False
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": "full" if self.fallback else self.path,
+            "reason": self.reason,
+            "fallback": self.fallback,
+        }
+
+
+class QueryRouter:
+    """
+    Cheap complexity estimate deciding whether a question skips the agent chain.
+
+    A question is simple when it is short, names at most `max_tables` tables of
+    the candidate schema (the linked slice when there is a SchemaIndex, else the
+    whole schema) by their singularized words, and, with a SchemaIndex, its
+    best linked table scores at least `min_link_score`. No LLM is involved.
+    """
+
+    def __init__(self, schema_info: Dict[str, Any], config: RoutingConfig) -> None:
+        self.schema_info = schema_info
+        self.config = config
+
+    def route(
+        self, query: str, linked: "SchemaSlice | None" = None, mode: str | None = None
+    ) -> Route:
+        mode = mode or self.config.mode
+        if mode not in ROUTING_MODES:
+            raise ValueError(f"Unknown routing mode: {mode}")
+        if mode == "full":
+            return Route(mode, "full", "requested")
+
+        words = terms(query)
+        candidates = linked.tables if linked else list(self.schema_info)
+        named = [t for t in candidates if not terms(t).isdisjoint(words)]
+        if mode == "fast":
+            return Route(mode, "fast", "requested", named or candidates)
+
+        if len(query.split()) > self.config.max_words:
+            return Route(mode, "full", f"more than {self.config.max_words} words")
+        if not named:
+            return Route(mode, "full", "no table named")
+        if len(named) > self.config.max_tables:
+            return Route(mode, "full", f"{len(named)} tables named")
+        if linked and linked.scores:
+            best = max(linked.scores.values())
+            if best < self.config.min_link_score:
+                return Route(mode, "full", f"weak schema match ({best:.2f})")
+        return Route(mode, "fast", f"{len(named)} table(s) named", named)
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+import numpy as np
+from typing import TYPE_CHECKING, Any, Dict, List, Set
+
+from .config import SchemaIndexConfig
+from .db.schema import schema_fingerprint
+
+if TYPE_CHECKING:
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+
+
+@dataclass
+class SchemaSlice:
+    """Subset of the schema linked to a question: table -> candidate columns."""
+
+    columns: Dict[str, List[str]] = field(default_factory=dict)
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def tables(self) -> List[str]:
+        return list(self.columns)
+
+
+class SchemaIndex:
+    """
+    Embedding index over every table and column of a schema.
+
+    Tables are embedded as their name, description and column list, columns as
+    their qualified name, type and description. Vectors are stored on disk per
+    schema fingerprint, so a schema is embedded only once. `link` scores the
+    query against both levels, keeps the best tables, adds the tables they
+    reference through foreign keys, and trims each table to its most relevant
+    columns plus its key columns.
+    """
+
+    def __init__(
+        self,
+        schema_info: Dict[str, Any],
+        embed_model: "BaseEmbedding",
+        config: SchemaIndexConfig | None = None,
+    ) -> None:
+        self.schema_info = schema_info
+        self.embed_model = embed_model
+        self.config = config or SchemaIndexConfig()
+        self.fingerprint = schema_fingerprint(schema_info)
+        self._table_names: List[str] = []
+        self._column_keys: List[tuple[str, str]] = []
+        self._table_vectors: np.ndarray | None = None
+        self._column_vectors: np.ndarray | None = None
+        self._column_owner: np.ndarray | None = None
+        self._column_ranges: Dict[str, tuple[int, int]] = {}
+        self._table_position: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _load_descriptions(self) -> Dict[str, str]:
+        if not self.config.descriptions_path:
+            return {}
+        try:
+            with open(self.config.descriptions_path, "r", encoding="utf-8") as f:
+                descriptions: Dict[str, str] = json.load(f)
+            return descriptions
+        except Exception as e:
+            print(f"Error loading schema descriptions: {e}")
+            return {}
+
+    def _cache_path(self, dim: int) -> str:
+        # Vectors depend on the model and on the descriptions embedded with names
+        descriptions = b""
+        if self.config.descriptions_path:
+            try:
+                with open(self.config.descriptions_path, "rb") as f:
+                    descriptions = f.read()
+            except OSError:
+                pass
+        raw = f"{self.fingerprint}\x00{self.embed_model.model_name}\x00{dim}\x00"
+        key = hashlib.sha256(raw.encode("utf-8") + descriptions).hexdigest()
+        return os.path.join(self.config.cache_dir, f"schema_{key[:16]}.npz")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(
+            self.embed_model.get_text_embedding_batch(texts), dtype=np.float32
+        )
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+        return vectors
+
+    def _build(self, dim: int) -> None:
+        self._table_names = list(self.schema_info)
+        self._column_keys = [
+            (t, c["name"])
+            for t in self._table_names
+            for c in self.schema_info[t]["columns"]
+        ]
+        # Columns are laid out table by table, so each table owns a contiguous range
+        self._table_position = {t: i for i, t in enumerate(self._table_names)}
+        self._column_owner = np.array(
+            [self._table_position[t] for t, _ in self._column_keys], dtype=np.int32
+        )
+        start = 0
+        for t in self._table_names:
+            end = start + len(self.schema_info[t]["columns"])
+            self._column_ranges[t] = (start, end)
+            start = end
+
+        path = self._cache_path(dim)
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                self._table_vectors = cached["tables"]
+                self._column_vectors = cached["columns"]
+            return
+
+        descriptions = self._load_descriptions()
+        table_texts = [
+            " ".join(
+                filter(
+                    None,
+                    [
+                        f"Table {t}.",
+                        descriptions.get(t, ""),
+                        "Columns: "
+                        + ", ".join(c["name"] for c in self.schema_info[t]["columns"]),
+                    ],
+                )
+            )
+            for t in self._table_names
+        ]
+        column_types = {
+            (t, c["name"]): c.get("type", "")
+            for t in self._table_names
+            for c in self.schema_info[t]["columns"]
+        }
+        column_texts = [
+            f"{t}.{c} {column_types[(t, c)]} {descriptions.get(f'{t}.{c}', '')}".strip()
+            for t, c in self._column_keys
+        ]
+        self._table_vectors = self._embed(table_texts)
+        self._column_vectors = self._embed(column_texts)
+        if self._table_vectors.shape[1] != dim:
+            raise ValueError(
+                f"Embedding model returned {self._table_vectors.shape[1]}-dimensional "
+                f"text vectors but {dim}-dimensional query vectors"
+            )
+
+        os.makedirs(self.config.cache_dir, exist_ok=True)
+        np.savez(path, tables=self._table_vectors, columns=self._column_vectors)
+
+    def _ensure_built(self, dim: int) -> None:
+        if self._table_vectors is None or self._table_vectors.shape[1] != dim:
+            with self._lock:
+                if self._table_vectors is None or self._table_vectors.shape[1] != dim:
+                    self._build(dim)
+
+    def _key_columns(self, table: str) -> Set[str]:
+        info = self.schema_info[table]
+        keys = {c["name"] for c in info["columns"] if c.get("primary_key")}
+        keys.update(fk["column"] for fk in info.get("foreign_keys", []))
+        return keys
+
+    def link(self, query: str) -> SchemaSlice:
+        """Return the slice of the schema most relevant to `query`."""
+        vector = np.asarray(
+            self.embed_model.get_query_embedding(query), dtype=np.float32
+        )
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+        self._ensure_built(len(vector))
+        assert self._table_vectors is not None and self._column_vectors is not None
+        assert self._column_owner is not None
+        column_scores = self._column_vectors @ vector
+
+        # A table is as relevant as its best match, itself or one of its columns
+        table_scores = self._table_vectors @ vector
+        best_column = np.full(len(self._table_names), -1.0, dtype=np.float32)
+        np.maximum.at(best_column, self._column_owner, column_scores)
+        table_scores = np.maximum(table_scores, best_column)
+
+        k = min(self.config.top_k_tables, len(self._table_names))
+        top = np.argpartition(-table_scores, k - 1)[:k]
+        top = top[np.argsort(-table_scores[top])]
+        selected = [self._table_names[i] for i in top]
+
+        # Follow foreign keys so join partners of every candidate are available
+        for table in list(selected):
+            for fk in self.schema_info[table].get("foreign_keys", []):
+                partner = fk["references_table"]
+                if partner in self.schema_info and partner not in selected:
+                    selected.append(partner)
+
+        result = SchemaSlice(
+            scores={t: float(table_scores[self._table_position[t]]) for t in selected}
+        )
+        for table in selected:
+            columns = [c["name"] for c in self.schema_info[table]["columns"]]
+            if len(columns) > self.config.top_k_columns:
+                start, end = self._column_ranges[table]
+                best = np.argsort(-column_scores[start:end])[
+                    : self.config.top_k_columns
+                ]
+                keep = {self._column_keys[start + i][1] for i in best}
+                keep |= self._key_columns(table)
+                columns = [c for c in columns if c in keep]
+            result.columns[table] = columns
+        return result
@@ -0,0 +1,310 @@
+import argparse
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from .cli import add_pipeline_arguments, pipeline_from_args
+from .config import ServerConfig
+from .router import ROUTING_MODES
+from .telemetry import METRICS
+from .utils import normalize_query, serialize_result
+
+if TYPE_CHECKING:
+    from .querygpt import QueryGPT
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class Overloaded(HTTPError):
+    def __init__(self) -> None:
+        super().__init__(429, "Server overloaded, retry later.")
+
+
+class AdmissionController:
+    """
+    Bounds how many pipeline runs execute at once and how many may queue.
+
+    A run is reserved before it starts and holds its reservation while it waits
+    for one of `max_in_flight` slots. Once `max_in_flight + max_queue` runs are
+    reserved, new work is rejected instead of queueing without bound.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._reserved = 0
+        self._running = 0
+        self.rejected = 0
+
+    def reserve(self, runs: int = 1) -> None:
+        """Reserve `runs` runs at once, or raise Overloaded without reserving any."""
+        if self._reserved + runs > self.max_in_flight + self.max_queue:
+            self.rejected += 1
+            raise Overloaded()
+        self._reserved += runs
+
+    async def run(
+        self, question: str, pipeline: "QueryGPT", mode: str | None = None
+    ) -> Dict[str, Any]:
+        """Run a reserved question once a slot is free."""
+        try:
+            async with self._slots:
+                self._running += 1
+                try:
+                    return await pipeline.agenerate_query(question, mode=mode)
+                finally:
+                    self._running -= 1
+        finally:
+            self._reserved -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self._running,
+            "queued": self._reserved - self._running,
+            "rejected": self.rejected,
+        }
+
+
+class QueryServer:
+    """
+    HTTP front end keeping one warm QueryGPT pipeline for every request.
+
+    Endpoints:
+        POST /query with {"question": "..."} returns the generated SQL, its
+            explanation and a result preview.
+        POST /query/batch with {"questions": [...]} returns {"results": [...]}
+            in the order of the questions.
+        Both accept an optional "mode" of "auto", "fast" or "full" overriding
+            the pipeline's routing mode.
+        GET /health reports admission and coalescing counters.
+        GET /metrics returns per-stage latency percentiles, token usage and
+            cost in the Prometheus text format.
+
+    Questions that are identical after normalization and arrive while a run for
+    them is in flight join that run instead of starting another one.
+    """
+
+    def __init__(
+        self, pipeline: "QueryGPT", config: ServerConfig | None = None
+    ) -> None:
+        self.pipeline = pipeline
+        self.config = config or ServerConfig()
+        self.admission = AdmissionController(
+            self.config.max_in_flight, self.config.max_queue
+        )
+        self._runs: Dict[Tuple[str, str | None], asyncio.Task[Dict[str, Any]]] = {}
+        self.coalesced = 0
+
+    def _submit(
+        self, questions: List[str], mode: str | None = None
+    ) -> List[asyncio.Future[Dict[str, Any]]]:
+        """Start or join a pipeline run per question; all or none are admitted."""
+        # Runs only coalesce within a mode, as the mode changes the result
+        keys = [(normalize_query(q), mode) for q in questions]
+        new = {k: q for k, q in zip(keys, questions) if k not in self._runs}
+        self.admission.reserve(len(new))
+        for key, question in new.items():
+            task = asyncio.create_task(
+                self.admission.run(question, self.pipeline, mode)
+            )
+            self._runs[key] = task
+            task.add_done_callback(
+                lambda t, key=key: (
+                    self._runs.pop(key) if self._runs.get(key) is t else None
+                )
+            )
+        self.coalesced += len(keys) - len(new)
+        # A client going away must not cancel a run other requests share
+        return [asyncio.shield(self._runs[k]) for k in keys]
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        if path == "/metrics":
+            if method != "GET":
+                raise HTTPError(405, "Use GET.")
+            return 200, METRICS.prometheus()
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "Use GET.")
+            return 200, {
+                "status": "ok",
+                "coalesced": self.coalesced,
+                **self.admission.stats(),
+            }
+        if path not in ("/query", "/query/batch"):
+            raise HTTPError(404, f"Unknown path {path}.")
+        if method != "POST":
+            raise HTTPError(405, "Use POST.")
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            raise HTTPError(400, f"Invalid JSON: {e}") from e
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Expected a JSON object.")
+        mode = payload.get("mode")
+        if mode is not None and mode not in ROUTING_MODES:
+            raise HTTPError(400, f"Expected 'mode' in {list(ROUTING_MODES)}.")
+
+        if path == "/query":
+            question = payload.get("question")
+            if not isinstance(question, str) or not question.strip():
+                raise HTTPError(400, "Expected {'question': str}.")
+            (run,) = self._submit([question], mode)
+            result = await run
+            return (500 if "error" in result else 200), serialize_result(result)
+
+        questions = payload.get("questions")
+        if not isinstance(questions, list) or not all(
+            isinstance(q, str) and q.strip() for q in questions
+        ):
+            raise HTTPError(400, "Expected {'questions': [str, ...]}.")
+        if len(questions) > self.config.max_batch_size:
+            raise HTTPError(
+                413, f"At most {self.config.max_batch_size} questions per batch."
+            )
+        results = await asyncio.gather(*self._submit(questions, mode))
+        return 200, {"results": [serialize_result(r) for r in results]}
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> Tuple[str, str, Dict[str, str], bytes] | None:
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, _version = line.decode("latin-1").split()
+        except ValueError as e:
+            raise HTTPError(400, "Malformed request line.") from e
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError as e:
+            raise HTTPError(400, "Malformed Content-Length.") from e
+        if length < 0:
+            raise HTTPError(400, "Malformed Content-Length.")
+        if length > self.config.max_body_bytes:
+            raise HTTPError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    @staticmethod
+    async def _respond(
+        writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool
+    ) -> None:
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(payload, default=str).encode("utf-8")
+            content_type = "application/json"
+        headers = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 429:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve HTTP/1.1 requests on one connection until it closes."""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    # The rest of an unparsed request is still unread, so close
+                    await self._respond(writer, e.status, {"error": str(e)}, False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload = await self._route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            logger.exception("Error serving request")
+        finally:
+            writer.close()
+
+    async def start(self) -> asyncio.Server:
+        """Start listening; the returned server's sockets give the bound port."""
+        return await asyncio.start_server(
+            self.handle, self.config.host, self.config.port
+        )
+
+
+async def serve(pipeline: "QueryGPT", config: ServerConfig) -> None:
+    server = await QueryServer(pipeline, config).start()
+    address = server.sockets[0].getsockname()
+    logger.info("QueryGPT server listening on http://%s:%s", *address[:2])
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    # Suppress Neo4j deprecation warnings
+    logging.getLogger("neo4j.notifications").setLevel(logging.ERROR)
+
+    defaults = ServerConfig()
+    parser = argparse.ArgumentParser(description="Serve the NL-to-SQL pipeline.")
+    parser.add_argument("--host", type=str, default=defaults.host)
+    parser.add_argument("--port", type=int, default=defaults.port)
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=defaults.max_in_flight,
+        help="Maximum number of pipeline runs executing at once.",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=defaults.max_queue,
+        help="Maximum number of runs waiting for a slot before returning 429.",
+    )
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+
+    pipeline = pipeline_from_args(args)
+    # Requests should not wait for the imports and clients deferred to first use
+    pipeline.warm_up()
+    config = ServerConfig(
+        host=args.host,
+        port=args.port,
+        max_in_flight=args.max_in_flight,
+        max_queue=args.max_queue,
+    )
+    try:
+        asyncio.run(serve(pipeline, config))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
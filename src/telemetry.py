@@ -0,0 +1,399 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
+    from pydantic_ai.usage import Usage
+
+# USD per million prompt and completion tokens
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+_trace: ContextVar["Trace | None"] = ContextVar("querygpt_trace", default=None)
+_span: ContextVar["Span | None"] = ContextVar("querygpt_span", default=None)
+
+# Attributes that are summed when a stage runs more than once in a trace
+_COUNTERS = ("prompt_tokens", "completion_tokens", "llm_requests", "retries")
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def model_name(model: "Model | str | None") -> str:
+    if model is None:
+        return ""
+    if isinstance(model, str):
+        # Drop the provider prefix, e.g. "openai:gpt-4o"
+        return model.split(":", 1)[-1]
+    return model.model_name
+
+
+@dataclass
+class Span:
+    """
+    One timed stage of a pipeline run.
+
+    Attributes:
+        name: Stage name, e.g. "intent" or "execution".
+        trace_id: Id of the trace the span belongs to, shared by all its spans.
+        span_id: Id of this span.
+        parent_id: Id of the enclosing span, or None for a root span.
+        start_ns: Start time in nanoseconds since the epoch.
+        end_ns: End time in nanoseconds since the epoch, 0 while running.
+        attributes: Token usage, retries, cache hits and other stage details.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: _new_id(8))
+    parent_id: str | None = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON form."""
+        span: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if "error" in self.attributes:
+            span["status"] = {"code": 2, "message": str(self.attributes["error"])}
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": f"querygpt.{key}", "value": typed}
+
+
+class Trace:
+    """
+    The spans of one question's run through the pipeline.
+
+    A trace is made current with `activate`; every `span` opened while it is
+    current, including in tasks and threads started from that context, is
+    recorded as a descendant of its root span. `finish` closes the root span.
+    """
+
+    def __init__(self, name: str = "query") -> None:
+        self.trace_id = _new_id(16)
+        self.root = Span(name, self.trace_id)
+        self.spans: List[Span] = []
+
+    @contextmanager
+    def activate(self) -> Iterator["Trace"]:
+        trace_token = _trace.set(self)
+        span_token = _span.set(self.root)
+        try:
+            yield self
+        finally:
+            _span.reset(span_token)
+            _trace.reset(trace_token)
+
+    def finish(self) -> "Trace":
+        self.root.end_ns = time.time_ns()
+        METRICS.observe(self.root)
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """Wall time, tokens, retries and cost per stage and for the whole run."""
+        stages: Dict[str, Dict[str, Any]] = {}
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            stage = stages.setdefault(span.name, {"ms": 0.0})
+            stage["ms"] = round(stage["ms"] + span.duration_ms, 3)
+            for key, value in span.attributes.items():
+                if key in _COUNTERS or key == "cost_usd":
+                    stage[key] = stage.get(key, 0) + value
+                else:
+                    stage[key] = value
+        totals = {
+            key: sum(s.get(key, 0) for s in stages.values())
+            for key in (*_COUNTERS, "cost_usd")
+        }
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.root.duration_ms, 3),
+            **totals,
+            "stages": stages,
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The trace as an OTLP/JSON `ExportTraceServiceRequest`."""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": "querygpt"},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "querygpt"},
+                            "spans": [s.to_otlp() for s in (self.root, *self.spans)],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a pipeline stage.
+
+    The span joins the current trace, if any, and its duration and attributes
+    are added to the process-wide `METRICS` when it ends. Exceptions are
+    recorded on the span and re-raised.
+    """
+    trace = _trace.get()
+    parent = _span.get()
+    current = Span(
+        name,
+        trace.trace_id if trace else _new_id(16),
+        parent_id=parent.span_id if parent else None,
+        attributes=dict(attributes),
+    )
+    token = _span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _span.reset(token)
+        current.end_ns = time.time_ns()
+        if trace is not None:
+            trace.spans.append(current)
+        METRICS.observe(current)
+
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the innermost open span; a no-op outside spans."""
+    current = _span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def record_usage(usage: "Usage", model: "Model | str | None" = None) -> None:
+    """
+    Add the token usage of an agent run to the innermost open span.
+
+    Every request past the first one of a run is counted as a retry, as the
+    agents have no tools and only re-ask after invalid output.
+    """
+    current = _span.get()
+    if current is None:
+        return
+    prompt = usage.request_tokens or 0
+    completion = usage.response_tokens or 0
+    attrs = current.attributes
+    attrs["prompt_tokens"] = attrs.get("prompt_tokens", 0) + prompt
+    attrs["completion_tokens"] = attrs.get("completion_tokens", 0) + completion
+    attrs["llm_requests"] = attrs.get("llm_requests", 0) + usage.requests
+    attrs["retries"] = attrs.get("retries", 0) + max(usage.requests - 1, 0)
+    name = model_name(model)
+    prices = MODEL_PRICES.get(name)
+    if name:
+        attrs["model"] = name
+    if prices is not None:
+        cost = (prompt * prices[0] + completion * prices[1]) / 1e6
+        attrs["cost_usd"] = attrs.get("cost_usd", 0.0) + cost
+
+
+class LatencyHistogram:
+    """
+    Constant-memory latency distribution with log-spaced buckets.
+
+    Buckets grow by `growth` per step from `min_ms`, so quantiles are exact to
+    within that relative error (2% by default) however many samples are seen.
+    """
+
+    def __init__(self, min_ms: float = 0.01, growth: float = 1.02) -> None:
+        self.min_ms = min_ms
+        self._log_growth = math.log(growth)
+        self.growth = growth
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        index = (
+            0
+            if ms <= self.min_ms
+            else math.ceil(math.log(ms / self.min_ms) / self._log_growth)
+        )
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return self.min_ms * self.growth**index
+        return self.min_ms * self.growth ** max(self.buckets)
+
+
+class Metrics:
+    """Process-wide per-stage latency percentiles and usage counters."""
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[Tuple[str, str], float] = {}
+
+    def observe(self, span: Span) -> None:
+        with self._lock:
+            histogram = self.latency.get(span.name)
+            if histogram is None:
+                histogram = self.latency[span.name] = LatencyHistogram()
+            histogram.add(span.duration_ms)
+            route = span.attributes.get("route")
+            if route:
+                name = f"{span.name}_{route}"
+                if name not in self.latency:
+                    self.latency[name] = LatencyHistogram()
+                self.latency[name].add(span.duration_ms)
+            for key in (*_COUNTERS, "cost_usd"):
+                if key in span.attributes:
+                    self._count(span.name, key, span.attributes[key])
+            if span.attributes.get("cache_hit"):
+                self._count(span.name, "cache_hits", 1)
+            if "error" in span.attributes:
+                self._count(span.name, "errors", 1)
+            if span.attributes.get("fallback"):
+                self._count(span.name, "fallbacks", 1)
+            if span.attributes.get("accepted"):
+                self._count(span.name, "drafts_accepted", 1)
+            if "saved_ms" in span.attributes:
+                # Counters only grow, so time a rejected draft cost goes apart
+                saved = span.attributes["saved_ms"]
+                self._count(span.name, "saved_ms", max(saved, 0.0))
+                self._count(span.name, "lost_ms", max(-saved, 0.0))
+            if span.attributes.get("deadline_hit"):
+                self._count(span.name, "deadline_hits", 1)
+
+    def _count(self, stage: str, key: str, value: float) -> None:
+        self.counters[(stage, key)] = self.counters.get((stage, key), 0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latency.clear()
+            self.counters.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Count, mean and p50/p95/p99 wall time in ms plus counters per stage."""
+        with self._lock:
+            stages: Dict[str, Dict[str, Any]] = {}
+            for name, histogram in sorted(self.latency.items()):
+                stage = stages[name] = {
+                    "count": histogram.count,
+                    "mean_ms": round(histogram.sum_ms / histogram.count, 3),
+                }
+                for q in self.QUANTILES:
+                    stage[f"p{round(q * 100)}_ms"] = round(histogram.quantile(q), 3)
+            for (name, key), value in sorted(self.counters.items()):
+                stages.setdefault(name, {})[key] = value
+            return stages
+
+    def prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP querygpt_stage_duration_seconds Wall time per pipeline stage.",
+                "# TYPE querygpt_stage_duration_seconds summary",
+            ]
+            for name, histogram in sorted(self.latency.items()):
+                for q in self.QUANTILES:
+                    lines.append(
+                        f'querygpt_stage_duration_seconds{{stage="{name}",'
+                        f'quantile="{q}"}} {histogram.quantile(q) / 1000:.6f}'
+                    )
+                lines.append(
+                    f'querygpt_stage_duration_seconds_sum{{stage="{name}"}} '
+                    f"{histogram.sum_ms / 1000:.6f}"
+                )
+                lines.append(
+                    f'querygpt_stage_duration_seconds_count{{stage="{name}"}} '
+                    f"{histogram.count}"
+                )
+            for key, help_text in (
+                ("prompt_tokens", "Prompt tokens sent to the LLM."),
+                ("completion_tokens", "Completion tokens returned by the LLM."),
+                ("llm_requests", "LLM requests, including retries."),
+                ("retries", "LLM requests repeated after invalid output."),
+                ("cost_usd", "Estimated LLM cost in US dollars."),
+                ("cache_hits", "Stages answered from a cache or memo."),
+                ("errors", "Stages that raised an exception."),
+                ("fallbacks", "Fast paths that fell back to the full agent chain."),
+                ("drafts_accepted", "Speculative SQL drafts used as the answer."),
+                ("saved_ms", "Milliseconds saved by speculative SQL drafts."),
+                ("lost_ms", "Milliseconds lost to rejected drafts outlasting pruning."),
+                ("deadline_hits", "SQL votes settled early by their deadline."),
+            ):
+                metric = f"querygpt_{key}_total"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for (name, counter), value in sorted(self.counters.items()):
+                    if counter == key:
+                        lines.append(f'{metric}{{stage="{name}"}} {value:.10g}')
+            return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+class TraceExporter:
+    """Append finished traces to a file as OTLP/JSON, one request per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_otlp())
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
@@ -1,2 +1,50 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict
+
+_WORD = re.compile(r"[a-z0-9]+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,;:]+$")
+
+
 def format_output(sql: str, explanation: str) -> dict[str, str]:
     return {"sql": sql, "explanation": explanation}
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lowercase a question, collapse whitespace and drop trailing punctuation.
+
+    Everything else is kept: "gpa > 3.5" and "gpa < 3.5" ask different things.
+    """
+    return " ".join(_TRAILING_PUNCTUATION.sub("", query.lower()).split())
+
+
+def _stem(word: str) -> str:
+    # Crude plural folding so "students" matches the "student_id" column
+    if len(word) > 3 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def terms(text: str) -> frozenset[str]:
+    """Lowercase, singularized words of a question or identifier."""
+    return frozenset(_stem(w) for w in _WORD.findall(text.lower().replace("_", " ")))
+
+
+def serialize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a pipeline result into a JSON-serializable dict."""
+    if "error" in result:
+        return {"error": result["error"]}
+    return {
+        **result["sql_result"].model_dump(),
+        "query_result": result["query_result"],
+        "cache": result["cache"],
+        "validation": result.get("validation"),
+        "route": result.get("route"),
+        "speculation": result.get("speculation"),
+        "voting": result.get("voting"),
+        "telemetry": result.get("telemetry"),
+    }
@@ -1,4 +1,3 @@
-from llama_index.vector_stores.neo4jvector import Neo4jVectorStore
 from llama_index.core import VectorStoreIndex
 from llama_index.core.vector_stores.types import VectorStore
 from llama_index.core.base.base_retriever import BaseRetriever
@@ -7,27 +6,55 @@ from typing import Tuple, Dict, Any
 from .config import VectorStoreConfig
 
 
+def _create_store(config: VectorStoreConfig) -> VectorStore:
+    if config.backend == "local":
+        from .local_vector_store import LocalVectorStore
+
+        return LocalVectorStore(
+            persist_dir=config.local_path,
+            index_type=config.local_index,
+            hybrid_search=config.hybrid_search,
+        )
+
+    from llama_index.vector_stores.neo4jvector import Neo4jVectorStore
+
+    # Make sure your Neo4j instance has the vector plugin enabled!
+    return Neo4jVectorStore(
+        username=config.username,
+        password=config.password,
+        url=config.uri,
+        embedding_dimension=config.embedding_dim,
+        hybrid_search=config.hybrid_search,
+    )
+
+
 def setup_vector_store(
     schema_info: Dict[str, Any], config: VectorStoreConfig
 ) -> Tuple[VectorStore, BaseRetriever]:
     """
-    Initialize a Neo4j vector store and return both the store and a retriever.
+    Initialize the configured vector store and return both the store and a retriever.
 
     Args:
         schema_info: Database schema metadata (unused here but kept for interface consistency).
-        config: Explicit vector store configuration.
+        config: Explicit vector store configuration; `config.backend` selects
+            Neo4j or the in-process local store.
     """
-    # Make sure your Neo4j instance has the vector plugin enabled!
-    neo4j_store = Neo4jVectorStore(
-        username=config.username,
-        password=config.password,
-        url=config.uri,
-        embedding_dimension=config.embedding_dim,
-        hybrid_search=True,
-    )
+    store = _create_store(config)
 
     # Build an index on top of it and expose a retriever
-    index = VectorStoreIndex.from_vector_store(neo4j_store)
-    retriever = index.as_retriever(similarity_top_k=config.rag_k)
+    index = VectorStoreIndex.from_vector_store(store)
+    retriever: BaseRetriever
+    if config.backend == "local":
+        from .local_vector_store import LocalVectorRetriever
+
+        # Same arguments as `as_retriever`, which cannot build a subclass
+        retriever = LocalVectorRetriever(
+            index,
+            callback_manager=index._callback_manager,
+            object_map=index._object_map,
+            similarity_top_k=config.rag_k,
+        )
+    else:
+        retriever = index.as_retriever(similarity_top_k=config.rag_k)
 
-    return neo4j_store, retriever
+    return store, retriever
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from .agents.sql_generator import SQLGeneration
+from .config import VotingConfig
+from .db.engine import Database, SQLiteDatabase
+from .db.sampling import create_sampled_copy, sampled_copy_stale
+from .telemetry import annotate, span
+
+_ORDER_BY = re.compile(r"\border\s+by\b", re.IGNORECASE)
+
+
+@dataclass
+class Candidate:
+    """
+    One generated SQL candidate and its outcome on the sampled database.
+
+    Attributes:
+        index: Position of the candidate; lower ones use lower temperatures.
+        sql: The generated query.
+        fingerprint: Hash of the candidate's result rows, None when it failed.
+        error: Why the candidate failed to generate or run.
+    """
+
+    index: int
+    sql: SQLGeneration | None
+    fingerprint: str | None = None
+    error: str | None = None
+
+
+class CandidateVoter:
+    """
+    Pick among concurrently generated SQL candidates by their results.
+
+    Each candidate is run on a sampled copy of the database (for SQLite; other
+    databases run the candidate itself and read at most `max_rows` rows), and
+    candidates returning the same rows share a fingerprint. The fingerprint
+    shared by most candidates wins, ties going to the lowest-temperature
+    candidate. Voting stops early once a fingerprint has a majority of all
+    candidates, and at the deadline settles for the candidates finished so far.
+    A candidate's query is cancelled once it runs longer than the deadline.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        schema_info: Dict[str, Any],
+        config: VotingConfig,
+        source_path: str | None = None,
+    ) -> None:
+        """
+        Args:
+            database: Database the pipeline executes queries on.
+            schema_info: Database schema metadata.
+            config: Number of candidates, temperatures, deadline and sampling.
+            source_path: SQLite file of `database`, sampled for the checks.
+        """
+        self.database = database
+        self.schema_info = schema_info
+        self.config = config
+        self.source_path = source_path
+        self._sample: Database | None = None
+        self._lock = threading.Lock()
+
+    def temperature(self, index: int) -> float:
+        return self.config.temperatures[index % len(self.config.temperatures)]
+
+    def sample_database(self) -> Database:
+        """The database candidates are checked on, sampled on first use."""
+        if self.source_path is None:
+            return self.database
+        path = self.config.sample_path or (
+            os.path.splitext(self.source_path)[0] + ".sample.db"
+        )
+        with self._lock:
+            stale = sampled_copy_stale(self.source_path, path)
+            if stale:
+                create_sampled_copy(
+                    self.source_path, self.schema_info, path, self.config.sample_rows
+                )
+            if stale or self._sample is None:
+                if self._sample is not None:
+                    self._sample.close()
+                self._sample = SQLiteDatabase(path)
+            return self._sample
+
+    def fingerprint(self, sql: str) -> str:
+        """Hash of the rows `sql` returns on the sampled database."""
+        # Pooled sessions are read-only; the timeout stops runaway candidates
+        with self.sample_database().cursor(self.config.deadline_ms) as cursor:
+            cursor.execute(sql)
+            rows = [
+                tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+                for row in cursor.fetchmany(self.config.max_rows)
+            ]
+            width = len(cursor.description or ())
+        # Column names and, without ORDER BY, row order do not change the answer
+        if not _ORDER_BY.search(sql):
+            rows.sort(key=repr)
+        return hashlib.sha256(repr((width, rows)).encode("utf-8")).hexdigest()
+
+    async def _run(
+        self, index: int, generate: Callable[[int], Awaitable[SQLGeneration]]
+    ) -> Candidate:
+        with span("candidate_generation", temperature=self.temperature(index)):
+            try:
+                sql_out = await generate(index)
+            except asyncio.CancelledError:
+                annotate(cancelled=True)
+                raise
+            except Exception as e:
+                return Candidate(index, None, error=f"generation failed: {e}")
+        with span("candidate_check") as current:
+            try:
+                fingerprint = await asyncio.to_thread(self.fingerprint, sql_out.sql)
+            except Exception as e:
+                current.attributes["failed"] = True
+                return Candidate(index, sql_out, error=str(e))
+        return Candidate(index, sql_out, fingerprint)
+
+    async def vote(
+        self, generate: Callable[[int], Awaitable[SQLGeneration]]
+    ) -> Tuple[SQLGeneration, Dict[str, Any]]:
+        """
+        Generate `candidates` queries with `generate(index)` and vote on them.
+
+        Returns the winning query and a report of the vote. When no candidate
+        ran on the sample, the lowest-index generated one is returned, for
+        validation and repair to deal with; raises ValueError when none of them
+        could be generated at all.
+        """
+        n = self.config.candidates
+        with span("voting") as current:
+            start = time.perf_counter()
+            pending = {asyncio.create_task(self._run(i, generate)) for i in range(n)}
+            done: List[Candidate] = []
+            deadline_hit = False
+            try:
+                while pending:
+                    remaining = self.config.deadline_ms / 1000 - (
+                        time.perf_counter() - start
+                    )
+                    if remaining <= 0 and any(c.sql for c in done):
+                        deadline_hit = True
+                        break
+                    finished, pending = await asyncio.wait(
+                        pending,
+                        timeout=max(remaining, 0) or None,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    done.extend(task.result() for task in finished)
+                    if self._leader(done)[1] * 2 > n:
+                        break
+            finally:
+                for task in pending:
+                    task.cancel()
+                # Let cancelled candidates close their spans within this trace
+                await asyncio.gather(*pending, return_exceptions=True)
+
+            fingerprint, votes = self._leader(done)
+            generated = sorted((c for c in done if c.sql), key=lambda c: c.index)
+            if not generated:
+                errors = "; ".join(c.error or "" for c in done)
+                raise ValueError(f"No SQL candidate could be generated: {errors}")
+            winner = next(
+                (c for c in generated if c.fingerprint == fingerprint), generated[0]
+            )
+            report = {
+                "candidates": n,
+                "finished": len(done),
+                "valid": sum(c.fingerprint is not None for c in done),
+                "groups": len({c.fingerprint for c in done if c.fingerprint}),
+                "votes": votes,
+                "winner": winner.index,
+                "deadline_hit": deadline_hit,
+            }
+            current.attributes.update(report)
+        assert winner.sql is not None
+        return winner.sql, report
+
+    @staticmethod
+    def _leader(candidates: List[Candidate]) -> Tuple[str | None, int]:
+        """The fingerprint most candidates share and its count."""
+        counts: Dict[str, int] = {}
+        first: Dict[str, int] = {}
+        for c in candidates:
+            if c.fingerprint is not None:
+                counts[c.fingerprint] = counts.get(c.fingerprint, 0) + 1
+                first[c.fingerprint] = min(first.get(c.fingerprint, c.index), c.index)
+        if not counts:
+            return None, 0
+        best = max(counts, key=lambda f: (counts[f], -first[f]))
+        return best, counts[best]
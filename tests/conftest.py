@@ -0,0 +1,84 @@
+from typing import Any, Callable, Dict, List
+
+import pytest
+from llama_index.core import MockEmbedding, Settings
+
+from src.config import DatabaseConfig, VectorStoreConfig
+from src.db.seed import create_sample_university_data
+
+
+class ScriptedModel:
+    """
+    Answers every agent with a fixed output, recording which agents were called
+    and the user prompt each one was last sent.
+
+    The SQL generator gets the next entry of `sql`, the last one repeating;
+    an entry may be a callable of the temperature of the request.
+    """
+
+    def __init__(self, sql: List[Any]) -> None:
+        from pydantic_ai.messages import ModelResponse, ToolCallPart
+        from pydantic_ai.models.function import FunctionModel
+
+        self.sql = list(sql)
+        self.calls: List[str] = []
+        self.prompts: Dict[str, str] = {}
+
+        def respond(messages: Any, info: Any) -> ModelResponse:
+            kind, output = self.answer(info)
+            self.calls.append(kind)
+            self.prompts[kind] = messages[-1].parts[-1].content
+            return ModelResponse(
+                parts=[ToolCallPart(tool_name=info.output_tools[0].name, args=output)]
+            )
+
+        self.model = FunctionModel(respond)
+
+    def answer(self, info: Any) -> "tuple[str, Dict[str, Any]]":
+        properties = info.output_tools[0].parameters_json_schema["properties"]
+        if "workspaces" in properties:
+            return "intent", {"workspaces": ["student_management"], "explanation": ""}
+        if "tables" in properties:
+            return "tables", {"tables": ["students"], "explanation": ""}
+        if "pruned_schema" in properties:
+            return "columns", {
+                "pruned_schema": {"students": ["id", "name"]},
+                "explanation": "",
+            }
+        sql = self.sql.pop(0) if len(self.sql) > 1 else self.sql[0]
+        if callable(sql):
+            settings = info.model_settings or {}
+            sql = sql(settings.get("temperature"))
+        return "sql", {"sql": sql, "explanation": ""}
+
+
+@pytest.fixture
+def make_pipeline(tmp_path, monkeypatch) -> Callable[..., Any]:
+    """
+    Build a QueryGPT over a seeded SQLite file, answering with a `ScriptedModel`.
+
+    Called with the SQL script and pipeline configs; returns the pipeline and
+    the model.
+    """
+    from src.querygpt import QueryGPT
+
+    path = tmp_path / "university.db"
+    create_sample_university_data(str(path))
+    embedding = MockEmbedding(embed_dim=8)
+    monkeypatch.setattr(Settings, "_embed_model", embedding)
+
+    def make(sql: List[Any], **config: Any) -> "tuple[QueryGPT, ScriptedModel]":
+        model = ScriptedModel(sql)
+        pipeline = QueryGPT(
+            agent_model=model.model,
+            database_config=DatabaseConfig(url=f"sqlite:///{path}"),
+            vector_store_config=VectorStoreConfig(
+                backend="local", local_path=str(tmp_path / "vectors")
+            ),
+            **config,
+        )
+        # Never configure the OpenAI models
+        pipeline.__dict__["_embed_model"] = embedding
+        return pipeline, model
+
+    return make
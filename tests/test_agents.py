@@ -0,0 +1,58 @@
+from collections import defaultdict
+from typing import Any, Dict, Set
+
+import src.querygpt as querygpt
+from src.config import RoutingConfig
+
+QUESTIONS = ["Which students are enrolled?", "List every student by name"]
+AGENTS = ["IntentAgent", "TableAgent", "ColumnPruneAgent", "SQLGenerator"]
+
+
+def make(make_pipeline):
+    return make_pipeline(
+        ["SELECT id, name FROM students"], routing_config=RoutingConfig(mode="full")
+    )
+
+
+def test_agents_are_built_once_per_pipeline(make_pipeline, monkeypatch):
+    built: Dict[str, int] = defaultdict(int)
+    for name in AGENTS:
+        cls = getattr(querygpt, name)
+
+        def counting(*args: Any, cls: Any = cls, **kwargs: Any) -> Any:
+            built[cls.__name__] += 1
+            return cls(*args, **kwargs)
+
+        monkeypatch.setattr(querygpt, name, counting)
+    pipeline, model = make(make_pipeline)
+    for question in QUESTIONS:
+        assert "error" not in pipeline.generate_query(question)
+    assert model.calls.count("sql") == 2
+    assert built == {name: 1 for name in AGENTS}
+
+
+def test_system_prompts_are_the_same_for_every_question(make_pipeline):
+    pipeline, model = make(make_pipeline)
+    respond = model.model.function
+    system_prompts: Dict[str, Set[str]] = defaultdict(set)
+
+    def recording(messages: Any, info: Any) -> Any:
+        response = respond(messages, info)
+        system_prompts[model.calls[-1]].update(
+            part.content
+            for part in messages[0].parts
+            if part.part_kind == "system-prompt"
+        )
+        return response
+
+    model.model.function = recording
+    for question in QUESTIONS:
+        pipeline.generate_query(question)
+        # The question only travels in the user prompt
+        assert question in model.prompts["sql"]
+    assert set(system_prompts) == {"intent", "tables", "columns", "sql"}
+    for kind, prompts in system_prompts.items():
+        (prompt,) = prompts
+        assert not any(question in prompt for question in QUESTIONS), kind
+    (sql_prompt,) = system_prompts["sql"]
+    assert "SQLite SQL dialect" in sql_prompt
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+
+from src.config import RoutingConfig
+
+SQL = "SELECT id, name FROM students"
+QUESTION = "Which students are enrolled?"
+
+
+def make(make_pipeline):
+    return make_pipeline([SQL], routing_config=RoutingConfig(mode="full"))
+
+
+def test_async_pipeline_matches_the_sync_one(make_pipeline):
+    pipeline, model = make(make_pipeline)
+    expected = pipeline.generate_query(QUESTION)
+    sync_calls = sorted(model.calls)
+    model.calls.clear()
+    result = asyncio.run(pipeline.agenerate_query(QUESTION))
+    assert result["sql_result"].sql == expected["sql_result"].sql == SQL
+    assert result["query_result"] == expected["query_result"]
+    assert sorted(model.calls) == sync_calls
+
+
+def test_table_selection_overlaps_intent_classification(make_pipeline):
+    pipeline, model = make(make_pipeline)
+    answer = model.answer
+    tables_started = threading.Event()
+    overlapped = []
+
+    def blocking(info):
+        kind, output = answer(info)
+        if kind == "tables":
+            tables_started.set()
+        if kind == "intent":
+            # Intent only answers once table selection has been sent
+            overlapped.append(tables_started.wait(timeout=5))
+        return kind, output
+
+    model.answer = blocking
+    result = asyncio.run(pipeline.agenerate_query(QUESTION))
+    assert overlapped == [True]
+    assert result["sql_result"].sql == SQL
+    # Every workspace is in scope while the intent is unknown
+    for workspace in pipeline.intent_agent.workspaces:
+        assert workspace in model.prompts["tables"]
+
+
+def test_sequential_intent_narrows_table_selection(make_pipeline):
+    pipeline, model = make(make_pipeline)
+    asyncio.run(pipeline.agenerate_query(QUESTION, overlap_intent=False))
+    assert model.calls == ["intent", "tables", "columns", "sql"]
+    assert "Workspaces: ['student_management']" in model.prompts["tables"]
+
+
+def test_generation_errors_are_reported(make_pipeline):
+    pipeline, _ = make(make_pipeline)
+
+    def fail(user_query):
+        raise RuntimeError("vector store unavailable")
+
+    pipeline._retrieve = fail
+    result = asyncio.run(pipeline.agenerate_query(QUESTION))
+    assert result["error"] == "vector store unavailable"
+    assert "telemetry" in result
@@ -0,0 +1,97 @@
+import asyncio
+import io
+import json
+from typing import Any, Dict, List
+
+from src.agents.sql_generator import SQLGeneration
+from src.main import read_questions, write_batch
+from src.querygpt import QueryGPT
+
+
+def answer(question: str) -> Dict[str, Any]:
+    sql = SQLGeneration(sql=f"-- {question}", explanation="")
+    return {"sql_result": sql, "query_result": [], "cache": None}
+
+
+class FakePipeline:
+    """Answers with the question after a delay, recording what it was asked."""
+
+    agenerate_queries = QueryGPT.agenerate_queries
+
+    def __init__(self) -> None:
+        self.asked: List[str] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def agenerate_query(
+        self, question: str, mode: str | None = None
+    ) -> Dict[str, Any]:
+        self.asked.append(question)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return answer(question)
+
+
+def run(pipeline: FakePipeline, questions, concurrency: int = 8):
+    async def collect():
+        return [
+            item async for item in pipeline.agenerate_queries(questions, concurrency)
+        ]
+
+    return asyncio.run(collect())
+
+
+def test_every_position_gets_its_result_and_duplicates_run_once():
+    pipeline = FakePipeline()
+    questions = ["Top students?", "top students", "Courses", "Top  students?!"]
+    results = dict(run(pipeline, questions))
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[1] == results[3] == answer("Top students?")
+    assert pipeline.asked == ["Top students?", "Courses"]
+
+
+def test_duplicate_of_a_finished_question_reuses_its_result():
+    pipeline = FakePipeline()
+    results = dict(run(pipeline, ["a", "b", "a"], concurrency=1))
+    assert results == {0: answer("a"), 1: answer("b"), 2: answer("a")}
+    assert pipeline.asked == ["a", "b"]
+
+
+def test_questions_are_read_only_as_slots_free_up():
+    pipeline = FakePipeline()
+    read: List[int] = []
+
+    def questions():
+        for i in range(10):
+            # Never more than `concurrency` questions ahead of the results
+            assert len(read) - len(pipeline.asked) + pipeline.in_flight <= 2
+            read.append(i)
+            yield f"question {i}"
+
+    results = run(pipeline, questions(), concurrency=2)
+    assert len(results) == 10
+    assert pipeline.peak == 2
+
+
+def test_write_batch_streams_jsonl(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text('"first"\n\n{"question": "second"}\n')
+    out = io.StringIO()
+    asyncio.run(write_batch(FakePipeline(), read_questions(str(path)), 2, out))
+    records = sorted(
+        (json.loads(line) for line in out.getvalue().splitlines()),
+        key=lambda r: r["index"],
+    )
+    assert [(r["index"], r["question"], r["sql"]) for r in records] == [
+        (0, "first", "-- first"),
+        (1, "second", "-- second"),
+    ]
+
+
+def test_read_questions_from_stdin_leaves_it_open(monkeypatch):
+    stdin = io.StringIO('"first"\n{"question": "second"}\n')
+    monkeypatch.setattr("sys.stdin", stdin)
+    assert list(read_questions("-")) == ["first", "second"]
+    assert not stdin.closed
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from benchmarks.suite import compare, oracle_model, replay_model, run_suite, same_result
+from src.config import RoutingConfig
+from src.db.engine import SQLiteDatabase
+
+EXAMPLES = Path(__file__).parent.parent / "examples" / "sample_queries.json"
+with open(EXAMPLES, "r", encoding="utf-8") as f:
+    SAMPLES = json.load(f)[:4]
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "scores.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE scores (name TEXT, score REAL)")
+        conn.executemany(
+            "INSERT INTO scores VALUES (?, ?)", [("a", 0.1 + 0.2), ("b", 2.0)]
+        )
+    conn.close()
+    database = SQLiteDatabase(str(path))
+    yield database
+    database.close()
+
+
+def test_same_result_ignores_names_and_unrequested_order(database):
+    gold = "SELECT name, score FROM scores"
+    assert same_result(database, gold, "SELECT name AS n, score FROM scores")
+    assert same_result(database, gold, "SELECT name, score FROM scores ORDER BY 1 DESC")
+    assert (
+        same_result(database, gold, "SELECT name, 0.3 FROM scores WHERE name = 'a'")
+        is False
+    )
+    # Float noise is rounded away
+    assert same_result(
+        database, "SELECT 0.3", "SELECT score FROM scores WHERE name = 'a'"
+    )
+
+
+def test_same_result_keeps_requested_order(database):
+    gold = "SELECT name FROM scores ORDER BY score"
+    assert same_result(database, gold, "SELECT name FROM scores ORDER BY score")
+    assert not same_result(
+        database, gold, "SELECT name FROM scores ORDER BY score DESC"
+    )
+
+
+def report(**overrides: Any) -> Dict[str, Any]:
+    base: Dict[str, Any] = {
+        "accuracy": 1.0,
+        "results": [{"question": "q", "correct": True}],
+        "p50_ms": 10.0,
+        "p95_ms": 20.0,
+        "stages": {"execution": {"p50_ms": 0.2, "p95_ms": 0.4}},
+        "throughput_qps": 50.0,
+        "prompt_tokens_per_question": 1000.0,
+        "completion_tokens_per_question": 50.0,
+    }
+    return {**base, **overrides}
+
+
+def test_compare_flags_regressions_only():
+    assert compare(report(), report()) == []
+    # Sub-millisecond stages and changes within the tolerance are noise
+    noisy = report(p50_ms=11.0, stages={"execution": {"p50_ms": 0.6, "p95_ms": 0.8}})
+    assert compare(report(), noisy) == []
+
+    worse = report(
+        accuracy=0.0,
+        results=[{"question": "q", "correct": False, "error": "no such table"}],
+        p95_ms=40.0,
+        throughput_qps=20.0,
+        prompt_tokens_per_question=2000.0,
+    )
+    assert compare(report(), worse) == [
+        "accuracy 100.00% -> 0.00%",
+        "now failing: q (no such table)",
+        "p95 20.0 ms -> 40.0 ms",
+        "throughput 50.0 -> 20.0 questions/s",
+        "prompt_tokens_per_question 1000 -> 2000",
+    ]
+
+
+def gold() -> Dict[str, str]:
+    return {s["natural_language"]: s["sql"] for s in SAMPLES}
+
+
+def test_oracle_answers_are_all_correct(make_pipeline):
+    pipeline, _ = make_pipeline([], routing_config=RoutingConfig(mode="full"))
+    pipeline.agent_model = oracle_model(gold(), pipeline.schema_info)
+    result = asyncio.run(run_suite(pipeline, SAMPLES, concurrency=2, repeat=2))
+    assert (result["questions"], result["runs"]) == (4, 8)
+    assert result["accuracy"] == 1.0
+    assert result["paths"] == {"full": 4}
+    assert [r["question"] for r in result["results"]] == list(gold())
+    assert {"intent", "table_selection", "sql_generation"} <= set(result["stages"])
+
+
+def test_wrong_and_missing_answers_are_incorrect(make_pipeline):
+    pipeline, _ = make_pipeline([], routing_config=RoutingConfig(mode="full"))
+    pipeline.agent_model = oracle_model(gold(), pipeline.schema_info, sql_error_rate=1)
+    wrong = asyncio.run(run_suite(pipeline, SAMPLES))
+    assert wrong["accuracy"] == 0.0
+    assert all(r["sql"].endswith("AS wrong") for r in wrong["results"])
+
+    pipeline, _ = make_pipeline([], routing_config=RoutingConfig(mode="full"))
+    pipeline.agent_model = replay_model({})
+    missing = asyncio.run(run_suite(pipeline, SAMPLES[:1]))
+    assert missing["accuracy"] == 0.0
+    assert "No recorded" in missing["results"][0]["error"]
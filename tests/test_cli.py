@@ -0,0 +1,27 @@
+import argparse
+
+import src.querygpt
+from src.cli import add_pipeline_arguments, pipeline_from_args
+
+
+def parse(*argv: str) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    add_pipeline_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def test_flags_map_to_pipeline_configs(monkeypatch):
+    monkeypatch.setattr(src.querygpt, "QueryGPT", lambda **kwargs: kwargs)
+    configs = pipeline_from_args(
+        parse("--cache-path", "r.sqlite", "--mode", "fast", "--candidates", "3")
+    )
+    assert configs["response_cache_config"].path == "r.sqlite"
+    assert configs["routing_config"].mode == "fast"
+    assert configs["voting_config"].candidates == 3
+    assert configs["speculation_config"] is None
+    assert configs["result_cache_config"] is None
+
+
+def test_no_flags_leave_every_feature_off(monkeypatch):
+    monkeypatch.setattr(src.querygpt, "QueryGPT", lambda **kwargs: kwargs)
+    assert set(pipeline_from_args(parse()).values()) == {None}
@@ -0,0 +1,118 @@
+import json
+from typing import List
+
+import pytest
+from llama_index.core import Settings
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from src.embeddings import initialize_embeddings
+from src.local_vector_store import LocalVectorStore
+
+
+class CountingEmbedding(BaseEmbedding):
+    """Constant vectors of `dim` dimensions, counting the texts embedded."""
+
+    dim: int = 8
+    texts: int = 0
+
+    def _vector(self) -> List[float]:
+        return [1.0] * self.dim
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._vector()
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._vector()
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        self.texts += 1
+        return self._vector()
+
+
+@pytest.fixture
+def samples(tmp_path):
+    path = tmp_path / "samples.jsonl"
+    path.write_text(
+        "\n".join(
+            json.dumps({"natural_language": f"question {i}", "sql": f"SELECT {i}"})
+            for i in range(3)
+        )
+    )
+    return str(path)
+
+
+def sync(monkeypatch, store, samples, embedding) -> int:
+    """Run the sync with `embedding`; returns the number of samples embedded."""
+    monkeypatch.setattr(Settings, "_embed_model", embedding)
+    initialize_embeddings(store, {}, samples)
+    return embedding.texts - 1  # less the dimension probe
+
+
+def test_unchanged_samples_are_not_embedded_again(monkeypatch, tmp_path, samples):
+    store = LocalVectorStore(persist_dir=str(tmp_path / "store"))
+    assert sync(monkeypatch, store, samples, CountingEmbedding()) == 3
+    assert sync(monkeypatch, store, samples, CountingEmbedding()) == 0
+    assert store.node_count == 3
+
+
+def test_other_model_or_dimension_embeds_everything(monkeypatch, tmp_path, samples):
+    store = LocalVectorStore(persist_dir=str(tmp_path / "store"))
+    sync(monkeypatch, store, samples, CountingEmbedding())
+    assert sync(monkeypatch, store, samples, CountingEmbedding(model_name="b")) == 3
+    smaller = CountingEmbedding(model_name="b", dim=4)
+    assert sync(monkeypatch, store, samples, smaller) == 3
+
+    result = store.query(
+        VectorStoreQuery(query_embedding=[1.0] * 4, similarity_top_k=5)
+    )
+    assert len(result.ids or []) == 3
+    with open(f"{samples}.manifest.json", "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["embedding_model"] == "b:4"
+    assert len(manifest["node_ids"]) == 3
+
+
+def test_other_store_embeds_everything(monkeypatch, tmp_path, samples):
+    first = LocalVectorStore(persist_dir=str(tmp_path / "first"))
+    sync(monkeypatch, first, samples, CountingEmbedding())
+    second = LocalVectorStore(persist_dir=str(tmp_path / "second"))
+    assert sync(monkeypatch, second, samples, CountingEmbedding()) == 3
+    assert second.node_count == 3
+    # Nodes of the first store are left alone
+    assert first.node_count == 3
+
+
+def test_removed_samples_are_deleted_in_one_call(monkeypatch, tmp_path, samples):
+    store = LocalVectorStore(persist_dir=str(tmp_path / "store"))
+    sync(monkeypatch, store, samples, CountingEmbedding())
+    calls = []
+    delete_nodes = LocalVectorStore.delete_nodes
+
+    def counted(self, node_ids=None, **kwargs):
+        calls.append(node_ids)
+        delete_nodes(self, node_ids, **kwargs)
+
+    monkeypatch.setattr(LocalVectorStore, "delete_nodes", counted)
+    with open(samples, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"natural_language": "question 0", "sql": "SELECT 0"}))
+    assert sync(monkeypatch, store, samples, CountingEmbedding()) == 0
+    assert len(calls) == 1
+    assert store.node_count == 1
+
+
+def test_legacy_positional_ids_are_deleted(monkeypatch, tmp_path, samples):
+    store = LocalVectorStore(persist_dir=str(tmp_path / "store"))
+    # Samples as ingested before the manifest existed
+    store.add(
+        [
+            TextNode(
+                id_=f"sample_query_{i + 1}", text=f"question {i}", embedding=[1.0] * 8
+            )
+            for i in range(3)
+        ]
+    )
+    assert sync(monkeypatch, store, samples, CountingEmbedding()) == 3
+    assert store.node_count == 3
+    assert not any(node_id.startswith("sample_query_") for node_id in store._ids)
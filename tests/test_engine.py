@@ -0,0 +1,185 @@
+import sqlite3
+from contextlib import nullcontext
+from typing import Any, Dict, List
+
+import pytest
+
+from src.config import DatabaseConfig
+from src.db.engine import Database, SQLiteDatabase, create_database
+
+
+def test_database_is_abstract():
+    with pytest.raises(TypeError):
+        Database()  # type: ignore[abstract]
+
+
+def test_missing_sqlite_file_is_not_created(tmp_path):
+    path = tmp_path / "missing.db"
+    database = SQLiteDatabase(str(path))
+    with pytest.raises(sqlite3.OperationalError):
+        database.load_schema()
+    assert not path.exists()
+
+
+def test_row_estimates_follow_the_file(tmp_path):
+    path = tmp_path / "university.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE students (id INTEGER PRIMARY KEY)")
+        conn.executemany("INSERT INTO students VALUES (?)", [(1,), (2,)])
+    conn.close()
+    database = SQLiteDatabase(str(path))
+    assert database.explain("SELECT * FROM students").full_scans == {"students": 2}
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO students VALUES (50)")
+        conn.execute("CREATE TABLE courses (id INTEGER PRIMARY KEY)")
+        conn.execute("INSERT INTO courses VALUES (7)")
+    conn.close()
+    plan = database.explain("SELECT * FROM students, courses")
+    assert plan.full_scans == {"students": 50, "courses": 7}
+    database.close()
+
+
+class FakeCursor:
+    def __init__(self, rows: List[Any], more: bool = False) -> None:
+        self.rows = rows
+        self.more = more
+
+    def fetchall(self) -> List[Any]:
+        return self.rows
+
+    def nextset(self) -> bool:
+        return self.more
+
+    def __enter__(self) -> "FakeCursor":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+class FakeConnection:
+    """Answers EXPLAIN with a canned plan and pg_class with canned estimates."""
+
+    def __init__(self, plan: Dict[str, Any], reltuples: Dict[str, int]) -> None:
+        self.plan = plan
+        self.reltuples = reltuples
+        self.read_only = False
+        self.cursor_names: List[str] = []
+        self.executed: List[Any] = []
+
+    def execute(self, sql: str, params: Any = None) -> FakeCursor:
+        self.executed.append((sql, params))
+        if sql.startswith("SELECT set_config"):
+            return FakeCursor([])
+        if sql.startswith("EXPLAIN"):
+            return FakeCursor([([{"Plan": self.plan}],)], more=";" in sql)
+        _, tables = params
+        return FakeCursor([(t, self.reltuples[t]) for t in tables])
+
+    def cursor(self, name: str) -> Any:
+        self.cursor_names.append(name)
+        return FakeCursor([])
+
+
+class FakePool:
+    """psycopg_pool.ConnectionPool lending one configured connection."""
+
+    instances: List["FakePool"] = []
+    conn: FakeConnection
+
+    def __init__(self, url: str, configure: Any = None, **kwargs: Any) -> None:
+        self.url = url
+        self.kwargs = kwargs
+        self.conn = FakePool.conn
+        configure(self.conn)
+        FakePool.instances.append(self)
+
+    def connection(self) -> Any:
+        return nullcontext(self.conn)
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def postgres(monkeypatch):
+    pytest.importorskip("psycopg")
+    psycopg_pool = pytest.importorskip("psycopg_pool")
+    monkeypatch.setattr(psycopg_pool, "ConnectionPool", FakePool)
+    plan = {
+        "Node Type": "Hash Join",
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "enrollments"},
+            {
+                "Node Type": "Hash",
+                "Plans": [{"Node Type": "Seq Scan", "Relation Name": "students"}],
+            },
+        ],
+    }
+    # reltuples is -1 for a table that was never analyzed
+    FakePool.conn = FakeConnection(plan, {"enrollments": 900, "students": -1})
+    FakePool.instances = []
+    config = DatabaseConfig(url="postgresql://db/university", pool_size=3)
+    database = create_database(config)
+    yield database
+    database.close()
+
+
+def test_postgres_pool_is_read_only(postgres):
+    (pool,) = FakePool.instances
+    assert pool.url == "postgresql://db/university"
+    assert pool.kwargs["max_size"] == 3
+    assert pool.conn.read_only
+
+
+def test_postgres_explain_reports_sequential_scans(postgres):
+    plan = postgres.explain("SELECT * FROM students JOIN enrollments USING (id)")
+    assert plan.steps == [
+        "Hash Join",
+        "Seq Scan on enrollments",
+        "Hash",
+        "Seq Scan on students",
+    ]
+    assert plan.full_scans == {"enrollments": 900, "students": 0}
+
+
+def test_postgres_explain_rejects_several_statements(postgres):
+    import psycopg
+
+    with pytest.raises(psycopg.ProgrammingError):
+        postgres.explain("SELECT 1; SELECT 2")
+
+
+def test_postgres_cursors_are_named_server_side(postgres):
+    for _ in range(2):
+        with postgres.cursor():
+            pass
+    names = FakePool.conn.cursor_names
+    assert len(set(names)) == 2
+    assert all(name.startswith("querygpt_") for name in names)
+
+
+def test_sqlite_cursor_timeout_interrupts_the_statement(tmp_path):
+    path = tmp_path / "empty.db"
+    sqlite3.connect(path).close()
+    database = SQLiteDatabase(str(path))
+    endless = (
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+        "SELECT MAX(i) FROM n"
+    )
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        with database.cursor(timeout_ms=50) as cursor:
+            cursor.execute(endless)
+    # The pooled connection is reusable without the timeout
+    with database.cursor() as cursor:
+        assert cursor.execute("SELECT 1").fetchone() == (1,)
+    database.close()
+
+
+def test_postgres_cursor_timeout_is_local_to_its_transaction(postgres):
+    with postgres.cursor(timeout_ms=2500):
+        pass
+    statement, params = FakePool.conn.executed[-1]
+    assert "set_config('statement_timeout'" in statement
+    assert params == ("2500",)
@@ -0,0 +1,79 @@
+import csv
+import sqlite3
+
+import polars as pl
+import pytest
+
+from src.db.engine import SQLiteDatabase
+from src.db.executor import export_csv, iter_batches, preview
+
+ENDLESS = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT i FROM n"
+)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "numbers.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE numbers (id INTEGER PRIMARY KEY, label TEXT)")
+        conn.executemany(
+            "INSERT INTO numbers VALUES (?, ?)",
+            [(i, None if i < 3 else f"n{i}") for i in range(25)],
+        )
+    conn.close()
+    database = SQLiteDatabase(str(path))
+    yield database
+    database.close()
+
+
+def test_preview_only_computes_the_rows_it_returns(database):
+    # The result is unbounded, so fetching it in full would never return
+    df = preview(database, ENDLESS, limit=3)
+    assert df["i"].to_list() == [1, 2, 3]
+
+
+def test_preview_keeps_duplicate_join_columns(database):
+    df = preview(database, "SELECT a.id, b.id FROM numbers a JOIN numbers b USING (id)")
+    assert df.columns == ["id", "id_1"]
+    assert df.height == 5
+
+
+def test_batches_cover_the_whole_result(database):
+    sql = "SELECT id, label FROM numbers ORDER BY id"
+    batches = list(iter_batches(database, sql, batch_size=10))
+    assert [batch.height for batch in batches] == [10, 10, 5]
+    assert pl.concat(batches)["id"].to_list() == list(range(25))
+
+
+def test_batches_are_cast_to_a_fixed_schema(database):
+    sql = "SELECT label FROM numbers ORDER BY id"
+    # The first batch holds only NULL labels, so its type cannot be inferred
+    batches = list(iter_batches(database, sql, batch_size=3, schema={"label": pl.Utf8}))
+    assert {batch.schema["label"] for batch in batches} == {pl.Utf8}
+
+
+def test_export_streams_every_row(database, tmp_path):
+    path = tmp_path / "numbers.csv"
+    sql = "SELECT id, label FROM numbers ORDER BY id"
+    assert export_csv(database, sql, str(path), batch_size=4) == 25
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "label"]
+    assert rows[1:] == [[str(i), "" if i < 3 else f"n{i}"] for i in range(25)]
+
+
+def test_empty_export_writes_the_header(database, tmp_path):
+    path = tmp_path / "empty.csv"
+    assert export_csv(database, "SELECT id, label FROM numbers WHERE 0", str(path)) == 0
+    assert path.read_text() == "id,label\n"
+
+
+def test_pipeline_streams_and_exports_the_same_rows(make_pipeline, tmp_path):
+    pipeline, _ = make_pipeline(["SELECT 1"])
+    sql = "SELECT id, name FROM students ORDER BY id"
+    batches = list(pipeline.iter_result(sql, batch_size=7))
+    assert all(batch.height <= 7 for batch in batches)
+    path = tmp_path / "students.csv"
+    assert pipeline.export_result(sql, str(path)) == sum(b.height for b in batches)
+    assert pl.read_csv(path).equals(pl.concat(batches))
@@ -0,0 +1,97 @@
+import json
+from typing import List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from src.agents.intent_classifier import EmbeddingIntentClassifier
+from src.config import IntentClassifierConfig, RoutingConfig
+
+WORKSPACES = [
+    "student_management",
+    "course_information",
+    "academic_performance",
+    "professor_workload",
+    "department_statistics",
+    "attendance_tracking",
+]
+KEYWORDS = ["student", "course", "grade", "professor", "department", "attendance"]
+
+
+class KeywordEmbedding(BaseEmbedding):
+    """One dimension per workspace keyword, and one for text without any."""
+
+    def _vector(self, text: str) -> List[float]:
+        text = text.lower()
+        counts = [float(text.count(keyword)) for keyword in KEYWORDS]
+        return [*counts, 0.0 if any(counts) else 1.0]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+def make_classifier(tmp_path, examples=()) -> EmbeddingIntentClassifier:
+    path = tmp_path / "intent_examples.json"
+    path.write_text(json.dumps(list(examples)))
+    config = IntentClassifierConfig(examples_path=str(path))
+    return EmbeddingIntentClassifier(WORKSPACES, KeywordEmbedding(), config)
+
+
+def test_close_queries_are_classified_locally(tmp_path):
+    classifier = make_classifier(tmp_path)
+    result = classifier.classify("Which professor teaches the most?")
+    assert result is not None
+    assert result.workspaces == ["professor_workload"]
+
+
+def test_ambiguous_queries_fall_back_to_the_llm(tmp_path):
+    classifier = make_classifier(tmp_path)
+    assert classifier.classify("Who is the best?") is None
+    classifier.record_fallback_latency(0.5)
+    assert classifier.classify("List attendance records") is not None
+    stats = classifier.stats()
+    assert stats["queries"] == 2
+    assert (stats["fast_hits"], stats["fallbacks"]) == (1, 1)
+    assert stats["fallback_rate"] == 0.5
+    assert stats["llm_ms"] == 500.0
+    assert stats["saved_ms_per_query"] > 0
+
+
+def test_examples_move_the_centroids(tmp_path):
+    # "Who is the best?" matches no description, but is a labelled example
+    examples = [
+        {
+            "natural_language": "Who is the best?",
+            "workspaces": ["academic_performance"],
+        },
+        {"natural_language": "Who is the best?", "workspaces": ["unknown_workspace"]},
+    ]
+    classifier = make_classifier(tmp_path, examples)
+    assert classifier.classify("Who is the best?").workspaces == [
+        "academic_performance"
+    ]
+
+
+def test_pipeline_skips_the_intent_call_on_a_fast_hit(make_pipeline, tmp_path):
+    path = tmp_path / "intent_examples.json"
+    path.write_text("[]")
+    pipeline, model = make_pipeline(
+        ["SELECT id, name FROM students"],
+        routing_config=RoutingConfig(mode="full"),
+        intent_classifier_config=IntentClassifierConfig(examples_path=str(path)),
+    )
+    pipeline.__dict__["_embed_model"] = KeywordEmbedding()
+    assert pipeline.intent_classifier_stats() is None
+
+    pipeline.generate_query("Which professor teaches the most?")
+    assert "intent" not in model.calls
+    pipeline.generate_query("Who is the best?")
+    assert model.calls.count("intent") == 1
+    stats = pipeline.intent_classifier_stats()
+    assert (stats["fast_hits"], stats["fallbacks"]) == (1, 1)
+    assert stats["llm_ms"] is not None
@@ -0,0 +1,70 @@
+from src.db.join_graph import JoinEdge, JoinGraph
+
+
+def table(*foreign_keys: tuple[str, str, str]) -> dict:
+    return {
+        "columns": [],
+        "foreign_keys": [
+            {"column": c, "references_table": t, "references_column": r}
+            for c, t, r in foreign_keys
+        ],
+    }
+
+
+# students and courses both belong to a department and meet through enrollments
+SCHEMA = {
+    "departments": table(),
+    "students": table(("department_id", "departments", "id")),
+    "courses": table(("department_id", "departments", "id")),
+    "enrollments": table(
+        ("student_id", "students", "id"), ("course_id", "courses", "id")
+    ),
+    "instructors": table(("department_id", "departments", "id")),
+    "audit_log": table(),
+}
+
+
+def test_link_table_beats_fan_trap():
+    plan = JoinGraph(SCHEMA).plan(["students", "courses"])
+    assert plan.tables == ["students", "courses", "enrollments"]
+    assert plan.conditions == [
+        "students.id = enrollments.student_id",
+        "enrollments.course_id = courses.id",
+    ]
+
+
+def test_bridge_tables_are_added_once():
+    plan = JoinGraph(SCHEMA).plan(["students", "courses", "instructors"])
+    assert plan.tables == [
+        "students",
+        "courses",
+        "instructors",
+        "enrollments",
+        "departments",
+    ]
+    # A tree over n tables has n - 1 joins
+    assert len(plan.edges) == len(plan.tables) - 1
+    assert "instructors.department_id = departments.id" in {
+        (edge if edge.forward else edge.reversed()).condition for edge in plan.edges
+    }
+    assert plan.join_columns["enrollments"] == {"student_id", "course_id"}
+
+
+def test_adjacent_tables_join_directly():
+    plan = JoinGraph(SCHEMA).plan(["enrollments", "students"])
+    assert plan.tables == ["enrollments", "students"]
+    assert plan.edges == [
+        JoinEdge("enrollments", "student_id", "students", "id", forward=True)
+    ]
+
+
+def test_disconnected_and_unknown_tables_are_kept_without_joins():
+    plan = JoinGraph(SCHEMA).plan(["students", "audit_log", "missing", "students"])
+    assert plan.tables == ["students", "audit_log", "missing"]
+    assert plan.edges == []
+
+
+def test_single_table_needs_no_joins():
+    plan = JoinGraph(SCHEMA).plan(["courses"])
+    assert plan.tables == ["courses"]
+    assert plan.edges == []
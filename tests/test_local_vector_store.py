@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from llama_index.core import MockEmbedding, Settings
+from llama_index.core.schema import QueryBundle, TextNode
+
+from src.config import VectorStoreConfig
+from src.local_vector_store import LocalVectorStore
+from src.vector_store import setup_vector_store
+
+
+@pytest.fixture(autouse=True)
+def embed_model(monkeypatch):
+    # Queries come with their embedding; the index only needs a model to exist
+    monkeypatch.setattr(Settings, "_embed_model", MockEmbedding(embed_dim=2))
+
+
+def setup(tmp_path, **config):
+    return setup_vector_store(
+        {}, VectorStoreConfig(backend="local", local_path=str(tmp_path), **config)
+    )
+
+
+def bundle(query: str, embedding) -> QueryBundle:
+    return QueryBundle(query_str=query, embedding=embedding)
+
+
+def test_empty_store_retrieves_nothing(tmp_path):
+    store, retriever = setup(tmp_path)
+    assert isinstance(store, LocalVectorStore)
+    assert retriever.retrieve(bundle("students", [1.0, 0.0])) == []
+    assert asyncio.run(retriever.aretrieve(bundle("students", [1.0, 0.0]))) == []
+
+
+def test_retrieves_closest_nodes(tmp_path):
+    store, retriever = setup(tmp_path, rag_k=1)
+    store.add(
+        [
+            TextNode(id_="a", text="students by gpa", embedding=[1.0, 0.0]),
+            TextNode(id_="b", text="courses by title", embedding=[0.0, 1.0]),
+        ]
+    )
+    results = retriever.retrieve(bundle("courses", [0.1, 1.0]))
+    assert [r.node.node_id for r in results] == ["b"]
+
+
+def test_ivf_with_empty_probed_lists_falls_back_to_scan(tmp_path):
+    store = LocalVectorStore(persist_dir=str(tmp_path), index_type="ivf", ivf_probes=1)
+    store.add([TextNode(id_=str(i), text="", embedding=[1.0, 0.0]) for i in range(8)])
+    store._train_ivf()
+    # Force the probed list to be one no row is assigned to
+    store._centroids[:] = [[0.0, 1.0], [1.0, 0.0]]
+    store._assignments[:] = 1
+    rows, _ = store._dense(store._centroids[0].copy(), 3)
+    assert len(rows) == 3
+
+
+def test_delete_nodes_rewrites_the_store_once(tmp_path, monkeypatch):
+    store = LocalVectorStore(persist_dir=str(tmp_path))
+    store.add([TextNode(id_=str(i), text="", embedding=[1.0, 0.0]) for i in range(6)])
+    rewrites = []
+    rewrite = store._rewrite
+    monkeypatch.setattr(store, "_rewrite", lambda m: rewrites.append(rewrite(m)))
+    store.delete_nodes(["1", "3", "4", "unknown"])
+    assert len(rewrites) == 1
+    assert store._ids == ["0", "2", "5"]
+
+    reopened = LocalVectorStore(persist_dir=str(tmp_path))
+    assert reopened._ids == ["0", "2", "5"]
+    assert reopened._matrix.shape == (3, 2)
+
+
+def test_add_rejects_another_dimension(tmp_path):
+    store = LocalVectorStore(persist_dir=str(tmp_path))
+    store.add([TextNode(id_="a", text="", embedding=[1.0, 0.0])])
+    with pytest.raises(ValueError, match="dimensions"):
+        store.add([TextNode(id_="b", text="", embedding=[1.0, 0.0, 0.0])])
+    assert store.node_count == 1
@@ -0,0 +1,132 @@
+from typing import List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from src.agents.table_agent import TableAgent
+from src.config import PromptBudgetConfig
+from src.prompt_budget import PromptBudget, key_columns
+
+SCHEMA = {
+    "students": {
+        "columns": [
+            {"name": "id", "primary_key": True},
+            {"name": "name"},
+            {"name": "email"},
+            {"name": "dob"},
+            {"name": "department_id"},
+        ],
+        "foreign_keys": [{"column": "department_id"}],
+    },
+    "courses": {
+        "columns": [
+            {"name": "id", "primary_key": True},
+            {"name": "title"},
+            {"name": "credits"},
+            {"name": "department_id"},
+        ],
+        "foreign_keys": [{"column": "department_id"}],
+    },
+    "departments": {
+        "columns": [
+            {"name": "id", "primary_key": True},
+            {"name": "name"},
+            {"name": "building"},
+        ],
+    },
+}
+COLUMNS = {t: [c["name"] for c in info["columns"]] for t, info in SCHEMA.items()}
+KEYS = key_columns(SCHEMA)
+
+
+class TopicEmbedding(BaseEmbedding):
+    """Embeds text by which of two topics it mentions."""
+
+    def _vector(self, text: str) -> List[float]:
+        return [float("students" in text), float("courses" in text), 0.1]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+def budget(embed_model: BaseEmbedding | None = None, **config) -> PromptBudget:
+    # One token per whitespace-separated word keeps the arithmetic readable
+    return PromptBudget(PromptBudgetConfig(**config), embed_model, str.split)
+
+
+def test_key_columns_are_primary_and_foreign_keys():
+    assert KEYS == {
+        "students": {"id", "department_id"},
+        "courses": {"id", "department_id"},
+        "departments": {"id"},
+    }
+
+
+def test_schema_within_budget_is_left_alone():
+    assert budget().fit_schema("student emails", COLUMNS, 21, KEYS) == COLUMNS
+
+
+def test_schema_is_cut_to_relevant_and_key_columns():
+    fitted = budget().fit_schema("student emails", COLUMNS, 16, KEYS)
+    assert fitted == {
+        "students": ["id", "email", "department_id"],
+        "courses": ["id", "department_id"],
+        "departments": ["id"],
+    }
+    # Spare tokens restore the most relevant table in full
+    fitted = budget().fit_schema("student emails", COLUMNS, 18, KEYS)
+    assert fitted["students"] == COLUMNS["students"]
+    assert fitted["courses"] == ["id", "department_id"]
+
+
+def test_tables_that_do_not_fit_are_dropped():
+    fitted = budget().fit_schema("student emails", COLUMNS, 10, KEYS)
+    assert fitted == {
+        "students": ["id", "email", "department_id"],
+        "departments": ["id"],
+    }
+    kept = budget().fit_schema("student emails", COLUMNS, 10, KEYS, drop_tables=False)
+    assert list(kept) == list(COLUMNS)
+
+
+def test_samples_are_packed_in_retrieval_order():
+    samples = [
+        "Q: students SQL: a",
+        "Q: how many courses per student SQL: b",
+        " ",
+        "Q: courses SQL: c",
+    ]
+    picked = budget().select_samples(samples, 8)
+    assert picked == ["Q: students SQL: a", "Q: courses SQL: c"]
+    assert budget().select_samples(samples, 0) == []
+
+
+def test_duplicate_samples_are_dropped():
+    samples = ["students SQL: a", "all students SQL: b", "courses SQL: c"]
+    picked = budget(TopicEmbedding()).select_samples(samples, 100)
+    assert picked == ["students SQL: a", "courses SQL: c"]
+
+
+def test_embedding_errors_fall_back_to_retrieval_order():
+    class Failing(TopicEmbedding):
+        def _get_text_embedding(self, text: str) -> List[float]:
+            raise ConnectionError("embedding service down")
+
+    samples = ["students SQL: a", "all students SQL: b"]
+    assert budget(Failing()).select_samples(samples, 100) == samples
+
+
+def test_table_agent_sends_a_schema_over_budget_per_query():
+    small = TableAgent(SCHEMA, "test", budget=budget())
+    assert not small.linked_schema
+
+    agent = TableAgent(SCHEMA, "test", budget=budget(table_selection=10))
+    assert agent.linked_schema
+    prompt = agent._user_prompt("student emails", ["student_management"], None)
+    assert "Table 'students': id, email, department_id" in prompt
+    assert "'courses'" not in prompt
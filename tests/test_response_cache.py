@@ -0,0 +1,131 @@
+import hashlib
+import re
+from typing import List
+
+import pytest
+
+from src.agents.sql_generator import SQLGeneration
+from src.cache.response_cache import ResponseCache
+from src.config import ResponseCacheConfig
+from src.utils import normalize_query
+
+
+class FakeEmbedding:
+    """Bag-of-words vectors, so questions sharing words are similar."""
+
+    def __init__(self, model_name: str = "fake", dim: int = 64) -> None:
+        self.model_name = model_name
+        self.dim = dim
+        self.calls = 0
+
+    def get_query_embedding(self, query: str) -> List[float]:
+        self.calls += 1
+        vector = [0.0] * self.dim
+        for token in re.findall(r"\S+", query):
+            digest = hashlib.sha256(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0
+        return vector
+
+
+def sql(text: str) -> SQLGeneration:
+    return SQLGeneration(sql=text, explanation="")
+
+
+def make_cache(tmp_path, embedding: FakeEmbedding, **config) -> ResponseCache:
+    path = str(tmp_path / "responses.sqlite")
+    return ResponseCache(
+        ResponseCacheConfig(path=path, **config), "schema", lambda: embedding
+    )
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("Students with GPA > 3.5", "Students with GPA < 3.5"),
+        ("Students with GPA > 3.5", "Students with GPA = 3.5"),
+        ("Students with GPA != 3.5", "Students with GPA = 3.5"),
+        ("Students with GPA > 3.5", "Students with GPA > 35"),
+        ("Courses named 'Databases'", "Courses named Databases"),
+    ],
+)
+def test_normalization_keeps_operators_numbers_and_quotes(a: str, b: str) -> None:
+    assert normalize_query(a) != normalize_query(b)
+
+
+def test_normalization_folds_case_whitespace_and_trailing_punctuation() -> None:
+    assert normalize_query("  How many   STUDENTS are there?! ") == (
+        "how many students are there"
+    )
+
+
+def test_operator_variants_do_not_share_an_exact_hit(tmp_path) -> None:
+    cache = make_cache(tmp_path, FakeEmbedding(), similarity_threshold=1.01)
+    cache.put("Students with GPA > 3.5", sql("SELECT * FROM s WHERE gpa > 3.5"))
+    assert cache.get("Students with GPA < 3.5") is None
+    hit = cache.get("students with gpa > 3.5?")
+    assert hit is not None and hit.level == "exact"
+    assert hit.result.sql == "SELECT * FROM s WHERE gpa > 3.5"
+
+
+def test_semantic_hit_above_threshold(tmp_path) -> None:
+    embedding = FakeEmbedding()
+    cache = make_cache(tmp_path, embedding, similarity_threshold=0.8)
+    cache.put("list all students in the databases course", sql("SELECT 1"))
+    hit = cache.get("list all the students in the databases course")
+    assert hit is not None and hit.level == "semantic"
+    assert cache.get("count professors per department") is None
+
+
+def test_exact_hits_do_not_load_the_embedding_model(tmp_path) -> None:
+    cache = make_cache(tmp_path, FakeEmbedding())
+    cache.put("How many students are there?", sql("SELECT COUNT(*) FROM students"))
+    cache.close()
+
+    def unavailable() -> FakeEmbedding:
+        raise AssertionError("embedding model loaded")
+
+    path = str(tmp_path / "responses.sqlite")
+    reloaded = ResponseCache(ResponseCacheConfig(path=path), "schema", unavailable)
+    hit = reloaded.get("how many students are there")
+    assert hit is not None and hit.level == "exact"
+
+
+def test_embeddings_of_another_model_are_dropped(tmp_path) -> None:
+    cache = make_cache(tmp_path, FakeEmbedding("old", dim=32))
+    cache.put("list all students", sql("SELECT name FROM students"))
+    cache.close()
+
+    reloaded = make_cache(tmp_path, FakeEmbedding("new", dim=64))
+    # A different dimension must not break the semantic level
+    assert reloaded.get("list every student") is None
+    hit = reloaded.get("List all students")
+    assert hit is not None and hit.level == "exact"
+
+
+def test_rows_past_the_size_bound_are_evicted_on_load(tmp_path) -> None:
+    cache = make_cache(tmp_path, FakeEmbedding(), max_entries=10)
+    for i in range(10):
+        cache.put(f"question {i}", sql(f"SELECT {i}"))
+    cache.close()
+
+    make_cache(tmp_path, FakeEmbedding(), max_entries=3).close()
+    reloaded = make_cache(tmp_path, FakeEmbedding(), max_entries=10)
+    (count,) = reloaded._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+    assert count == 3
+    assert reloaded.get("question 9") is not None
+
+
+def test_embedding_runs_without_the_lock(tmp_path) -> None:
+    embedding = FakeEmbedding()
+    cache = make_cache(tmp_path, embedding)
+    embed = embedding.get_query_embedding
+
+    def unlocked(query: str) -> List[float]:
+        # Lookups of other threads must not wait on the model
+        assert not cache._lock.locked()
+        return embed(query)
+
+    embedding.get_query_embedding = unlocked  # type: ignore[method-assign]
+    cache.put("list all students", sql("SELECT name FROM students"))
+    cache.get("list every student")
+    assert embedding.calls == 2
@@ -0,0 +1,141 @@
+import sqlite3
+import sys
+
+import polars as pl
+import pytest
+
+from src.cache.result_cache import ResultCache, canonical_sql
+from src.config import DatabaseConfig, ResultCacheConfig
+from src.db.engine import create_database
+
+# Pairs of queries that only differ in layout, case or comments
+EQUIVALENT = [
+    ("SELECT id FROM students", "select   id\nfrom STUDENTS;"),
+    ("SELECT id FROM students", "SELECT id -- the key\nFROM students"),
+    (
+        "SELECT id FROM students /* ranked */ ORDER BY gpa",
+        "SELECT id FROM students ORDER BY gpa",
+    ),
+]
+DIFFERENT = [
+    (
+        "SELECT id FROM students WHERE gpa > 3.5",
+        "SELECT id FROM students WHERE gpa < 3.5",
+    ),
+    (
+        "SELECT id FROM students WHERE name = 'Ann'",
+        "SELECT id FROM students WHERE name = 'ann'",
+    ),
+    ("SELECT id FROM students", "SELECT id FROM enrollments"),
+]
+
+
+@pytest.fixture(params=["sqlglot", "text"])
+def parser(request, monkeypatch):
+    """Run a test with sqlglot, then with the textual fallback."""
+    if request.param == "sqlglot":
+        pytest.importorskip("sqlglot")
+    else:
+        monkeypatch.setitem(sys.modules, "sqlglot", None)
+    canonical_sql.cache_clear()
+    yield request.param
+    canonical_sql.cache_clear()
+
+
+@pytest.mark.parametrize("a, b", EQUIVALENT)
+def test_equivalent_queries_share_a_canonical_form(parser, a, b):
+    assert canonical_sql(a, "sqlite") == canonical_sql(b, "sqlite")
+
+
+def test_parser_renames_aliases():
+    pytest.importorskip("sqlglot")
+    canonical_sql.cache_clear()
+    a = "SELECT s.id FROM students s JOIN enrollments e ON s.id = e.student_id"
+    b = "SELECT x.id FROM students AS x JOIN enrollments y ON x.id = y.student_id"
+    assert canonical_sql(a, "sqlite") == canonical_sql(b, "sqlite")
+
+
+@pytest.mark.parametrize("a, b", DIFFERENT)
+def test_different_queries_keep_different_forms(parser, a, b):
+    assert canonical_sql(a, "sqlite") != canonical_sql(b, "sqlite")
+
+
+def test_tables_exclude_ctes(parser):
+    sql = "WITH good AS (SELECT * FROM students WHERE gpa > 3.5) SELECT * FROM good"
+    canonical = canonical_sql(sql, "sqlite")
+    assert canonical is not None
+    assert canonical[1] == ("students",)
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "university.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE students (id INTEGER PRIMARY KEY, gpa REAL)")
+        conn.executemany("INSERT INTO students (gpa) VALUES (?)", [(3.0,), (3.8,)])
+    database = create_database(DatabaseConfig(url=f"sqlite:///{path}"))
+    yield database
+    database.close()
+
+
+def make_cache(tmp_path, database, **config) -> ResultCache:
+    config = ResultCacheConfig(path=str(tmp_path / "results"), **config)
+    return ResultCache(config, database, {"students"})
+
+
+def store(cache: ResultCache, sql: str, frame: pl.DataFrame) -> None:
+    versions = cache.versions(sql)
+    assert versions is not None
+    cache.put(sql, frame, versions)
+
+
+def test_hit_for_equivalent_sql_until_the_table_changes(tmp_path, database):
+    cache = make_cache(tmp_path, database)
+    frame = pl.DataFrame({"id": [2]})
+    store(cache, "SELECT id FROM students WHERE gpa > 3.5", frame)
+
+    hit = cache.get("select id\n  from Students where gpa > 3.5;")
+    assert hit is not None and hit.equals(frame)
+    assert cache.get("SELECT id FROM students WHERE gpa < 3.5") is None
+
+    with sqlite3.connect(database.path) as conn:
+        conn.execute("INSERT INTO students (gpa) VALUES (3.9)")
+    assert cache.get("SELECT id FROM students WHERE gpa > 3.5") is None
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_results_survive_a_restart(tmp_path, database):
+    cache = make_cache(tmp_path, database)
+    store(cache, "SELECT id FROM students", pl.DataFrame({"id": [1, 2]}))
+    cache.close()
+
+    reopened = make_cache(tmp_path, database)
+    hit = reopened.get("SELECT id FROM students")
+    assert hit is not None and hit["id"].to_list() == [1, 2]
+    reopened.close()
+
+
+def test_uncacheable_queries(tmp_path, database):
+    cache = make_cache(tmp_path, database, max_rows=1)
+    assert cache.versions("SELECT * FROM unknown_view") is None
+    assert cache.versions("PRAGMA table_info(students)") is None
+    # Results over max_rows are not stored
+    cache.put("SELECT id FROM students", pl.DataFrame({"id": [1, 2]}), {})
+    assert cache.get("SELECT id FROM students") is None
+    cache.close()
+
+
+def test_least_recently_used_result_is_evicted(tmp_path, database):
+    cache = make_cache(tmp_path, database, max_entries=2)
+    for i in range(3):
+        store(
+            cache, f"SELECT id FROM students WHERE id = {i}", pl.DataFrame({"id": [i]})
+        )
+        if i == 1:
+            # Touch the first result, so the second is the oldest
+            assert cache.get("SELECT id FROM students WHERE id = 0") is not None
+    assert cache.get("SELECT id FROM students WHERE id = 1") is None
+    assert cache.get("SELECT id FROM students WHERE id = 0") is not None
+    assert cache.get("SELECT id FROM students WHERE id = 2") is not None
+    cache.close()
@@ -0,0 +1,77 @@
+import json
+from typing import List
+
+from llama_index.core import MockEmbedding
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+
+from src.cache.retrieval_cache import CachedRetriever, QueryEmbeddingCache
+from src.config import RetrievalCacheConfig
+
+
+class RecordingEmbedding(MockEmbedding):
+    """Constant query vectors, recording the queries embedded."""
+
+    queries: List[str] = []
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        self.queries.append(query)
+        return super()._get_query_embedding(query)
+
+
+class CountingRetriever(BaseRetriever):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        self.calls += 1
+        return [NodeWithScore(node=TextNode(text="SELECT 1"), score=1.0)]
+
+
+def test_original_question_is_embedded_once_per_normalized_form(tmp_path):
+    inner = RecordingEmbedding(embed_dim=4, queries=[])
+    cache = QueryEmbeddingCache(
+        inner, RetrievalCacheConfig(path=str(tmp_path / "embeddings.sqlite"))
+    )
+    first = cache.get_query_embedding("How many Students are there?")
+    assert cache.get_query_embedding("how many students are there") == first
+    assert inner.queries == ["How many Students are there?"]
+    cache.close()
+
+
+def make_retriever(tmp_path, inner: BaseRetriever) -> CachedRetriever:
+    config = RetrievalCacheConfig(
+        path=str(tmp_path / "embeddings.sqlite"),
+        manifest_path=str(tmp_path / "samples.json.manifest.json"),
+    )
+    return CachedRetriever(inner, MockEmbedding(embed_dim=4), config)
+
+
+def write_manifest(tmp_path, node_ids: List[str]) -> None:
+    manifest = {"store": "local", "embedding_model": "mock:4", "node_ids": node_ids}
+    (tmp_path / "samples.json.manifest.json").write_text(json.dumps(manifest))
+
+
+def test_cache_hits_until_the_manifest_changes(tmp_path):
+    inner = CountingRetriever()
+    retriever = make_retriever(tmp_path, inner)
+    write_manifest(tmp_path, ["a"])
+    retriever.retrieve("students by gpa")
+    retriever.retrieve("students by gpa")
+    assert inner.calls == 1
+    assert retriever.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    write_manifest(tmp_path, ["a", "b"])
+    retriever.retrieve("students by gpa")
+    assert inner.calls == 2
+
+
+def test_first_manifest_drops_results_cached_without_one(tmp_path):
+    inner = CountingRetriever()
+    retriever = make_retriever(tmp_path, inner)
+    retriever.retrieve("students by gpa")
+    # The samples were synced after the result was cached
+    write_manifest(tmp_path, ["a"])
+    retriever.retrieve("students by gpa")
+    assert inner.calls == 2
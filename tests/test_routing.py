@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.config import RoutingConfig
+from src.router import QueryRouter
+
+SCHEMA = {"students": {}, "courses": {}, "enrollments": {}, "departments": {}}
+
+
+@pytest.mark.parametrize(
+    "question, path, reason",
+    [
+        ("How many students are there?", "fast", "1 table(s) named"),
+        ("List courses with their enrollments", "fast", "2 table(s) named"),
+        ("Who is the best?", "full", "no table named"),
+        (
+            "Students with the most enrollments in courses of each department",
+            "full",
+            "4 tables named",
+        ),
+        (" ".join(["students"] * 20), "full", "more than 16 words"),
+    ],
+)
+def test_auto_mode_routes_simple_questions_to_the_fast_path(question, path, reason):
+    route = QueryRouter(SCHEMA, RoutingConfig(mode="auto")).route(question)
+    assert (route.path, route.reason) == (path, reason)
+
+
+def test_requested_modes_override_the_estimate():
+    router = QueryRouter(SCHEMA, RoutingConfig(mode="auto"))
+    assert router.route("How many students?", mode="full").path == "full"
+    route = router.route("Who is the best?", mode="fast")
+    # Without a named table the fast path gets every candidate table
+    assert route.path == "fast" and route.tables == list(SCHEMA)
+    with pytest.raises(ValueError):
+        router.route("How many students?", mode="quick")
+
+
+VALID = "SELECT COUNT(*) FROM students"
+INVALID = "SELECT missing_column FROM students"
+
+
+def run(pipeline, question: str, asynchronous: bool):
+    if asynchronous:
+        return asyncio.run(pipeline.agenerate_query(question))
+    return pipeline.generate_query(question)
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_fast_path_answers_with_a_single_call(make_pipeline, asynchronous):
+    pipeline, model = make_pipeline([VALID], routing_config=RoutingConfig(mode="auto"))
+    result = run(pipeline, "How many students are there?", asynchronous)
+    assert result["route"] == {
+        "mode": "auto",
+        "path": "fast",
+        "reason": "1 table(s) named",
+        "fallback": False,
+    }
+    assert model.calls == ["sql"]
+    assert result["sql_result"].sql == VALID
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_invalid_fast_path_sql_falls_back_to_the_full_chain(
+    make_pipeline, asynchronous
+):
+    pipeline, model = make_pipeline(
+        [INVALID, VALID], routing_config=RoutingConfig(mode="auto")
+    )
+    result = run(pipeline, "How many students are there?", asynchronous)
+    assert result["route"]["path"] == "full"
+    assert result["route"]["fallback"] is True
+    assert model.calls[0] == "sql" and model.calls[-1] == "sql"
+    assert {"intent", "tables", "columns"} <= set(model.calls)
+    assert result["sql_result"].sql == VALID
+    assert result["validation"]["repairs"] == 0
+
+
+def test_async_fast_path_validates_off_the_event_loop(make_pipeline):
+    pipeline, _ = make_pipeline([VALID], routing_config=RoutingConfig(mode="fast"))
+    validate = pipeline.validator.validate
+    threads = []
+
+    def recording(sql):
+        threads.append(threading.current_thread())
+        return validate(sql)
+
+    pipeline.validator.validate = recording
+    result = asyncio.run(pipeline.agenerate_query("How many students are there?"))
+    assert result["route"]["path"] == "fast"
+    assert threads and threading.main_thread() not in threads
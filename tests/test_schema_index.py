@@ -0,0 +1,95 @@
+import hashlib
+import re
+from typing import List
+
+from src.config import SchemaIndexConfig
+from src.schema_index import SchemaIndex
+
+SCHEMA = {
+    "students": {
+        "columns": [
+            {"name": "id", "type": "INTEGER", "primary_key": True},
+            {"name": "gpa", "type": "REAL"},
+        ],
+        "foreign_keys": [],
+    },
+    "courses": {
+        "columns": [
+            {"name": "id", "type": "INTEGER", "primary_key": True},
+            {"name": "title", "type": "TEXT"},
+        ],
+        "foreign_keys": [],
+    },
+}
+
+
+class FakeEmbedding:
+    """Bag-of-words vectors, so texts sharing words are similar."""
+
+    def __init__(self, model_name: str = "fake", dim: int = 32) -> None:
+        self.model_name = model_name
+        self.dim = dim
+        self.batches = 0
+
+    def get_query_embedding(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for token in re.findall(r"[a-z]+", text.lower()):
+            digest = hashlib.sha256(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0
+        return vector
+
+    def get_text_embedding_batch(self, texts: List[str]) -> List[List[float]]:
+        self.batches += 1
+        return [self.get_query_embedding(text) for text in texts]
+
+
+def make_index(tmp_path, embedding: FakeEmbedding, **config) -> SchemaIndex:
+    config = SchemaIndexConfig(cache_dir=str(tmp_path / "index"), **config)
+    return SchemaIndex(SCHEMA, embedding, config)  # type: ignore[arg-type]
+
+
+def test_cache_path_depends_on_model_dimension_and_descriptions(tmp_path):
+    descriptions = tmp_path / "descriptions.json"
+    descriptions.write_text('{"students": "Enrolled students"}')
+    base = make_index(tmp_path, FakeEmbedding("a"))._cache_path(32)
+    paths = {
+        base,
+        make_index(tmp_path, FakeEmbedding("a"))._cache_path(16),
+        make_index(tmp_path, FakeEmbedding("b"))._cache_path(32),
+        make_index(
+            tmp_path, FakeEmbedding("a"), descriptions_path=str(descriptions)
+        )._cache_path(32),
+    }
+    assert len(paths) == 4
+    assert make_index(tmp_path, FakeEmbedding("a"))._cache_path(32) == base
+
+    descriptions.write_text('{"students": "Students enrolled this term"}')
+    assert (
+        make_index(
+            tmp_path, FakeEmbedding("a"), descriptions_path=str(descriptions)
+        )._cache_path(32)
+        not in paths
+    )
+
+
+def test_vectors_are_reused_only_for_the_same_model(tmp_path):
+    first = FakeEmbedding("a")
+    assert make_index(tmp_path, first).link("students gpa").tables[0] == "students"
+    assert first.batches == 2
+
+    same = FakeEmbedding("a")
+    make_index(tmp_path, same).link("students gpa")
+    assert same.batches == 0
+
+    other = FakeEmbedding("a", dim=16)
+    make_index(tmp_path, other).link("course title")
+    assert other.batches == 2
+
+
+def test_dimension_change_rebuilds_in_place(tmp_path):
+    embedding = FakeEmbedding("a")
+    index = make_index(tmp_path, embedding)
+    index.link("students gpa")
+    embedding.dim = 16
+    assert set(index.link("course title").tables) == {"students", "courses"}
+    assert embedding.batches == 4
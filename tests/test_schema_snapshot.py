@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from src.db.schema import get_database_schema, load_database_schema
+
+
+def create(path, *statements: str) -> None:
+    with sqlite3.connect(path) as conn:
+        for statement in statements:
+            conn.execute(statement)
+    conn.close()
+
+
+def test_snapshot_matches_introspection(tmp_path):
+    path = str(tmp_path / "university.db")
+    create(
+        path,
+        "CREATE TABLE students (id INTEGER PRIMARY KEY, name TEXT)",
+        "CREATE INDEX students_name ON students (name)",
+    )
+    assert load_database_schema(path) == get_database_schema(path)
+    # Served from the snapshot
+    assert load_database_schema(path) == get_database_schema(path)
+
+
+def test_replaced_file_with_the_same_schema_version(tmp_path):
+    path = tmp_path / "university.db"
+    create(path, "CREATE TABLE students (id INTEGER PRIMARY KEY)")
+    assert set(load_database_schema(str(path))) == {"students"}
+
+    path.unlink()
+    create(path, "CREATE TABLE courses (id INTEGER PRIMARY KEY, title TEXT)")
+    # One CREATE each, so both files are at schema_version 1
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA schema_version").fetchone() == (1,)
+    conn.close()
+    schema = load_database_schema(str(path))
+    assert set(schema) == {"courses"}
+    assert [c["name"] for c in schema["courses"]["columns"]] == ["id", "title"]
+
+
+def test_missing_database_is_not_created(tmp_path):
+    path = tmp_path / "missing.db"
+    with pytest.raises(sqlite3.OperationalError):
+        load_database_schema(str(path))
+    assert not path.exists()
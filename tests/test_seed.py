@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.db import seed
+from src.db.schema import load_database_schema
+from src.db.seed import TABLE_COLUMNS, SyntheticScale, generate_university_data
+
+
+def test_tables_with_same_length_names_get_their_own_stream(monkeypatch):
+    seeds = []
+    default_rng = np.random.default_rng
+
+    def recording(entropy):
+        seeds.append(entropy)
+        return default_rng(entropy)
+
+    monkeypatch.setattr(np.random, "default_rng", recording)
+    scale = SyntheticScale(1_000)
+    # professors, classrooms and attendance; departments and enrollments
+    for table in TABLE_COLUMNS:
+        seed._synthetic_rows(table, scale, 0, 10, seed=0)
+    assert len(set(seeds)) == len(TABLE_COLUMNS)
+
+
+def test_generated_schema_leaves_out_sqlite_tables(tmp_path):
+    path = str(tmp_path / "scale.db")
+    counts = generate_university_data(path, attendance_rows=400)
+    # ANALYZE created sqlite_stat1, which is not part of the schema
+    assert set(load_database_schema(path)) == set(counts)
@@ -0,0 +1,66 @@
+import asyncio
+import json
+from typing import Any, Dict, Tuple
+
+import pytest
+
+from src.agents.sql_generator import SQLGeneration
+from src.config import ServerConfig
+from src.server import QueryServer
+
+
+class FakePipeline:
+    async def agenerate_query(
+        self, question: str, mode: str | None = None
+    ) -> Dict[str, Any]:
+        return {
+            "sql_result": SQLGeneration(sql=f"-- {question}", explanation=""),
+            "query_result": [],
+            "cache": None,
+        }
+
+
+async def exchange(request: bytes) -> Tuple[int, Dict[str, Any]]:
+    """Send one raw request to a fresh server; returns the status and JSON body."""
+    pipeline: Any = FakePipeline()
+    server = await QueryServer(pipeline, ServerConfig(port=0)).start()
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def post(path: str, body: bytes, length: str | None = None) -> bytes:
+    length = str(len(body)) if length is None else length
+    return (
+        f"POST {path} HTTP/1.1\r\nContent-Length: {length}\r\nConnection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+
+def test_query_returns_sql():
+    status, payload = asyncio.run(exchange(post("/query", b'{"question": "x"}')))
+    assert status == 200
+    assert payload["sql"] == "-- x"
+
+
+@pytest.mark.parametrize("body", [b"[1]", b'"question"', b"3", b"null"])
+@pytest.mark.parametrize("path", ["/query", "/query/batch"])
+def test_non_object_body_is_rejected(path, body):
+    status, payload = asyncio.run(exchange(post(path, body)))
+    assert status == 400
+    assert "JSON object" in payload["error"]
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_malformed_content_length_is_rejected(length):
+    status, payload = asyncio.run(exchange(post("/query", b"{}", length)))
+    assert status == 400
+    assert "Content-Length" in payload["error"]
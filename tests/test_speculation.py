@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from src.config import RoutingConfig, SpeculationConfig
+
+# The scripted pruner keeps id and name of students; email and dob are dropped
+PRUNED = "SELECT id, name FROM students"
+
+
+def ask(make_pipeline, sql, **config):
+    pipeline, model = make_pipeline(
+        sql,
+        routing_config=RoutingConfig(mode="full"),
+        speculation_config=SpeculationConfig(**config),
+    )
+    result = asyncio.run(pipeline.agenerate_query("List the students"))
+    return result, model.calls.count("sql")
+
+
+@pytest.mark.parametrize(
+    "draft, reason",
+    [
+        (PRUNED, "columns"),
+        # Uses a dropped column, but still validates
+        ("SELECT email FROM students", "validation"),
+    ],
+)
+def test_accepted_draft_is_the_answer(make_pipeline, draft, reason):
+    result, generations = ask(make_pipeline, [draft])
+    assert result["speculation"]["accepted"] is True
+    assert result["speculation"]["reason"] == reason
+    assert "saved_ms" in result["speculation"]
+    assert result["sql_result"].sql == draft
+    assert generations == 1
+
+
+def test_rejected_draft_is_generated_again(make_pipeline):
+    draft = "SELECT email FROM students WHERE missing_column = 1"
+    result, generations = ask(make_pipeline, [draft, PRUNED])
+    assert result["speculation"]["accepted"] is False
+    assert result["speculation"]["reason"] == "rejected"
+    assert result["sql_result"].sql == PRUNED
+    assert generations == 2
+
+
+def test_wide_tables_are_not_speculated_on(make_pipeline):
+    result, generations = ask(make_pipeline, [PRUNED], max_columns=2)
+    assert result["speculation"] is None
+    assert generations == 1
@@ -0,0 +1,54 @@
+import asyncio
+
+from src.cache.stage_memo import StageMemo
+
+
+def test_get_or_compute_memoizes_per_key() -> None:
+    memo: StageMemo[int] = StageMemo()
+    calls = []
+
+    def compute() -> int:
+        calls.append(1)
+        return 42
+
+    assert memo.get_or_compute(("q", ("a",)), compute) == 42
+    assert memo.get_or_compute(("q", ("a",)), compute) == 42
+    assert memo.get_or_compute(("q", ("b",)), compute) == 42
+    assert len(calls) == 2
+    assert memo.stats()["hits"] == 1
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    memo: StageMemo[str] = StageMemo(max_entries=2)
+    memo.put("a", "A")
+    memo.put("b", "B")
+    assert memo.get("a") == "A"
+    memo.put("c", "C")
+    assert memo.get("b") is None
+    assert memo.get("a") == "A"
+    assert memo.get("c") == "C"
+
+
+def test_expired_entries_are_dropped(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("src.cache.stage_memo.time.time", lambda: now[0])
+    memo: StageMemo[str] = StageMemo(ttl_seconds=10)
+    memo.put("a", "A")
+    now[0] += 10
+    assert memo.get("a") == "A"
+    now[0] += 1
+    assert memo.get("a") is None
+    assert memo.stats()["size"] == 0
+
+
+def test_clear_invalidates_everything() -> None:
+    memo: StageMemo[str] = StageMemo()
+    memo.put("a", "A")
+    memo.clear()
+    assert memo.get("a") is None
+    assert asyncio.run(memo.aget_or_compute("a", _recompute)) == "again"
+    assert memo.get("a") == "again"
+
+
+async def _recompute() -> str:
+    return "again"
@@ -0,0 +1,25 @@
+from src.telemetry import Metrics, Span
+
+
+def speculation(saved_ms: float) -> Span:
+    return Span(
+        "speculation",
+        "trace",
+        start_ns=0,
+        end_ns=10**6,
+        attributes={"saved_ms": saved_ms},
+    )
+
+
+def test_time_saved_and_lost_are_separate_counters():
+    metrics = Metrics()
+    for saved_ms in (30.0, -12.5, 20.0):
+        metrics.observe(speculation(saved_ms))
+    stage = metrics.snapshot()["speculation"]
+    assert stage["saved_ms"] == 50.0
+    assert stage["lost_ms"] == 12.5
+
+    lines = metrics.prometheus().splitlines()
+    assert 'querygpt_saved_ms_total{stage="speculation"} 50' in lines
+    assert 'querygpt_lost_ms_total{stage="speculation"} 12.5' in lines
+    assert "# TYPE querygpt_lost_ms_total counter" in lines
@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from src.config import DatabaseConfig
+from src.db.engine import create_database
+from src.db.validator import SQLValidator
+
+
+@pytest.fixture
+def validator(tmp_path):
+    path = tmp_path / "university.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE students (id INTEGER PRIMARY KEY, gpa REAL)")
+        conn.executemany("INSERT INTO students (gpa) VALUES (?)", [(3.0,), (3.8,)])
+    database = create_database(DatabaseConfig(url=f"sqlite:///{path}"))
+    yield SQLValidator(database, large_table_rows=1_000_000)
+    database.close()
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT id FROM students",
+        "select id from students;",
+        "SELECT id FROM students -- best first",
+        "SELECT id FROM students; -- trailing note",
+        "-- students above 3.5\nSELECT id FROM students WHERE gpa > 3.5",
+        "/* generated */ SELECT id FROM students",
+        "WITH good AS (SELECT id FROM students WHERE gpa > 3.5) SELECT * FROM good",
+        "SELECT ';' AS semicolon FROM students",
+    ],
+)
+def test_accepts_valid_queries(validator, sql):
+    check = validator.validate(sql)
+    assert check.ok, check.error
+    assert check.plan
+
+
+@pytest.mark.parametrize(
+    "sql, error",
+    [
+        ("", "Empty"),
+        (" ; ", "Empty"),
+        ("SELECT 'unterminated FROM students", "Incomplete"),
+        ("SELECT id FROM students /* open comment", "Incomplete"),
+        ("DELETE FROM students", "Only SELECT"),
+        ("-- SELECT\nDELETE FROM students", "Only SELECT"),
+        ("/* SELECT */ DROP TABLE students", "Only SELECT"),
+        ("(DELETE FROM students)", "Only SELECT"),
+        ("SELECT name FROM students", "no such column"),
+        ("SELECT id FROM teachers", "no such table"),
+    ],
+)
+def test_rejects_invalid_queries(validator, sql, error):
+    check = validator.validate(sql)
+    assert not check.ok
+    assert error in str(check.error)
+
+
+def test_parenthesized_query_is_left_to_the_database(validator):
+    # PostgreSQL accepts it, SQLite reports a syntax error of its own
+    check = validator.validate("(SELECT id FROM students) UNION SELECT 1")
+    assert "Only SELECT" not in str(check.error)
+
+
+def test_reports_scans_of_large_tables(validator):
+    validator.large_table_rows = 1
+    check = validator.validate("SELECT id FROM students WHERE gpa > 3.5")
+    assert check.ok
+    assert "students" in check.full_scans
+    assert check.warnings
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from src.config import RoutingConfig, VotingConfig
+
+STUDENTS = "SELECT COUNT(*) FROM students"
+ALSO_STUDENTS = "SELECT COUNT(id) FROM students"
+DEPARTMENTS = "SELECT name FROM departments"
+
+
+def by_temperature(answers):
+    """SQL answer of each candidate, chosen by its temperature."""
+    return [lambda temperature: answers[temperature]]
+
+
+def ask(make_pipeline, answers, asynchronous, **config):
+    pipeline, model = make_pipeline(
+        by_temperature(answers),
+        routing_config=RoutingConfig(mode="full"),
+        voting_config=VotingConfig(**config),
+    )
+    question = "How many students are there?"
+    if asynchronous:
+        return asyncio.run(pipeline.agenerate_query(question))
+    return pipeline.generate_query(question)
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_largest_group_of_equal_results_wins(make_pipeline, asynchronous):
+    answers = {0.0: DEPARTMENTS, 0.5: STUDENTS, 1.0: ALSO_STUDENTS}
+    result = ask(make_pipeline, answers, asynchronous)
+    assert result["sql_result"].sql == STUDENTS
+    assert result["voting"]["winner"] == 1
+    assert result["voting"]["votes"] == 2
+
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_failed_candidates_get_no_vote(make_pipeline, asynchronous):
+    answers = {0.0: "SELECT missing FROM students", 0.5: DEPARTMENTS, 1.0: STUDENTS}
+    result = ask(make_pipeline, answers, asynchronous)
+    # Two distinct results tie; the lower temperature wins
+    assert result["sql_result"].sql == DEPARTMENTS
+    assert result["voting"]["valid"] == 2
+    assert result["voting"]["groups"] == 2
+
+
+def test_candidates_are_checked_on_a_sampled_copy(make_pipeline, tmp_path):
+    answers = {0.0: STUDENTS, 0.5: STUDENTS, 1.0: STUDENTS}
+    result = ask(make_pipeline, answers, asynchronous=False, candidates=2)
+    assert result["voting"]["candidates"] == 2
+    assert (tmp_path / "university.sample.db").exists()